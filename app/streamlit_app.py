@@ -7,26 +7,92 @@ if str(root) not in sys.path:
     sys.path.insert(0, str(root))
 
 import streamlit as st
-import matplotlib.pyplot as plt
 
-from engine.loading_data.load import load_weekly_csv, build_weekly_indexes, get_season_week_range
-from engine.simulator.simulate import Trade, counterfactual_replay, apply_trade_to_roster
+from engine.loading_data.load import load_weekly_seasons, build_weekly_indexes, get_season_week_range
+from engine.loading_data.store import open_store
+from engine.loading_data.scoring import available_formats
+from engine.simulator.simulate import Trade, counterfactual_replay, trade_week_sweep
 from engine.simulator.lineup import optimal_lineup_points
-from engine.ml.predict import load_model
-from engine.simulator.expected import simulate_expected_points
+from engine.ml.predict import load_inference_model, model_fingerprint
+from engine.ml.precompute import load_prediction_table, prediction_data_stamp
+from engine.ml.feature_store import open_feature_store
+from engine.simulator.expected import (
+    PredictionMemo,
+    expected_counterfactual_replay,
+)
+from engine.simulator.monte_carlo import monte_carlo_replay, residuals_from_history
+from engine.simulator.replay_cache import ReplayCache, replay_key
+from engine.memory import approx_nbytes, format_bytes
+from engine import tracing
 
 data_path = "dataset/weekly.csv"
+store_path = "dataset/weekly_store"
 model_path = "models/next_week_model.joblib"
+predictions_path = "models/next_week_predictions.parquet"
+
+@st.cache_resource #season list + week ranges come from the store manifest, no rows read
+def load_store(version: str):
+    return open_store(data_path, store_path)
 
 @st.cache_data #caches function outputs. so the function of load_data, the outputs of this function will be cached, sort of stored in the database
-def load_data():
-    return load_weekly_csv(data_path)
+def load_data(season: int, version: str, scoring=None):
+    # only the selected season's partition is read; a scoring format swaps in its cached points column
+    return load_weekly_seasons([season], data_path, store_path, scoring=scoring)
+
+@st.cache_resource #one dense index per season and scoring format, shared by every session and click
+def load_season_index(season: int, version: str, scoring=None):
+    return build_weekly_indexes(load_data(season, version, scoring))
+
+@st.cache_resource #name -> player_id map + sorted names for the pickers
+def load_name_map(season: int, version: str):
+    df = load_data(season, version)
+    name_to_id = (
+        df[["player_name", "player_id"]]
+        .drop_duplicates()
+        .set_index("player_name")["player_id"]
+        .to_dict()
+    )
+    return name_to_id, sorted(name_to_id.keys())
+
+def get_replay_cache() -> ReplayCache:
+    # per session: last results for this user's inputs, bounded LRU
+    if "replay_cache" not in st.session_state:
+        st.session_state["replay_cache"] = ReplayCache(max_entries=32)
+    return st.session_state["replay_cache"]
+
+def data_version() -> str:
+    # sha256 of weekly.csv from the store manifest (a stat call while the CSV is unchanged);
+    # keys every cached loader and replay result so a rebuilt dataset never reuses them
+    return open_store(data_path, store_path).manifest["stamp"]["sha256"]
+
+@st.cache_resource #features are stored per season and only recomputed when rows change
+def load_feature_table(season: int, version: str):
+    return open_feature_store(data_path, store_path).season_feature_table(season)
 
 @st.cache_resource #caches long-lived resources such as ml models
 def load_ml_model():
-    return load_model(model_path)
+    return load_inference_model(model_path)  # compiled copy if present: no sklearn import
+
+@st.cache_resource #precomputed predictions; None if missing or built from another model or dataset
+def load_predictions(version: str):
+    stamp = prediction_data_stamp(open_store(data_path, store_path))
+    return load_prediction_table(predictions_path, load_ml_model(), stamp)
+
+@st.cache_resource #one prediction memo per dataset version, shared by every session
+def load_prediction_memo(version: str):
+    return PredictionMemo(data_stamp=version)
+
+@st.cache_resource #per-position residuals of the season, built once
+def load_residual_model(season: int, version: str, scoring=None):
+    return residuals_from_history(load_data(season, version, scoring))
+
+def pyplot():
+    # matplotlib costs ~0.5 s to import; only the first chart pays for it
+    import matplotlib.pyplot as plt
+    return plt
 
 def plot_lines(x, y1, y2, label1, label2, title):
+    plt = pyplot()
     fig = plt.figure()
     plt.plot(x, y1, label=label1)
     plt.plot(x, y2, label=label2)
@@ -35,6 +101,7 @@ def plot_lines(x, y1, y2, label1, label2, title):
     st.pyplot(fig)
 
 def plot_cumulative(x, cum, title):
+    plt = pyplot()
     fig = plt.figure()
     plt.plot(x, cum, label="Cumulative delta")
     plt.axhline(0, linestyle="--")
@@ -42,17 +109,40 @@ def plot_cumulative(x, cum, title):
     plt.legend()
     st.pyplot(fig)
 
+def plot_bands(x, bands, title):
+    plt = pyplot()
+    lo, mid, hi = (bands[p] for p in sorted(bands))
+    fig = plt.figure()
+    plt.fill_between(x, lo, hi, alpha=0.3, label="10th-90th percentile")
+    plt.plot(x, mid, label="Median cumulative delta")
+    plt.axhline(0, linestyle="--")
+    plt.title(title)
+    plt.legend()
+    st.pyplot(fig)
+
 def main():
     st.title("TradeZone — Trade Regret Simulator + ML")
 
-    df = load_data()
-    st.write("Data loaded!")
+    st.sidebar.subheader("Performance")
+    # per session: only this session's replays are traced (tracing.enable() would flip every session)
+    collect_spans = st.sidebar.checkbox("Collect timing spans", value=tracing.is_enabled(), key="collect_spans")
+    profile_run = st.sidebar.checkbox("Profile the next replay (cProfile)")
+
+    version = data_version()
+    store = load_store(version)
 
-    seasons = sorted(df["season"].unique())
+    # formats whose stat columns the dataset has; "dataset" is its own fantasy_points_ppr
+    scoring = st.sidebar.selectbox("Scoring", ["dataset"] + available_formats(store.columns))
+    scoring = None if scoring == "dataset" else scoring
+
+    seasons = store.seasons
     season = st.selectbox("Season", seasons, index=len(seasons) - 1)
     season = int(season)
 
-    min_w, max_w = get_season_week_range(df, season)
+    df = load_data(season, version, scoring)
+    st.write("Data loaded!")
+
+    min_w, max_w = get_season_week_range(store, season)
 
     # Cap to fantasy weeks (most leagues end by Week 17; Week 18 is regular season but often avoided)
     end_week_cap = min(int(max_w), 17)
@@ -66,17 +156,17 @@ def main():
 
     mode = st.radio(
         "Mode",
-        ["Historical Replay (real points)", "ML Expected Replay (predicted)"]
+        [
+            "Historical Replay (real points)",
+            "ML Expected Replay (predicted)",
+            "Monte Carlo Replay (distribution)",
+            "Trade Week Sweep (every week, real points)",
+        ]
     )
+    if scoring is not None and mode.startswith("ML"):
+        st.caption("The model predicts the dataset's PPR points; the scoring format does not apply to this mode.")
 
-    season_df = df[df["season"] == season]
-    name_to_id = (
-        season_df[["player_name", "player_id"]]
-        .drop_duplicates()
-        .set_index("player_name")["player_id"]
-        .to_dict()
-    )
-    all_names = sorted(name_to_id.keys())
+    name_to_id, all_names = load_name_map(season, version)
 
     st.subheader("Roster")
     roster_names = st.multiselect("Starting roster", all_names, default=all_names[:20])
@@ -86,98 +176,211 @@ def main():
     give_names = st.multiselect("You give away", roster_names)
     get_names = st.multiselect("You receive", [n for n in all_names if n not in roster_names])
 
-    if st.button("Run Simulation"):
-        if not roster_ids or not give_names or not get_names:
+    run_clicked = st.button("Run Simulation")
+    if not roster_ids or not give_names or not get_names:
+        if run_clicked:
             st.error("Please select a roster and trade players.")
-            return
+        show_debug_panel(season, version)
+        show_timing_panel(collect_spans)
+        return
+
+    trade = Trade(
+        week=int(trade_week),
+        give=[name_to_id[n] for n in give_names],
+        get=[name_to_id[n] for n in get_names],
+    )
 
-        trade = Trade(
-            week=int(trade_week),
-            give=[name_to_id[n] for n in give_names],
-            get=[name_to_id[n] for n in get_names],
+    # results already computed for these inputs show up without clicking again
+    model_version = model_fingerprint(load_ml_model()) if mode.startswith("ML") else None
+    # the sweep covers every trade week, so the slider's week is not part of its key
+    key_trade = Trade(week=0, give=trade.give, get=trade.get) if mode.startswith("Trade Week") else trade
+    key_scoring = None if mode.startswith("ML") else scoring
+    # every mode reads the dataset, so a changed weekly.csv must not hit an old result
+    key = replay_key(season, end_week_cap, roster_ids, key_trade, mode, model_version, key_scoring, version)
+    cache = get_replay_cache()
+    res = cache.get(key)
+    with tracing.collecting(collect_spans):
+        if run_clicked and profile_run:
+            # always recompute: a cache hit would profile nothing
+            res, report = tracing.profile(
+                run_replay, mode, df, roster_ids, trade, season, end_week_cap, version, scoring
+            )
+            cache.put(key, res)
+            with st.expander("cProfile: this replay", expanded=True):
+                st.code(report)
+        elif res is None and run_clicked:
+            res = run_replay(mode, df, roster_ids, trade, season, end_week_cap, version, scoring)
+            cache.put(key, res)
+
+    if res is not None:
+        show_result(mode, res, trade_week)
+    show_debug_panel(season, version)
+    show_timing_panel(collect_spans)
+
+def run_replay(mode, df, roster_ids, trade, season, end_week_cap, version, scoring=None):
+    points_index, pos_index, _ = load_season_index(season, version, scoring)
+
+    if mode.startswith("Historical"):
+        return counterfactual_replay(
+            original_roster=roster_ids,
+            trade=trade,
+            points_index=points_index,
+            pos_index=pos_index,
+            season=season,
+            end_week=end_week_cap,
         )
 
-        points_index, pos_index, _ = build_weekly_indexes(df)
+    if mode.startswith("Trade Week"):
+        # both rosters simulated once; every trade week is a suffix sum of the same deltas
+        return trade_week_sweep(
+            original_roster=roster_ids,
+            give=trade.give,
+            get=trade.get,
+            points_index=points_index,
+            pos_index=pos_index,
+            season=season,
+            start_week=int(get_season_week_range(load_store(version), season)[0]),
+            end_week=end_week_cap,
+        )
 
-        if mode.startswith("Historical"):
-            res = counterfactual_replay(
-                original_roster=roster_ids,
-                trade=trade,
-                points_index=points_index,
-                pos_index=pos_index,
-                season=season,
-                end_week=end_week_cap,
-            )
+    if mode.startswith("Monte Carlo"):
+        return monte_carlo_replay(
+            original_roster=roster_ids,
+            trade=trade,
+            points_index=points_index,
+            pos_index=pos_index,
+            season=season,
+            end_week=end_week_cap,
+            error_model=load_residual_model(season, version, scoring),
+            n_sims=10_000,
+            seed=0,  # same inputs -> same distribution on every rerun
+        )
 
-            weekly_with = res["weekly_with_trade"]
-            weekly_without = res["weekly_without_trade"]
-            cumulative = res["cumulative_delta"]
+    # season features come from the feature store, then one model.predict for both rosters
+    return expected_counterfactual_replay(
+        model=load_ml_model(),
+        history_df=load_data(season, version),  # the model was trained on the dataset's points
+        original_roster=roster_ids,
+        trade=trade,
+        season=season,
+        end_week=end_week_cap,  # cap here too
+        optimal_lineup_fn=optimal_lineup_points,
+        feature_table=load_feature_table(season, version),
+        memo=load_prediction_memo(version),
+        prediction_table=load_predictions(version),  # falls back to live inference
+    )
 
-            # IMPORTANT: build x-axis to match returned y length
-            weeks = list(range(int(trade_week), int(trade_week) + len(weekly_with)))
+def show_sweep(res, trade_week):
+    plt = pyplot()
+    weeks = res["trade_weeks"].tolist()
+    totals = res["total_delta"]
+    st.write(f"Best trade week: {res['best_week']} (total delta {res['best_total_delta']:.2f})")
+    if res["best_total_delta"] < 0:
+        st.write("Every trade week loses points: not making this trade was best.")
+    if trade_week in weeks:
+        i = weeks.index(trade_week)
+        st.write(f"Trading in week {trade_week}: total delta {totals[i]:.2f}, regret {res['regret'][i]:.2f} vs the best week")
 
-            st.write("Total delta points:", round(res["total_delta"], 2))
+    fig = plt.figure()
+    plt.bar(weeks, totals, color=["tab:green" if t >= 0 else "tab:red" for t in totals])
+    plt.axhline(0, linestyle="--")
+    plt.xlabel("Trade week")
+    plt.title("Total delta by trade week")
+    st.pyplot(fig)
 
-            plot_lines(
-                weeks,
-                weekly_with,
-                weekly_without,
-                "With trade",
-                "Without trade",
-                "Weekly Points (Historical)",
-            )
-            plot_cumulative(weeks, cumulative, "Cumulative Regret (Historical)")
+    fig = plt.figure()
+    plt.plot(weeks, res["regret"], marker="o", label="Regret vs best week")
+    plt.axvline(res["best_week"], linestyle="--", label="Best week")
+    plt.xlabel("Trade week")
+    plt.title("Regret curve")
+    plt.legend()
+    st.pyplot(fig)
 
-        else:
-            model = load_ml_model()
-
-            roster_without = roster_ids.copy()
-            roster_with = apply_trade_to_roster(roster_ids, trade)
-
-            weekly_without, _ = simulate_expected_points(
-                model=model,
-                history_df=df,
-                roster_ids=roster_without,
-                season=season,
-                start_week=int(trade_week),
-                end_week=end_week_cap,  # cap here too
-                optimal_lineup_fn=optimal_lineup_points,
-            )
+def show_result(mode, res, trade_week):
+    if mode.startswith("Trade Week"):
+        show_sweep(res, int(trade_week))
+        return
 
-            weekly_with, _ = simulate_expected_points(
-                model=model,
-                history_df=df,
-                roster_ids=roster_with,
-                season=season,
-                start_week=int(trade_week),
-                end_week=end_week_cap,  # cap here too
-                optimal_lineup_fn=optimal_lineup_points,
-            )
+    weekly_with = res["weekly_with_trade"]
+    weekly_without = res["weekly_without_trade"]
+    cumulative = res["cumulative_delta"]
 
-            weekly_delta = [w - wo for w, wo in zip(weekly_with, weekly_without)]
-            cumulative = []
-            run = 0.0
-            for d in weekly_delta:
-                run += d
-                cumulative.append(run)
-
-            # IMPORTANT: build x-axis to match returned y length
-            weeks = list(range(int(trade_week), int(trade_week) + len(weekly_with)))
-
-            if cumulative:
-                st.write("Expected total delta points:", round(cumulative[-1], 2))
-            else:
-                st.write("Expected total delta points: N/A (no weeks returned)")
-
-            plot_lines(
-                weeks,
-                weekly_with,
-                weekly_without,
-                "With trade (expected)",
-                "Without trade (expected)",
-                "Expected Weekly Points",
-            )
-            plot_cumulative(weeks, cumulative, "Expected Cumulative Regret")
+    # IMPORTANT: build x-axis to match returned y length
+    weeks = list(range(int(trade_week), int(trade_week) + len(weekly_with)))
+
+    if mode.startswith("Historical"):
+        st.write("Total delta points:", round(res["total_delta"], 2))
+
+        plot_lines(
+            weeks,
+            weekly_with,
+            weekly_without,
+            "With trade",
+            "Without trade",
+            "Weekly Points (Historical)",
+        )
+        plot_cumulative(weeks, cumulative, "Cumulative Regret (Historical)")
+
+    elif mode.startswith("Monte Carlo"):
+        pct = res["total_delta_percentiles"]
+
+        st.write("P(trade is positive):", round(res["prob_positive"], 3))
+        st.write("Total delta p10 / p50 / p90:", *(round(pct[p], 2) for p in sorted(pct)))
+        st.write("Expected shortfall (worst 10%):", round(res["downside_risk"]["expected_shortfall"], 2))
+
+        plot_bands(weeks, res["cumulative_delta_bands"], "Cumulative Regret (Monte Carlo)")
+
+    else:
+        if cumulative:
+            st.write("Expected total delta points:", round(cumulative[-1], 2))
+        else:
+            st.write("Expected total delta points: N/A (no weeks returned)")
+
+        plot_lines(
+            weeks,
+            weekly_with,
+            weekly_without,
+            "With trade (expected)",
+            "Without trade (expected)",
+            "Expected Weekly Points",
+        )
+        plot_cumulative(weeks, cumulative, "Expected Cumulative Regret")
+
+def show_debug_panel(season, version):
+    with st.expander("Debug: cached objects memory"):
+        cache = get_replay_cache()
+        points_index = load_season_index(season, version)[0]
+        memo = load_prediction_memo(version)
+        rows = [
+            ("Season rows (DataFrame)", approx_nbytes(load_data(season, version))),
+            ("Season index (dense arrays + maps)", approx_nbytes(points_index.weekly_index)),
+            ("Name map", approx_nbytes(load_name_map(season, version))),
+            (f"Replay cache ({len(cache)} entries, {cache.hits} hits / {cache.misses} misses)", cache.nbytes),
+            (f"Prediction memo ({len(memo)} entries)", approx_nbytes(memo)),
+        ]
+        st.table({
+            "object": [name for name, _ in rows],
+            "approx size": [format_bytes(n) for _, n in rows],
+        })
+
+def show_timing_panel(show: bool):
+    if not show:
+        return
+    with st.expander("Timing spans"):
+        stats = tracing.summary()
+        if not stats:
+            st.write("No spans recorded yet.")
+            return
+        st.table({
+            "span": list(stats),
+            "calls": [s["count"] for s in stats.values()],
+            "total ms": [f"{s['total_s'] * 1e3:.1f}" for s in stats.values()],
+            "p95 ms": [f"{s['p95_s'] * 1e3:.2f}" for s in stats.values()],
+            "rows": [s["rows"] for s in stats.values()],
+        })
+        st.download_button("Download JSON", tracing.export_json(), file_name="trace_summary.json")
+        if st.button("Reset spans"):
+            tracing.reset()
 
 if __name__ == "__main__":
     main()
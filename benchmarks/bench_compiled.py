@@ -0,0 +1,105 @@
+"""
+Next-week model inference: sklearn Pipeline vs the compiled NumPy model.
+
+    python -m benchmarks.bench_compiled [--model models/next_week_model.joblib]
+
+Uses the trained model if it exists, otherwise fits build_pipeline() on
+synthetic features. Reports per-call predict latency at batch sizes 1, 20,
+1k and 100k (best of a few repeats), the largest difference between the
+two, and cold load time (fresh interpreter: imports + load) for the joblib
+file vs the .npz.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+BATCH_SIZES = [1, 20, 1_000, 100_000]
+
+
+def synthetic_features(n: int, positions: List[str], seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "lag1_points": rng.gamma(2.0, 4.0, n),
+        "roll3_mean": rng.gamma(2.0, 4.0, n),
+        "roll5_mean": rng.gamma(2.0, 4.0, n),
+        "position": rng.choice(positions, n),
+    })
+    for col in ["lag1_points", "roll3_mean", "roll5_mean"]:
+        df.loc[rng.random(n) < 0.1, col] = np.nan   # early-season rows have no history
+    return df
+
+
+def _fit_synthetic(path: str) -> None:
+    import joblib
+
+    from engine.ml.train import build_pipeline
+
+    df = synthetic_features(20_000, ["QB", "RB", "WR", "TE", "K"], seed=1)
+    y = df["roll3_mean"].fillna(5) * 0.8 + np.random.default_rng(2).normal(0, 3, len(df))
+    joblib.dump(build_pipeline().fit(df, y), path)
+
+
+def _per_call_us(fn, X, budget_s: float = 0.5, repeat: int = 3) -> float:
+    calls = max(1, min(2_000, int(200_000 / len(X))))
+    best = float("inf")
+    start_all = time.perf_counter()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(X)
+        best = min(best, (time.perf_counter() - start) / calls)
+        if time.perf_counter() - start_all > budget_s * repeat:
+            break
+    return best * 1e6
+
+
+def _cold_load_ms(code: str) -> float:
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.getcwd())
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str] = None) -> None:
+    import joblib
+
+    from engine.ml.compiled import compile_pipeline, load_compiled_model
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="models/next_week_model.joblib")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    model_file = args.model
+    if not os.path.exists(model_file):
+        model_file = os.path.join(tmp, "model.joblib")
+        print(f"{args.model} not found, fitting on synthetic features")
+        _fit_synthetic(model_file)
+    pipe = joblib.load(model_file)
+    npz = compile_pipeline(pipe).save(os.path.join(tmp, "model.npz"))
+    compiled = load_compiled_model(npz)
+    print(f"{compiled.n_trees} trees, depth <= {compiled.depth}, {len(compiled.value)} nodes")
+
+    positions = list(compiled.categories)
+    X_all = synthetic_features(max(BATCH_SIZES), positions)
+    print(f"{'batch':>7}  {'sklearn us/call':>16}  {'compiled us/call':>17}  {'speedup':>8}  {'max |diff|':>10}")
+    for n in BATCH_SIZES:
+        X = X_all.iloc[:n]
+        diff = float(np.abs(pipe.predict(X) - compiled.predict(X)).max())
+        sk = _per_call_us(pipe.predict, X)
+        co = _per_call_us(compiled.predict, X)
+        print(f"{n:>7}  {sk:>16.1f}  {co:>17.1f}  {sk / co:>7.1f}x  {diff:>10.2e}")
+
+    timer = "import time; t = time.perf_counter(); {}; print((time.perf_counter() - t) * 1e3)"
+    joblib_ms = _cold_load_ms(timer.format(f"import joblib; joblib.load({model_file!r})"))
+    npz_ms = _cold_load_ms(timer.format(f"from engine.ml.compiled import load_compiled_model; load_compiled_model({npz!r})"))
+    print(f"cold load (imports + file): joblib {joblib_ms:.0f} ms, compiled {npz_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Peak memory of CSV ingestion, before vs after chunked compact loading.
+
+    python -m benchmarks.bench_ingest [path/to/weekly.csv] [chunksize]
+
+Without a path it writes a synthetic weekly file (six needed columns plus
+40 stat columns, like the real export) to a temp dir first.
+
+Paths compared, each ending with a WeeklyIndex:
+  - read every column, then select (the old load_weekly_csv)
+  - load_weekly_csv: needed columns only, default dtypes
+  - load_weekly_index: compact dtypes, chunks streamed into WeeklyIndexBuilder
+
+Peak is measured with tracemalloc (NumPy and pandas buffers included);
+wall-clock comes from a separate untraced run, since tracing slows allocation.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from engine.loading_data.load import _coerce_weekly, load_weekly_csv, load_weekly_index, needed_cols
+from engine.loading_data.weekly_index import build_weekly_index
+
+from benchmarks.synthetic import write_weekly_csv
+
+
+def _read_everything(path: str):
+    df = pd.read_csv(path)
+    df = _coerce_weekly(df[needed_cols].copy())
+    return build_weekly_index(df)
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    index = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, seconds, index
+
+
+def main(path: str = None, chunksize: int = 200_000):
+    if path is None:
+        path = write_weekly_csv(
+            os.path.join(tempfile.mkdtemp(), "weekly.csv"),
+            n_seasons=26, n_players=1000, n_weeks=18, n_stat_cols=40,
+        )
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"{path}: {size_mb:.0f} MB")
+
+    cases = [
+        ("read every column (before)", _read_everything, path),
+        ("load_weekly_csv (needed cols)", lambda p: build_weekly_index(load_weekly_csv(p)), path),
+        (f"load_weekly_index (chunks of {chunksize})", load_weekly_index, path, chunksize),
+    ]
+    base = None
+    for name, fn, *args in cases:
+        peak, seconds, index = measure(fn, *args)
+        base = base or peak
+        print(
+            f"{name:40s} peak {peak / 1e6:8.1f} MB ({peak / base:5.2f}x)  "
+            f"{seconds:6.2f} s  index {index.nbytes / 1e6:6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
@@ -0,0 +1,65 @@
+"""
+Lineup solver timing: today's greedy vs solve_lineup (fast path and exact).
+
+    python -m benchmarks.bench_lineup [n_rosters]
+
+The exact path runs on every roster every week of a replay, so it has to
+stay within a small constant factor of optimal_lineup_points.
+"""
+import random
+import sys
+import time
+
+from engine.simulator.lineup import (
+    DEFAULT_LINEUP,
+    SUPERFLEX_LINEUP,
+    lineup_config,
+    optimal_lineup_points,
+    solve_lineup,
+)
+
+# two overlapping flex slots (W/R and W/T) -> not laminar, needs the exact path
+SPLIT_FLEX_LINEUP = lineup_config(
+    {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "WR_RB": 1, "WR_TE": 1},
+    {"WR_RB": {"WR", "RB"}, "WR_TE": {"WR", "TE"}},
+)
+
+
+def random_rosters(n: int, size: int = 16, seed: int = 0):
+    rng = random.Random(seed)
+    rosters = []
+    for _ in range(n):
+        pos = {f"p{i}": rng.choice(["QB", "QB", "RB", "RB", "RB", "WR", "WR", "WR", "TE", "K"]) for i in range(size)}
+        pts = {pid: round(rng.gauss(10, 7), 2) for pid in pos}
+        rosters.append((pts, pos))
+    return rosters
+
+
+def time_per_call(fn, rosters) -> float:
+    start = time.perf_counter()
+    for pts, pos in rosters:
+        fn(pts, pos)
+    return (time.perf_counter() - start) / len(rosters) * 1e6
+
+
+def main(n: int = 20000):
+    rosters = random_rosters(n)
+    cases = [
+        ("greedy optimal_lineup_points", lambda p, q: optimal_lineup_points(p, q)),
+        ("solve_lineup default (fast path)", lambda p, q: solve_lineup(p, q, DEFAULT_LINEUP)),
+        ("solve_lineup default (exact)", lambda p, q: solve_lineup(p, q, DEFAULT_LINEUP, method="exact")),
+        ("solve_lineup superflex (fast path)", lambda p, q: solve_lineup(p, q, SUPERFLEX_LINEUP)),
+        ("solve_lineup superflex (exact)", lambda p, q: solve_lineup(p, q, SUPERFLEX_LINEUP, method="exact")),
+        ("solve_lineup split flex (exact)", lambda p, q: solve_lineup(p, q, SPLIT_FLEX_LINEUP)),
+    ]
+
+    base = None
+    print(f"{n} rosters of 16 players")
+    for name, fn in cases:
+        us = time_per_call(fn, rosters)
+        base = base or us
+        print(f"{name:38s} {us:7.2f} us/call  ({us / base:4.2f}x greedy)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,125 @@
+"""
+Regret report rendering: a pyplot figure per chart vs one reused Agg
+canvas vs the process pool, and the overlay as one LineCollection vs one
+plot() call per curve.
+
+    python -m benchmarks.bench_report [--results 400] [--workers 4] [--curves 3000]
+
+Results are synthetic run_batch rows (see synthetic_results). Reports
+charts/s for each approach (png at the report's default dpi) and the
+overlay render time for both ways of drawing it.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+def synthetic_results(n: int, seed: int = 0, weeks: int = 14) -> List[Dict[str, object]]:
+    """run_batch-style rows with random weekly points; every 50th one failed."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        if i % 50 == 49:
+            rows.append({"job_id": f"job-{i}", "mode": "historical", "season": 2022, "trade_week": 4,
+                         "error": "KeyError: 'unknown player'"})
+            continue
+        trade_week = int(rng.integers(2, 9))
+        n_weeks = weeks - trade_week + 4
+        with_ = rng.normal(100, 12, n_weeks) + rng.normal(0, 3)
+        without = rng.normal(100, 12, n_weeks)
+        rows.append({
+            "job_id": f"job-{i}", "mode": "historical", "season": 2022, "trade_week": trade_week,
+            "end_week": trade_week + n_weeks - 1, "total_delta": float((with_ - without).sum()),
+            "weekly_delta": list(with_ - without), "weekly_with_trade": list(with_),
+            "weekly_without_trade": list(without), "error": None,
+        })
+    return rows
+
+
+def _pyplot_per_chart(records, out_dir: str, dpi: int) -> None:
+    """The straightforward way: a new pyplot figure for every chart."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from engine.visualization.report import CHART_SIZE
+
+    for rec in records:
+        if rec["error"]:
+            continue
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=CHART_SIZE, dpi=dpi, sharex=True)
+        ax1.plot(rec["weeks"], rec["with"], marker="o", label="With trade")
+        ax1.plot(rec["weeks"], rec["without"], marker="o", label="Without trade")
+        ax1.legend()
+        ax1.set_title(rec["label"])
+        ax2.plot(rec["weeks"], rec["cumulative"])
+        ax2.axhline(0, linestyle="--", color="grey")
+        fig.tight_layout()
+        fig.savefig(os.path.join(out_dir, f"{rec['name']}.png"))
+        plt.close(fig)
+
+
+def _overlay_per_curve(records, path: str) -> None:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from engine.visualization.report import OVERLAY_SIZE
+
+    fig = Figure(figsize=OVERLAY_SIZE, dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    for rec in records:
+        if not rec["error"]:
+            ax.plot(rec["weeks"], rec["cumulative"], color="tab:green" if rec["total_delta"] >= 0 else "tab:red",
+                    alpha=0.05, linewidth=0.8)
+    fig.savefig(path)
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None) -> None:
+    from engine.visualization.report import _chart_record, generate_report, render_overlay
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--curves", type=int, default=3000)
+    parser.add_argument("--dpi", type=int, default=80)
+    args = parser.parse_args(argv)
+
+    rows = synthetic_results(args.results)
+    records = [_chart_record(row, n) for n, row in enumerate(rows)]
+    charted = sum(not r["error"] for r in records)
+    tmp = tempfile.mkdtemp()
+    try:
+        pyplot_s = _timed(_pyplot_per_chart, records, tmp, args.dpi)
+        reuse_s = generate_report(rows, os.path.join(tmp, "reuse"), workers=0, dpi=args.dpi)["seconds"]
+        pool_s = generate_report(
+            rows, os.path.join(tmp, "pool"), workers=args.workers, chunk_size=16, dpi=args.dpi
+        )["seconds"]
+        print(f"{charted} charts (png, dpi {args.dpi})")
+        print(f"  pyplot figure per chart   {charted / pyplot_s:8.1f} charts/s")
+        print(f"  reused canvas             {charted / reuse_s:8.1f} charts/s  ({pyplot_s / reuse_s:.1f}x)")
+        print(f"  pool, {args.workers} workers{'':<11}{charted / pool_s:8.1f} charts/s  ({pyplot_s / pool_s:.1f}x)")
+
+        curves = [_chart_record(row, n) for n, row in enumerate(synthetic_results(args.curves, seed=1))]
+        per_curve_s = _timed(_overlay_per_curve, curves, os.path.join(tmp, "per_curve.png"))
+        collection_s = _timed(render_overlay, curves, os.path.join(tmp, "collection"))
+        print(f"overlay of {args.curves} curves")
+        print(f"  plot() per curve          {per_curve_s:8.2f}s")
+        print(f"  one LineCollection        {collection_s:8.2f}s  ({per_curve_s / collection_s:.1f}x)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Worker startup time and memory: pickled WeeklyIndex vs shared memory.
+
+    python -m benchmarks.bench_shared_index [--workers 4] [--seasons 25] [--players 12000]
+
+Builds a synthetic index, then starts a "spawn" process pool twice (spawn
+is what macOS/Windows use, and what you get under most servers): once with
+the index pickled into every worker's initializer, once with only the
+shared-memory block name (attach_weekly_index). Each worker sums every
+point (so all pages are touched) and runs a few counterfactual_replay calls.
+
+Reported:
+  - per-worker load: unpickling the index vs attach_weekly_index, timed
+    in this process (best of 3) so worker start-up noise stays out of it
+  - per pool (plus a "no index" pool for the interpreter + imports floor):
+    wall time until every worker has initialized and run its task, and
+    private / shared RSS per worker from /proc/self/status (Linux only).
+    Private memory is what each worker holds on its own; shared pages
+    exist once no matter how many workers map them.
+"""
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List
+
+import numpy as np
+
+_index = None
+_barrier = None
+
+
+def _rss_kb() -> Dict[str, int]:
+    out = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon", "RssFile", "RssShmem")):
+                    key, value = line.split(":")
+                    out[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return out
+
+
+def _init_pickled(index, barrier):
+    # the index was already unpickled while the worker bootstrapped
+    global _index, _barrier
+    _index, _barrier = index, barrier
+
+
+def _init_shared(name, barrier):
+    global _index, _barrier
+    from engine.loading_data.shared_index import attach_weekly_index
+
+    _index, _barrier = attach_weekly_index(name), barrier
+
+
+def _init_empty(_, barrier):
+    global _barrier
+    # same imports as the other modes
+    import engine.loading_data.shared_index  # noqa: F401
+    import engine.simulator.simulate  # noqa: F401
+    _barrier = barrier
+
+
+def _task(rosters, season, end_week):
+    from engine.simulator.simulate import Trade, counterfactual_replay
+
+    _barrier.wait()   # one task per worker
+    total = float(_index.points.sum()) if _index is not None else 0.0   # touch every page
+    for roster in rosters:
+        trade = Trade(week=5, give=roster[:2], get=roster[-2:])
+        counterfactual_replay(roster[:-2], trade, _index.points_index, _index.pos_index, season, end_week)
+    return os.getpid(), _rss_kb(), total
+
+
+def _run_pool(mode: str, initializer, initarg, workers: int, rosters, season: int, end_week: int):
+    ctx = get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=initializer, initargs=(initarg, ctx.Barrier(workers))) as ex:
+        results = list(ex.map(_task, [rosters] * workers, [season] * workers, [end_week] * workers))
+        ready = time.perf_counter() - start
+    private = [rss.get("RssAnon", 0) / 1024 for _, rss, _ in results]
+    shared = [rss.get("RssShmem", 0) / 1024 for _, rss, _ in results]
+    print(f"  {mode:9s} pool ready {ready:6.2f}s   private RSS {np.mean(private):7.1f} MB/worker"
+          f"   shared RSS {np.mean(shared):6.1f} MB/worker")
+    return {"ready_s": ready, "private_mb": float(np.mean(private)), "shared_mb": float(np.mean(shared))}
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: List[str] = None) -> None:
+    from benchmarks.synthetic import generate_weekly
+    from engine.loading_data.shared_index import attach_weekly_index, publish_weekly_index
+    from engine.loading_data.weekly_index import build_weekly_index
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=25)
+    parser.add_argument("--players", type=int, default=12000)
+    parser.add_argument("--weeks", type=int, default=18)
+    args = parser.parse_args(argv)
+
+    df = generate_weekly(n_seasons=args.seasons, n_players=args.players, n_weeks=args.weeks)
+    index = build_weekly_index(df)
+    season = int(index.seasons[-1])
+    ids = sorted(df.loc[df["season"] == season, "player_id"].unique())
+    del df
+    rng = np.random.default_rng(0)
+    rosters = [list(rng.choice(ids, 18, replace=False)) for _ in range(20)]
+    blob = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"index: {index.points.shape} cells, {index.nbytes / 2**20:.1f} MB arrays, {len(blob) / 2**20:.1f} MB pickled")
+
+    with publish_weekly_index(index) as shared:
+        # what each worker pays to get the index (parent pays dumps once per worker on top)
+        unpickle = _best_of(lambda: pickle.loads(blob))
+        attach = _best_of(lambda: attach_weekly_index(shared.name))
+        print(f"per-worker load: unpickle {unpickle * 1e3:.1f} ms, attach {attach * 1e3:.1f} ms")
+        del blob
+
+        print(f"{args.workers} spawn workers:")
+        _run_pool("no index", _init_empty, None, args.workers, [], season, args.weeks)
+        _run_pool("pickled", _init_pickled, index, args.workers, rosters, season, args.weeks)
+        _run_pool("shared", _init_shared, shared.name, args.workers, rosters, season, args.weeks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Import-time report: what each entry point costs to import, cold.
+
+    python -m benchmarks.import_time [--top 12] [--repeat 3] [--json out.json] [--check]
+
+Every entry point is imported in a fresh interpreter with -X importtime
+(best of --repeat runs). For each one it prints the total, the heaviest
+top-level packages by cumulative time (a package's nested imports are
+counted in its own time too, so pandas includes pyarrow), and which of the
+heavy optional stacks got pulled in.
+
+The ML stack (sklearn, scipy, joblib) and matplotlib should only load on
+first use: --check exits with status 1 if an entry point imports one of
+the modules listed for it in LAZY.
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+APP = "app/streamlit_app.py"
+
+# entry point -> code that imports it
+ENTRY_POINTS = {
+    "engine.run_replay": "import engine.run_replay",
+    "engine.service": "import engine.service",
+    "engine.run_batch": "import engine.run_batch",
+    "engine.simulator.expected": "import engine.simulator.expected",
+    "app (module-level imports)": None,   # filled in from APP by app_imports()
+}
+
+HEAVY = ["pandas", "pyarrow", "streamlit", "joblib", "sklearn", "scipy", "matplotlib"]
+
+# modules an entry point must not import up front
+LAZY = {name: ["sklearn", "scipy", "joblib", "matplotlib"] for name in ENTRY_POINTS}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def app_imports(path: str = APP) -> str:
+    """The app's top-level import statements, without running the script."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, nesting depth) per -X importtime line."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def measure(code: str) -> List[Tuple[str, int, int, int]]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return parse_importtime(out.stderr)
+
+
+def report(code: str, repeat: int = 3, top: int = 12) -> Dict[str, object]:
+    runs = [measure(code) for _ in range(repeat)]
+    # total = sum of the outermost imports; keep the fastest run
+    rows = min(runs, key=lambda r: sum(cum for _, _, cum, depth in r if depth == 0))
+    total_us = sum(cum for _, _, cum, depth in rows if depth == 0)
+
+    packages: Dict[str, int] = {}
+    for name, _, cum, _ in rows:
+        if "." not in name and not name.startswith("_"):
+            packages[name] = max(packages.get(name, 0), cum)
+    imported = {name for name, _, _, _ in rows}
+    return {
+        "total_ms": total_us / 1e3,
+        "modules": len(rows),
+        "top": [(name, us / 1e3) for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]],
+        "heavy": [pkg for pkg in HEAVY if pkg in imported],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write the report here")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a LAZY module is imported eagerly")
+    args = parser.parse_args(argv)
+
+    results, failures = {}, []
+    for name, code in ENTRY_POINTS.items():
+        res = report(code or app_imports(), args.repeat, args.top)
+        results[name] = res
+        print(f"\n{name}: {res['total_ms']:.0f} ms, {res['modules']} modules; heavy: {', '.join(res['heavy']) or '-'}")
+        for pkg, ms in res["top"]:
+            print(f"  {ms:8.1f} ms  {pkg}")
+        eager = [pkg for pkg in LAZY.get(name, []) if pkg in res["heavy"]]
+        if eager:
+            failures.append(f"{name} imports {', '.join(eager)} up front")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    for failure in failures:
+        print("LAZY IMPORT REGRESSION:", failure, file=sys.stderr)
+    return 1 if args.check and failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
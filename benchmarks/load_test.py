@@ -0,0 +1,153 @@
+"""
+Load test for a running replay service (engine/service.py).
+
+    python -m engine.service --preload latest &
+    python -m benchmarks.load_test [--endpoint expected] [--concurrency 32] [--requests 2000]
+
+Opens --concurrency keep-alive connections, each sending requests back to
+back until --requests have been sent in total. Rosters and trades are
+random draws from the season's players (seeded). Reports throughput,
+p50/p90/p99/max latency, errors and the service's micro-batch counters.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+async def _request(reader, writer, method: str, path: str, payload=None) -> Tuple[int, Dict[str, object]]:
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _get(host: str, port: int, path: str) -> Dict[str, object]:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, payload = await _request(reader, writer, "GET", path)
+    finally:
+        writer.close()
+    if status != 200:
+        raise SystemExit(f"GET {path} -> {status}: {payload}")
+    return payload
+
+
+def make_bodies(
+    players: List[Dict[str, str]],
+    season: int,
+    n: int,
+    endpoint: str,
+    roster_size: int = 16,
+    batch_trades: int = 50,
+    seed: int = 0,
+) -> List[Dict[str, object]]:
+    """n random request bodies: a roster plus a 1-2 player trade (or batch_trades trades)."""
+    rng = np.random.default_rng(seed)
+    ids = np.array([p["player_id"] for p in players])
+
+    def trade(roster, others):
+        k = int(rng.integers(1, 3))
+        return {"week": int(rng.integers(3, 12)), "give": roster[:k], "get": list(rng.choice(others, k, replace=False))}
+
+    bodies = []
+    for _ in range(n):
+        picked = rng.choice(ids, roster_size + 60, replace=False).tolist()
+        roster, others = picked[:roster_size], picked[roster_size:]
+        body = {"season": season, "roster": roster}
+        if endpoint == "batch":
+            body["trades"] = [trade(list(rng.permutation(roster)), others) for _ in range(batch_trades)]
+        else:
+            body["trade"] = trade(roster, others)
+        bodies.append(body)
+    return bodies
+
+
+async def run_load(host: str, port: int, path: str, bodies: List[Dict[str, object]], concurrency: int):
+    latencies: List[float] = []
+    errors: Dict[int, int] = {}
+    queue = list(reversed(bodies))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                body = queue.pop()
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, "POST", path, body)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors[status] = errors.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _pct(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def main_async(args) -> int:
+    health = await _get(args.host, args.port, "/health")
+    season = args.season or health["seasons"][-1]
+    players = (await _get(args.host, args.port, f"/players?season={season}"))["players"]
+    bodies = make_bodies(players, season, args.requests + args.warmup, args.endpoint, seed=args.seed)
+    path = f"/replay/{args.endpoint}"
+
+    if args.warmup:
+        await run_load(args.host, args.port, path, bodies[:args.warmup], min(args.concurrency, args.warmup))
+    before = (await _get(args.host, args.port, "/stats"))["micro_batch"]
+
+    latencies, errors, elapsed = await run_load(args.host, args.port, path, bodies[args.warmup:], args.concurrency)
+    after = (await _get(args.host, args.port, "/stats"))["micro_batch"]
+
+    ms = [t * 1e3 for t in latencies]
+    print(f"{path}: {len(ms)} requests, concurrency {args.concurrency}, season {season}")
+    print(f"  throughput  {len(ms) / elapsed:10.1f} req/s  ({elapsed:.2f}s)")
+    print(f"  latency ms  p50 {_pct(ms, 50):.2f}  p90 {_pct(ms, 90):.2f}  p99 {_pct(ms, 99):.2f}"
+          f"  max {max(ms, default=0.0):.2f}  mean {statistics.fmean(ms) if ms else 0.0:.2f}")
+    batches = after["batches"] - before["batches"]
+    if batches:
+        per_batch = (after["requests"] - before["requests"]) / batches
+        print(f"  model calls {batches} ({per_batch:.1f} requests per predict)")
+    if errors:
+        print(f"  errors      {errors}")
+        return 1
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test a local replay service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoint", choices=["historical", "expected", "batch"], default="historical")
+    parser.add_argument("--season", type=int, default=None, help="default: latest season")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Benchmark suite: core pipeline steps at several data sizes, on synthetic data.
+
+    python -m benchmarks.suite run [--sizes small,medium] [--repeat 3] [--out results.json]
+    python -m benchmarks.suite compare results.json [--baseline benchmarks/baseline.json] [--threshold 0.25]
+
+run generates a deterministic weekly file per size (benchmarks.synthetic),
+then times load_weekly_csv, build_weekly_indexes, make_features,
+optimal_lineup_points, counterfactual_replay and simulate_expected_points.
+Each step runs --repeat times; min and median seconds are stored per call.
+
+compare exits with status 1 if any step is more than --threshold slower
+(on min seconds) than the baseline. Differences under --min-seconds are
+ignored as noise. Timings are machine-specific: regenerate the baseline on
+the machine you compare on with `run --out benchmarks/baseline.json`.
+
+Everything runs offline; the ML step trains a small model on the synthetic
+features (not timed).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_weekly_csv
+
+baseline_path = "benchmarks/baseline.json"
+
+# (n_seasons, n_players, n_weeks)
+SIZES = {
+    "small": (3, 300, 17),
+    "medium": (10, 1000, 17),
+    "large": (25, 2000, 18),
+}
+
+
+def _time(fn: Callable[..., object], repeat: int, args_list: List[tuple] = ((),)) -> Dict[str, float]:
+    """Seconds per call; each repeat calls fn once per entry of args_list."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            fn(*args)
+        samples.append((time.perf_counter() - start) / len(args_list))
+    return {"min": min(samples), "median": statistics.median(samples), "calls": len(args_list)}
+
+
+def _sample_rosters(df: pd.DataFrame, season: int, n: int, size: int = 16, seed: int = 0) -> List[List[str]]:
+    players = sorted(df.loc[df["season"] == season, "player_id"].unique())
+    rng = np.random.default_rng(seed)
+    return [list(rng.choice(players, size, replace=False)) for _ in range(n)]
+
+
+def run_size(name: str, repeat: int, workdir: str) -> Tuple[int, Dict[str, Dict[str, float]]]:
+    from engine.loading_data.load import build_weekly_indexes, load_weekly_csv
+    from engine.ml.features import make_features
+    from engine.ml.train import build_pipeline, cat_cols, num_cols
+    from engine.simulator.expected import simulate_expected_points
+    from engine.simulator.lineup import optimal_lineup_points
+    from engine.simulator.simulate import Trade, build_roster_week_views, counterfactual_replay
+
+    n_seasons, n_players, n_weeks = SIZES[name]
+    path = write_weekly_csv(
+        os.path.join(workdir, f"weekly_{name}.csv"),
+        n_seasons=n_seasons, n_players=n_players, n_weeks=n_weeks,
+    )
+
+    df = load_weekly_csv(path)
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    feat = make_features(df)
+    season = int(df["season"].max())
+    rosters = _sample_rosters(df, season, 50)
+
+    results = {}
+    results["load_weekly_csv"] = _time(lambda: load_weekly_csv(path), repeat)
+    results["build_weekly_indexes"] = _time(lambda: build_weekly_indexes(df), repeat)
+    results["make_features"] = _time(lambda: make_features(df), repeat)
+
+    week_views = [
+        build_roster_week_views(r, points_index[(season, wk)], pos_index[(season, wk)])
+        for r in rosters
+        for wk in range(1, n_weeks + 1)
+    ]
+    results["optimal_lineup_points"] = _time(optimal_lineup_points, repeat, week_views)
+
+    # 2-for-2 trades with the next roster, from week 6 to the end of the season
+    trades = [Trade(week=6, give=r[:2], get=o[:2]) for r, o in zip(rosters, rosters[1:] + rosters[:1])]
+    results["counterfactual_replay"] = _time(
+        lambda r, t: counterfactual_replay(r, t, points_index, pos_index, season, n_weeks),
+        repeat,
+        list(zip(rosters[:10], trades)),
+    )
+
+    model = build_pipeline({"max_iter": 30})
+    model.fit(feat[num_cols + cat_cols], feat["y_next_week"])
+    results["simulate_expected_points"] = _time(
+        lambda: simulate_expected_points(model, df, rosters[0], season, 6, n_weeks, optimal_lineup_points),
+        repeat,
+    )
+    return len(df), results
+
+
+def run(sizes: List[str], repeat: int, out: str) -> Dict[str, object]:
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": repeat,
+        },
+        "sizes": {},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in sizes:
+            start = time.perf_counter()
+            n_rows, report["results"][name] = run_size(name, repeat, workdir)
+            n_seasons, n_players, n_weeks = SIZES[name]
+            report["sizes"][name] = {"seasons": n_seasons, "players": n_players, "weeks": n_weeks, "rows": n_rows}
+            print(f"{name} ({n_rows} rows): done in {time.perf_counter() - start:.1f}s")
+            for bench, t in report["results"][name].items():
+                print(f"  {bench:26s} {t['min'] * 1e3:10.3f} ms/call (median {t['median'] * 1e3:.3f})")
+
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Saved:", out)
+    return report
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], threshold: float, min_seconds: float) -> List[str]:
+    """Returns 'size/bench' names that regressed, printing a comparison table."""
+    regressions = []
+    print(f"{'benchmark':38s} {'baseline ms':>12s} {'current ms':>12s} {'ratio':>7s}")
+    for size, benches in current["results"].items():
+        base_benches = baseline["results"].get(size, {})
+        for bench, t in benches.items():
+            if bench not in base_benches:
+                continue
+            old, new = base_benches[bench]["min"], t["min"]
+            ratio = new / old if old > 0 else float("inf")
+            regressed = ratio > 1 + threshold and new - old > min_seconds
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{size + '/' + bench:38s} {old * 1e3:12.3f} {new * 1e3:12.3f} {ratio:7.2f}{flag}")
+            if regressed:
+                regressions.append(f"{size}/{bench}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="time every step and write JSON")
+    p_run.add_argument("--sizes", default="small,medium", help=f"comma list of {', '.join(SIZES)}")
+    p_run.add_argument("--repeat", type=int, default=3)
+    p_run.add_argument("--out", default="benchmark_results.json")
+
+    p_cmp = sub.add_parser("compare", help="flag regressions against a stored baseline")
+    p_cmp.add_argument("results")
+    p_cmp.add_argument("--baseline", default=baseline_path)
+    p_cmp.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    p_cmp.add_argument("--min-seconds", type=float, default=0.001, help="ignore differences below this")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+        unknown = [s for s in sizes if s not in SIZES]
+        if unknown:
+            parser.error(f"unknown sizes {unknown}; choose from {list(SIZES)}")
+        run(sizes, args.repeat, args.out)
+        return 0
+
+    with open(args.results) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold, args.min_seconds)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
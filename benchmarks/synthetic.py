@@ -0,0 +1,106 @@
+"""
+Deterministic synthetic weekly stat files, shaped like dataset/weekly.csv.
+
+    python -m benchmarks.synthetic out.csv [n_seasons] [n_players] [n_weeks]
+
+Every player has a fixed position and skill for all seasons and plays about
+85% of weeks; points are skill plus noise, rounded to 2 decimals like the
+real export. Same arguments + seed -> byte-identical file.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+POSITIONS = ["QB", "RB", "WR", "TE", "K"]
+POSITION_WEIGHTS = [0.12, 0.25, 0.33, 0.15, 0.15]
+POSITION_MEAN = {"QB": 17.0, "RB": 10.0, "WR": 10.0, "TE": 7.0, "K": 8.0}
+
+
+def generate_weekly(
+    n_seasons: int = 3,
+    n_players: int = 300,
+    n_weeks: int = 17,
+    seed: int = 0,
+    n_stat_cols: int = 0,
+    first_season: int = 2000,
+    raw_stats: bool = False,
+) -> pd.DataFrame:
+    """
+    One row per (season, week, player) the player appears in, columns:
+    season, week, player_id, player_name, position, fantasy_points_ppr,
+    plus n_stat_cols unused stat columns (for ingestion benchmarks).
+
+    raw_stats=True adds the box-score columns the scoring presets read
+    (passing_yards, receptions, ...) drawn per position around each
+    player's skill, and fantasy_points_ppr is then the PPR score of them.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(POSITIONS, n_players, p=POSITION_WEIGHTS)
+    skill = np.array([POSITION_MEAN[p] for p in positions]) * rng.gamma(4.0, 0.25, n_players)
+
+    season, week, player = np.meshgrid(
+        np.arange(first_season, first_season + n_seasons),
+        np.arange(1, n_weeks + 1),
+        np.arange(n_players),
+        indexing="ij",
+    )
+    season, week, player = season.ravel(), week.ravel(), player.ravel()
+    plays = rng.random(len(player)) < 0.85
+    season, week, player = season[plays], week[plays], player[plays]
+
+    points = np.maximum(skill[player] + rng.normal(0.0, 6.0, len(player)), -2.0)
+    df = pd.DataFrame({
+        "season": season,
+        "week": week,
+        "player_id": np.char.add("00-00", np.char.zfill(player.astype(str), 5)),
+        "player_name": np.char.add("Player ", player.astype(str)),
+        "position": positions[player],
+        "fantasy_points_ppr": np.round(points, 2),
+    })
+    for i in range(n_stat_cols):
+        df[f"stat_{i}"] = np.round(rng.normal(0.0, 10.0, len(df)), 1)
+    if raw_stats:
+        _add_raw_stats(df, skill[player] / df["position"].map(POSITION_MEAN).to_numpy(), seed)
+    return df
+
+
+# position -> stat -> mean per game for an average player (yards scale with skill)
+STAT_MEANS = {
+    "QB": {"passing_yards": 240, "passing_tds": 1.6, "interceptions": 0.8, "rushing_yards": 15,
+           "rushing_tds": 0.1, "sack_fumbles_lost": 0.15, "passing_2pt_conversions": 0.05},
+    "RB": {"rushing_yards": 60, "rushing_tds": 0.45, "receptions": 3.0, "receiving_yards": 22,
+           "receiving_tds": 0.12, "rushing_fumbles_lost": 0.05, "rushing_2pt_conversions": 0.02},
+    "WR": {"receptions": 4.5, "receiving_yards": 58, "receiving_tds": 0.4, "rushing_yards": 2,
+           "receiving_fumbles_lost": 0.03, "receiving_2pt_conversions": 0.02, "special_teams_tds": 0.01},
+    "TE": {"receptions": 3.5, "receiving_yards": 38, "receiving_tds": 0.3, "receiving_fumbles_lost": 0.02,
+           "receiving_2pt_conversions": 0.01},
+    "K": {},
+}
+
+
+def _add_raw_stats(df: pd.DataFrame, form: np.ndarray, seed: int) -> None:
+    from engine.loading_data.scoring import PRESETS, score_frame
+
+    # own generator, so files without raw stats stay byte-identical
+    rng = np.random.default_rng(seed + 1)
+    positions = df["position"].to_numpy()
+    for col in PRESETS["ppr"].stat_columns:
+        mean = np.array([STAT_MEANS[p].get(col, 0.0) for p in POSITIONS])[pd.Categorical(positions, POSITIONS).codes]
+        if col.endswith("_yards"):
+            df[col] = np.round(np.maximum(rng.normal(mean * form, mean * 0.4 + 1e-9), -5.0)).astype(int)
+        else:
+            df[col] = rng.poisson(mean * np.where(col == "interceptions", 1.0, form))
+    df["fantasy_points_ppr"] = np.round(score_frame(df, "ppr"), 2)
+
+
+def write_weekly_csv(path: str, **kwargs) -> str:
+    generate_weekly(**kwargs).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[2:5]]
+    keys = ["n_seasons", "n_players", "n_weeks"]
+    out = write_weekly_csv(sys.argv[1], **dict(zip(keys, args)))
+    print("Wrote", out)
@@ -1,18 +1,113 @@
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
 import pandas as pd
 
-def load_weekly_csv(path: str = "dataset/weekly.csv") -> pd.DataFrame:
-    df = pd.read_csv(path)
-
-    needed_cols = [
-        "season",
-        "week",
-        "player_id",
-        "player_name",
-        "position",
-        "fantasy_points_ppr",
-    ]
+from engine.tracing import traced
+
+from engine.loading_data.scoring import Scoring, apply_scoring, points_col, resolve_scoring, score_frame, scored_points
+from engine.loading_data.weekly_index import WeeklyIndex, WeeklyIndexBuilder, build_weekly_index
+
+needed_cols = [
+    "season",
+    "week",
+    "player_id",
+    "player_name",
+    "position",
+    "fantasy_points_ppr",
+]
+
+# compact dtypes for the chunked path: ids/names/positions repeat a lot
+compact_dtypes = {
+    "season": np.int16,
+    "week": np.int16,
+    "player_id": "category",
+    "player_name": "category",
+    "position": "category",
+    "fantasy_points_ppr": np.float32,
+}
+
+def _source_cols(scoring: Scoring):
+    """CSV columns to read: needed_cols plus the format's stat columns."""
+    rules = resolve_scoring(scoring)
+    extra = [c for c in rules.stat_columns if c not in needed_cols] if rules is not None else []
+    return rules, needed_cols + extra
+
+
+@traced("load.csv", rows=len)
+def load_weekly_csv(
+    path: str = "dataset/weekly.csv",
+    compact: bool = False,
+    chunksize: int = 500_000,
+    scoring: Scoring = None,
+) -> pd.DataFrame:
+    """
+    Reads the needed columns of the weekly CSV.
+
+    compact=True streams the file in chunks with compact dtypes (see
+    compact_dtypes) instead of object strings and float64.
+
+    scoring (a format from scoring.py) also reads that format's stat
+    columns and puts its points in fantasy_points_ppr.
+    """
+    if compact:
+        chunks = list(iter_weekly_chunks(path, chunksize, scoring))
+        if not chunks:
+            return pd.read_csv(path, usecols=needed_cols, dtype=compact_dtypes)
+        # categories differ per chunk; union them so the result stays categorical
+        cat_cols = [c for c, t in compact_dtypes.items() if t == "category"]
+        for col in cat_cols:
+            merged = pd.api.types.union_categoricals([c[col] for c in chunks])
+            for c in chunks:
+                c[col] = c[col].cat.set_categories(merged.categories)
+        return pd.concat(chunks, ignore_index=True)
+
+    rules, cols = _source_cols(scoring)
+    df = pd.read_csv(path, usecols=cols)
+    if rules is not None:
+        df[points_col] = score_frame(df, rules)
     df = df[needed_cols].copy()
+    return _coerce_weekly(df)
+
+
+def iter_weekly_chunks(
+    path: str = "dataset/weekly.csv",
+    chunksize: int = 500_000,
+    scoring: Scoring = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields the needed columns of the CSV, chunksize rows at a time, with
+    compact dtypes. Missing points become 0.0 (same as load_weekly_csv).
+    With a scoring format, points are that format's (scored per chunk).
+    """
+    rules, cols = _source_cols(scoring)
+    reader = pd.read_csv(path, usecols=cols, dtype=compact_dtypes, chunksize=chunksize)
+    for chunk in reader:
+        if rules is not None:
+            chunk[points_col] = score_frame(chunk, rules).astype(np.float32)
+        yield chunk[needed_cols].fillna({points_col: 0.0})
+
+
+@traced("load.stream")
+def load_weekly_index(
+    path: str = "dataset/weekly.csv",
+    chunksize: int = 500_000,
+    scoring: Scoring = None,
+) -> WeeklyIndex:
+    """
+    Streams the CSV chunk by chunk straight into a WeeklyIndex (float32 points),
+    without ever holding the whole table as a DataFrame.
 
+    index.points_index / index.pos_index / index.name_by_id are the same
+    lookups build_weekly_indexes returns.
+    """
+    builder = WeeklyIndexBuilder()
+    for chunk in iter_weekly_chunks(path, chunksize, scoring):
+        builder.add(chunk)
+    return builder.build()
+
+
+def _coerce_weekly(df: pd.DataFrame) -> pd.DataFrame:
     df["season"] = df["season"].astype(int)
     df["week"] = df["week"].astype(int)
     df["player_id"] = df["player_id"].astype(str)
@@ -23,7 +118,33 @@ def load_weekly_csv(path: str = "dataset/weekly.csv") -> pd.DataFrame:
     return df
 
 
-def build_weekly_indexes(df: pd.DataFrame):
+@traced("load.store", rows=len)
+def load_weekly_seasons(
+    seasons: Optional[Iterable[int]] = None,
+    path: str = "dataset/weekly.csv",
+    store_dir: str = "dataset/weekly_store",
+    scoring: Scoring = None,
+) -> pd.DataFrame:
+    """
+    Same columns/dtypes as load_weekly_csv, but only for the given seasons.
+
+    Reads from the season-partitioned store (see store.py), building or
+    refreshing it from the CSV first if the CSV changed. With a scoring
+    format, points come from the format's per-season cache next to the
+    store (computed from the store's stat columns on first use), so
+    switching formats never reparses the CSV.
+    """
+    from engine.loading_data.store import open_store
+
+    store = open_store(path, store_dir)
+    seasons = store.seasons if seasons is None else [int(s) for s in seasons]
+    df = _coerce_weekly(store.load(seasons=seasons, columns=needed_cols))
+    if scoring is not None:
+        df[points_col] = scored_points(store, seasons, scoring)
+    return df
+
+
+def build_weekly_indexes(df: pd.DataFrame, scoring: Scoring = None):
     """
     Turns the DataFrame into fast lookup structures:
 
@@ -33,41 +154,31 @@ def build_weekly_indexes(df: pd.DataFrame):
 
     Why do this?
       - DataFrame filtering each time is slow and annoying.
-      - Dict lookups are fast and simple for a simulator.
-    """
-    points_index = {}
-    pos_index = {}
-    name_by_id = {}
+      - Lookups by (season, week) then player_id are simple for a simulator.
 
-    # Iterate row by row (beginner-friendly + explicit)
-    for _, row in df.iterrows():
-        season = int(row["season"])
-        week = int(row["week"])
-        player_id = str(row["player_id"])
-        player_name = str(row["player_name"])
-        position = str(row["position"])
-        points = float(row["fantasy_points_ppr"])
+    points_index / pos_index are read-only views over a dense WeeklyIndex
+    (see weekly_index.py), built with vectorized ops instead of iterrows().
+    They behave like the nested dicts (get/[]/in/iteration) but use a few
+    NumPy arrays instead of millions of small Python objects.
 
-        key = (season, week)
-
-        if key not in points_index:
-            points_index[key] = {}
-            pos_index[key] = {}
-
-        points_index[key][player_id] = points
-        pos_index[key][player_id] = position
-
-        # Keep a mapping for UI/debug
-        # (If a player name repeats, it's fine — it should be consistent)
-        name_by_id[player_id] = player_name
-
-    return points_index, pos_index, name_by_id
+    scoring re-scores df's rows (it needs the format's stat columns) before
+    indexing; leave it None when df already came from a loader with the
+    format applied.
+    """
+    index = build_weekly_index(apply_scoring(df, scoring))
+    return index.points_index, index.pos_index, index.name_by_id
 
 
-def get_season_week_range(df: pd.DataFrame, season: int):
+def get_season_week_range(df, season: int):
     """
     Returns (min_week, max_week) for a given season present in the data.
+
+    `df` can also be a WeeklyStore, in which case the answer comes from the
+    partition metadata and no rows are read.
     """
+    if hasattr(df, "season_week_range"):
+        return df.season_week_range(season)
+
     season_df = df[df["season"] == season]
     if len(season_df) == 0:
         raise ValueError(f"No rows found for season={season}")
@@ -0,0 +1,300 @@
+"""
+League scoring formats: fantasy points computed from the raw stat columns.
+
+A format is a ScoringRules: points per unit of each stat column, plus
+optional per-position extras (TE premium = +0.5 per reception for TEs).
+Every player-week is scored at once: the rows' stat matrix times the
+weight vector (or, with per-position extras, a row-wise dot product with
+that row's position's weights).
+
+    from engine.loading_data.load import load_weekly_seasons
+    df = load_weekly_seasons([2022], scoring="half_ppr")
+
+Anything that takes scoring= accepts a preset name (see PRESETS), a path
+to a JSON spec ({"name", "weights", "position_weights"?}), a dict of the
+same shape or a ScoringRules. None means the dataset's own
+fantasy_points_ppr column, untouched.
+
+The result always goes into the points column (fantasy_points_ppr), so
+indexes, features and replays work on any format unchanged.
+
+Points from the season store are cached on disk next to it, one .npy per
+season in row order, keyed by the rules hash:
+
+  dataset/weekly_store/points/<rules hash>/
+    _meta.json                  rules + sha256 of the CSV they were scored from
+    season=2022.npy
+
+so switching formats reads one small array per season and never reparses
+the CSV. The cache is dropped when the CSV changes.
+
+Run `python -m engine.loading_data.scoring [format ...]` to fill the cache
+for every season up front.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from engine.tracing import traced
+
+points_col = "fantasy_points_ppr"
+points_dir_name = "points"
+
+_FUMBLES = ["sack_fumbles_lost", "rushing_fumbles_lost", "receiving_fumbles_lost"]
+_TWO_POINT = ["passing_2pt_conversions", "rushing_2pt_conversions", "receiving_2pt_conversions"]
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """
+    weights: stat column -> points per unit, for every player.
+    position_weights: position -> {stat column -> extra points per unit},
+    added on top of weights for that position only.
+    """
+    name: str
+    weights: Mapping[str, float]
+    position_weights: Mapping[str, Mapping[str, float]] = field(default_factory=dict)
+
+    @property
+    def stat_columns(self) -> List[str]:
+        cols = set(self.weights)
+        for extra in self.position_weights.values():
+            cols.update(extra)
+        return sorted(cols)
+
+    @property
+    def rules_hash(self) -> str:
+        """Content hash of the weights (not the name): same rules, same cached points."""
+        spec = {
+            "weights": {k: float(v) for k, v in sorted(self.weights.items())},
+            "position_weights": {
+                pos: {k: float(v) for k, v in sorted(extra.items())}
+                for pos, extra in sorted(self.position_weights.items())
+            },
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    def weight_table(self) -> Tuple[List[str], np.ndarray]:
+        """
+        (positions, W): W[i] is the weight vector over stat_columns for
+        positions[i]; the last row is for every other position.
+        """
+        cols = self.stat_columns
+        positions = sorted(self.position_weights)
+        base = np.array([self.weights.get(c, 0.0) for c in cols], dtype=np.float64)
+        table = np.tile(base, (len(positions) + 1, 1))
+        for i, pos in enumerate(positions):
+            table[i] += [self.position_weights[pos].get(c, 0.0) for c in cols]
+        return positions, table
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "weights": dict(self.weights),
+            "position_weights": {pos: dict(extra) for pos, extra in self.position_weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, spec: Mapping[str, object]) -> "ScoringRules":
+        if not spec.get("weights"):
+            raise ValueError("scoring spec needs a non-empty 'weights' mapping")
+        return cls(
+            name=str(spec.get("name", "custom")),
+            weights={str(k): float(v) for k, v in spec["weights"].items()},
+            position_weights={
+                str(pos): {str(k): float(v) for k, v in extra.items()}
+                for pos, extra in (spec.get("position_weights") or {}).items()
+            },
+        )
+
+
+_STANDARD = {
+    "passing_yards": 0.04,
+    "passing_tds": 4.0,
+    "interceptions": -2.0,
+    "rushing_yards": 0.1,
+    "rushing_tds": 6.0,
+    "receptions": 0.0,
+    "receiving_yards": 0.1,
+    "receiving_tds": 6.0,
+    "special_teams_tds": 6.0,
+    **{col: -2.0 for col in _FUMBLES},
+    **{col: 2.0 for col in _TWO_POINT},
+}
+
+PRESETS: Dict[str, ScoringRules] = {
+    "standard": ScoringRules("standard", _STANDARD),
+    "half_ppr": ScoringRules("half_ppr", {**_STANDARD, "receptions": 0.5}),
+    "ppr": ScoringRules("ppr", {**_STANDARD, "receptions": 1.0}),
+    "ppr_6pt_pass_td": ScoringRules("ppr_6pt_pass_td", {**_STANDARD, "receptions": 1.0, "passing_tds": 6.0}),
+    "te_premium": ScoringRules("te_premium", {**_STANDARD, "receptions": 1.0}, {"TE": {"receptions": 0.5}}),
+}
+
+Scoring = Union[None, str, Mapping[str, object], ScoringRules]
+
+
+def resolve_scoring(scoring: Scoring) -> Optional[ScoringRules]:
+    """ScoringRules for a preset name, JSON spec path, dict or ScoringRules; None stays None."""
+    if scoring is None or isinstance(scoring, ScoringRules):
+        return scoring
+    if isinstance(scoring, str):
+        if scoring in PRESETS:
+            return PRESETS[scoring]
+        if not os.path.exists(scoring):
+            raise ValueError(f"unknown scoring format {scoring!r}; presets: {sorted(PRESETS)}")
+        with open(scoring) as f:
+            return ScoringRules.from_dict(json.load(f))
+    return ScoringRules.from_dict(scoring)
+
+
+def missing_stats(rules: ScoringRules, columns: Iterable[str]) -> List[str]:
+    have = set(columns)
+    return [c for c in rules.stat_columns if c not in have]
+
+
+def available_formats(columns: Iterable[str]) -> List[str]:
+    """Preset names whose stat columns are all present in columns."""
+    columns = list(columns)
+    return [name for name, rules in PRESETS.items() if not missing_stats(rules, columns)]
+
+
+def score_stats(stats: np.ndarray, positions, rules: ScoringRules) -> np.ndarray:
+    """
+    Points per row of stats (rows x rules.stat_columns, NaN counts as 0).
+    positions is only read when the rules have per-position weights.
+    """
+    stats = np.nan_to_num(np.asarray(stats, dtype=np.float64), copy=False)
+    table_positions, table = rules.weight_table()
+    if not table_positions:
+        return stats @ table[0]
+    codes = pd.Categorical(np.asarray(positions, dtype=object), categories=table_positions).codes
+    rows = np.where(codes < 0, len(table_positions), codes)   # other positions -> last row
+    return np.einsum("ij,ij->i", stats, table[rows])
+
+
+@traced("scoring.score", rows=len)
+def score_frame(df: pd.DataFrame, scoring: Scoring) -> np.ndarray:
+    """Points of every row of df under a format; df needs the format's stat columns + position."""
+    rules = resolve_scoring(scoring)
+    missing = missing_stats(rules, df.columns)
+    if missing:
+        raise ValueError(f"scoring format {rules.name!r} needs stat columns missing from the data: {missing}")
+    stats = df[rules.stat_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    return score_stats(stats, df["position"] if rules.position_weights else None, rules)
+
+
+def apply_scoring(df: pd.DataFrame, scoring: Scoring) -> pd.DataFrame:
+    """df with its points column replaced by the format's points (df itself if scoring is None)."""
+    if scoring is None:
+        return df
+    out = df.copy()
+    out[points_col] = score_frame(df, scoring).astype(df[points_col].dtype if points_col in df else np.float64)
+    return out
+
+
+def _cache_source(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, "_meta.json")) as f:
+            return json.load(f).get("source_sha256")
+    except (OSError, ValueError):
+        return None
+
+
+def _replace_dir(path: str, meta: Dict[str, object]) -> None:
+    """Swaps in a new directory holding only _meta.json (os.replace can't replace a non-empty one)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    with open(os.path.join(tmp, "_meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    stale = tmp[:-len(".tmp")] + ".stale"
+    try:
+        os.rename(path, stale)
+    except OSError:
+        stale = None             # not there, or another session moved it first
+    try:
+        os.rename(tmp, path)
+    except OSError:              # another session's directory landed first
+        shutil.rmtree(tmp, ignore_errors=True)
+    if stale is not None:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def _cache_dir(store, rules: ScoringRules) -> str:
+    """
+    The format's cache directory, replaced by an empty one if it was scored
+    from another CSV. The new one is built in a temp directory and renamed
+    into place, so concurrent sessions never see it half-built or delete
+    each other's files.
+    """
+    path = os.path.join(store.store_dir, points_dir_name, rules.rules_hash)
+    source = store.manifest.get("stamp", {}).get("sha256")
+    if _cache_source(path) == source:
+        return path
+    for _ in range(5):   # another session may swap in its own directory meanwhile
+        _replace_dir(path, {"rules": rules.to_dict(), "source_sha256": source})
+        if _cache_source(path) == source:
+            return path
+    raise OSError(f"could not replace the points cache at {path}")
+
+
+def season_points(store, season: int, scoring: Scoring) -> np.ndarray:
+    """
+    Points of every row of a season partition (store row order) under a
+    format, from the disk cache or computed once from the store's stat
+    columns and cached.
+    """
+    rules = resolve_scoring(scoring)
+    path = os.path.join(_cache_dir(store, rules), f"season={int(season)}.npy")
+    try:
+        return np.load(path)
+    except FileNotFoundError:
+        pass   # not cached yet, or its directory was just swapped out by a rebuild
+
+    missing = missing_stats(rules, store.columns)
+    if missing:
+        raise ValueError(f"scoring format {rules.name!r} needs stat columns missing from the store: {missing}")
+    cols = rules.stat_columns + (["position"] if rules.position_weights else [])
+    points = score_frame(store.load([season], columns=cols), rules)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"   # sessions may be threads of one process
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, points)
+        os.replace(tmp, path)   # readers never see a half-written file
+    except OSError:
+        pass   # the directory was swapped out by another session's rebuild; the cache is optional
+    return points
+
+
+def scored_points(store, seasons: Iterable[int], scoring: Scoring) -> np.ndarray:
+    """season_points for several seasons, concatenated in the order store.load(seasons) returns rows."""
+    parts = [season_points(store, season, scoring) for season in seasons]
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def main(argv: Optional[List[str]] = None):
+    import sys
+    import time
+
+    from engine.loading_data.store import open_store
+
+    store = open_store()
+    names = (argv if argv is not None else sys.argv[1:]) or available_formats(store.columns)
+    if not names:
+        print("No preset's stat columns are all in the store; pass a JSON spec path instead.")
+    for name in names:
+        start = time.perf_counter()
+        for season in store.seasons:
+            season_points(store, season, name)
+        print(f"{name}: {len(store.seasons)} seasons cached in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Sharing one WeeklyIndex between processes without pickling it.
+
+The index is written once into a flat buffer: a small JSON header, then
+the seasons, points and pos_codes arrays and the player id / name tables
+as UTF-8 bytes + offsets, each 64-byte aligned. Readers wrap the buffer in
+NumPy views, so the big arrays are never copied; only the player_id ->
+idx dict is rebuilt per process.
+
+Two backends, same layout:
+
+    # shared memory (lives until unlink)
+    with publish_weekly_index(index) as shared:
+        ProcessPoolExecutor(initializer=init, initargs=(shared.name,))
+        ...                      # in the worker: attach_weekly_index(name)
+
+    # memory-mapped file (lives on disk)
+    save_weekly_index(index, "dataset/weekly_index.bin")
+    index = open_weekly_index("dataset/weekly_index.bin")
+
+Attached indexes are read-only (writing to their arrays raises) and work
+anywhere a WeeklyIndex does: pass index.points_index / index.pos_index to
+counterfactual_replay and friends.
+"""
+import json
+import mmap
+import struct
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engine.loading_data.weekly_index import WeeklyIndex
+
+_MAGIC = b"TZWIDX01"
+_PREFIX = struct.Struct("<8sQ")   # magic, header length
+_ALIGN = 64
+
+
+def _encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _plan(index: WeeklyIndex) -> Tuple[bytes, Dict[str, np.ndarray], int]:
+    """(header bytes incl. prefix, arrays to write, total size in bytes)."""
+    ids = [str(pid) for pid in index.player_ids.tolist()]
+    id_bytes, id_offsets = _encode_strings(ids)
+    name_bytes, name_offsets = _encode_strings([index.name_by_id.get(pid, "") for pid in ids])
+    arrays = {
+        "seasons": np.ascontiguousarray(index.seasons, dtype=np.int64),
+        "points": np.ascontiguousarray(index.points),
+        "pos_codes": np.ascontiguousarray(index.pos_codes),
+        "id_bytes": id_bytes,
+        "id_offsets": id_offsets,
+        "name_bytes": name_bytes,
+        "name_offsets": name_offsets,
+    }
+
+    # offsets depend on the header length, which depends on the offsets:
+    # reserve generously, lay out after it, and grow the reserve to the
+    # header actually written if it did not fit
+    meta = {"min_week": int(index.min_week), "positions": list(index.positions), "arrays": {}}
+    reserve = _aligned(_PREFIX.size + len(json.dumps(meta)) + 128 * len(arrays) + 256)
+    while True:
+        offset = reserve
+        for name, arr in arrays.items():
+            meta["arrays"][name] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+            offset = _aligned(offset + arr.nbytes)
+
+        header = json.dumps(meta).encode("utf-8")
+        prefix = _PREFIX.pack(_MAGIC, len(header)) + header
+        if len(prefix) <= reserve:
+            return prefix, arrays, max(offset, reserve)
+        reserve = _aligned(len(prefix))
+
+
+def _write(buf, prefix: bytes, arrays: Dict[str, np.ndarray]) -> None:
+    buf[:len(prefix)] = prefix
+    meta = json.loads(prefix[_PREFIX.size:])
+    for name, arr in arrays.items():
+        if arr.size:   # copy straight into the buffer, no temporary bytes object
+            start = meta["arrays"][name]["offset"]
+            np.frombuffer(buf, dtype=arr.dtype, count=arr.size, offset=start).reshape(arr.shape)[...] = arr
+
+
+def _read(buf, owner) -> WeeklyIndex:
+    magic, header_len = _PREFIX.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError("not a shared weekly index (bad magic)")
+    meta = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + header_len]))
+
+    views = {}
+    for name, spec in meta["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arr = np.frombuffer(buf, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+        arr.flags.writeable = False
+        views[name] = arr
+
+    ids = _decode_strings(views["id_bytes"], views["id_offsets"])
+    names = _decode_strings(views["name_bytes"], views["name_offsets"])
+    return WeeklyIndex(
+        seasons=views["seasons"],
+        min_week=int(meta["min_week"]),
+        player_ids=np.asarray(ids, dtype=object),
+        positions=list(meta["positions"]),
+        points=views["points"],
+        pos_codes=views["pos_codes"],
+        name_by_id={pid: name for pid, name in zip(ids, names) if name},
+        buffer_owner=owner,
+    )
+
+
+class _SharedMemory(shared_memory.SharedMemory):
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass   # arrays still view the block; the mapping is released along with them
+
+
+class SharedWeeklyIndex:
+    """
+    Publisher's handle on a shared-memory index. Pass .name to workers;
+    .index is the publisher's own read-only view. Use as a context manager
+    (or call unlink()) so the block is freed when the pool is done.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, index: WeeklyIndex):
+        self._shm = shm
+        self.index: Optional[WeeklyIndex] = index
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def size(self) -> int:
+        return self._shm.size
+
+    def unlink(self) -> None:
+        """Frees the block (attached processes keep their mapping until they exit)."""
+        self.index = None
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            self._shm.close()
+        except BufferError:
+            pass   # someone still holds arrays of self.index; the mapping goes when they do
+
+    def __enter__(self) -> "SharedWeeklyIndex":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.unlink()
+        return False
+
+
+def publish_weekly_index(index: WeeklyIndex, name: Optional[str] = None) -> SharedWeeklyIndex:
+    """Copies index into a new shared-memory block (once) and returns its handle."""
+    prefix, arrays, size = _plan(index)
+    shm = _SharedMemory(name=name, create=True, size=size)
+    _write(shm.buf, prefix, arrays)
+    return SharedWeeklyIndex(shm, _read(shm.buf, shm))
+
+
+def attach_weekly_index(name: str) -> WeeklyIndex:
+    """
+    Read-only WeeklyIndex over a block made by publish_weekly_index, with
+    no copy of points / pos_codes. The mapping stays open as long as the
+    returned index is alive. Meant for processes started by the publisher
+    (pool workers); the publisher owns the block and unlinks it.
+    """
+    try:
+        shm = _SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        # older Pythons register the block with the resource tracker again;
+        # pool workers share the publisher's tracker, so that is harmless
+        shm = _SharedMemory(name=name)
+    return _read(shm.buf, shm)
+
+
+def save_weekly_index(index: WeeklyIndex, path: str) -> str:
+    """Writes the same layout to a file for open_weekly_index."""
+    prefix, arrays, size = _plan(index)
+    with open(path, "wb") as f:
+        f.truncate(size)
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), size) as buf:
+        _write(buf, prefix, arrays)
+    return path
+
+
+def open_weekly_index(path: str) -> WeeklyIndex:
+    """Read-only WeeklyIndex over a memory-mapped file; pages load on first touch."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _read(buf, buf)
@@ -0,0 +1,202 @@
+"""
+Season-partitioned columnar copy of dataset/weekly.csv.
+
+Layout on disk:
+
+  dataset/weekly_store/
+    _manifest.json              source stamp + per-season metadata
+    season=1999/part-0.parquet
+    season=2000/part-0.parquet
+    ...
+
+The manifest remembers the CSV's size/mtime/sha256 so we only rebuild when
+the CSV actually changed, and it stores (rows, min_week, max_week) per season
+so season pickers never have to touch the row data.
+
+Run `python -m engine.loading_data.store` to (re)build it by hand.
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engine.loading_data.scoring import points_dir_name
+
+data_path = "dataset/weekly.csv"
+store_path = "dataset/weekly_store"
+manifest_name = "_manifest.json"
+STORE_VERSION = 1
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_stamp(csv_path: str, with_hash: bool = True) -> Dict[str, object]:
+    st = os.stat(csv_path)
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        stamp["sha256"] = _file_sha256(csv_path)
+    return stamp
+
+
+class WeeklyStore:
+    """
+    Handle on a built store. Opening it only reads the manifest;
+    row data is read lazily by load().
+    """
+
+    def __init__(self, store_dir: str, manifest: Dict[str, object]):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self._seasons = {int(k): v for k, v in manifest["seasons"].items()}
+
+    @property
+    def seasons(self) -> List[int]:
+        return sorted(self._seasons)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest["columns"])
+
+    def season_week_range(self, season: int) -> Tuple[int, int]:
+        meta = self._seasons.get(int(season))
+        if meta is None:
+            raise ValueError(f"No rows found for season={season}")
+        return int(meta["min_week"]), int(meta["max_week"])
+
+    def load(
+        self,
+        seasons: Optional[Iterable[int]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads only the requested season partitions and columns.
+        Files are memory-mapped, so untouched pages never get read.
+        """
+        if seasons is None:
+            seasons = self.seasons
+        tables = []
+        for season in seasons:
+            meta = self._seasons.get(int(season))
+            if meta is None:
+                raise ValueError(f"No rows found for season={season}")
+            path = os.path.join(self.store_dir, meta["file"])
+            # ParquetFile (not read_table) so the "season=" dir isn't parsed as a hive partition
+            tables.append(pq.ParquetFile(path, memory_map=True).read(columns=columns))
+
+        if not tables:
+            cols = columns if columns is not None else self.columns
+            return pd.DataFrame(columns=cols)
+        return pa.concat_tables(tables).to_pandas()
+
+
+def read_manifest(store_dir: str = store_path) -> Optional[Dict[str, object]]:
+    path = os.path.join(store_dir, manifest_name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # same coercions as load_weekly_csv, so the store round-trips cleanly
+    df["season"] = df["season"].astype(int)
+    df["week"] = df["week"].astype(int)
+    df["player_id"] = df["player_id"].astype(str)
+    df["player_name"] = df["player_name"].astype(str)
+    df["position"] = df["position"].astype(str)
+    df["fantasy_points_ppr"] = df["fantasy_points_ppr"].fillna(0.0).astype(float)
+
+    # mixed-type object columns can't go to Arrow as-is
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def convert_csv_to_store(csv_path: str = data_path, store_dir: str = store_path) -> WeeklyStore:
+    """
+    Parses the CSV once and writes one Parquet file per season,
+    then writes the manifest last (so a half-written store is never "fresh").
+    """
+    df = _normalize_frame(pd.read_csv(csv_path, low_memory=False))
+
+    os.makedirs(store_dir, exist_ok=True)
+    old_manifest = os.path.join(store_dir, manifest_name)
+    if os.path.exists(old_manifest):
+        os.remove(old_manifest)
+    # points cached per scoring format (scoring.py) were computed from the old rows
+    shutil.rmtree(os.path.join(store_dir, points_dir_name), ignore_errors=True)
+
+    seasons = {}
+    for season, season_df in df.groupby("season", sort=True):
+        rel = f"season={int(season)}/part-0.parquet"
+        path = os.path.join(store_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(season_df.reset_index(drop=True), preserve_index=False)
+        pq.write_table(table, path)
+        seasons[str(int(season))] = {
+            "file": rel,
+            "rows": int(len(season_df)),
+            "min_week": int(season_df["week"].min()),
+            "max_week": int(season_df["week"].max()),
+        }
+
+    manifest = {
+        "version": STORE_VERSION,
+        "source": os.path.abspath(csv_path),
+        "stamp": source_stamp(csv_path),
+        "columns": list(df.columns),
+        "seasons": seasons,
+    }
+    with open(os.path.join(store_dir, manifest_name), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return WeeklyStore(store_dir, manifest)
+
+
+def open_store(csv_path: str = data_path, store_dir: str = store_path) -> WeeklyStore:
+    """
+    Returns a fresh WeeklyStore, rebuilding it from the CSV only when needed.
+
+    Freshness check:
+      1) size + mtime match the manifest -> fresh (cheap, no read)
+      2) otherwise hash the CSV; same sha256 -> fresh, just refresh the stamp
+      3) otherwise rebuild
+    """
+    manifest = read_manifest(store_dir)
+
+    if manifest is None or manifest.get("version") != STORE_VERSION:
+        return convert_csv_to_store(csv_path, store_dir)
+
+    if not os.path.exists(csv_path):
+        # no source to compare against (e.g. shipped store only) -> trust it
+        return WeeklyStore(store_dir, manifest)
+
+    old = manifest["stamp"]
+    cur = source_stamp(csv_path, with_hash=False)
+    if cur["size"] == old["size"] and cur["mtime_ns"] == old["mtime_ns"]:
+        return WeeklyStore(store_dir, manifest)
+
+    if cur["size"] == old["size"] and _file_sha256(csv_path) == old["sha256"]:
+        manifest["stamp"] = dict(old, mtime_ns=cur["mtime_ns"])
+        with open(os.path.join(store_dir, manifest_name), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return WeeklyStore(store_dir, manifest)
+
+    return convert_csv_to_store(csv_path, store_dir)
+
+
+if __name__ == "__main__":
+    store = convert_csv_to_store()
+    print(f"Wrote {len(store.seasons)} season partitions to {store.store_dir}")
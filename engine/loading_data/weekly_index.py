@@ -0,0 +1,306 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.tracing import span
+
+
+@dataclass
+class WeeklyIndex:
+    """
+    Dense, array-backed version of the nested weekly dicts.
+
+    player_ids are interned to dense integers (player_idx) and every value
+    lives in a NumPy array keyed by (season_row, week_col, player_idx):
+
+      points[s, w, p]    = fantasy points (0.0 if the player has no row)
+      pos_codes[s, w, p] = index into `positions` (-1 if the player has no row)
+
+    `points_index` / `pos_index` give the same lookup semantics as the old
+    {(season, week): {player_id: value}} dicts, so the simulator code can
+    use either one.
+    """
+    seasons: np.ndarray          # sorted season values, one per season_row
+    min_week: int                # week value stored in week_col 0
+    player_ids: np.ndarray       # player_idx -> player_id (object array of str)
+    positions: List[str]         # position code -> position string
+    points: np.ndarray           # float64 (float32 from WeeklyIndexBuilder) (n_seasons, n_weeks, n_players)
+    pos_codes: np.ndarray        # int16   (n_seasons, n_weeks, n_players)
+    name_by_id: Dict[str, str]
+    # keeps a shared-memory block / memory map alive while arrays view it (see shared_index.py)
+    buffer_owner: Optional[object] = field(default=None, repr=False, compare=False)
+    _id_to_idx: Dict[str, int] = field(init=False, repr=False)
+    _season_to_row: Dict[int, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._id_to_idx = {pid: i for i, pid in enumerate(self.player_ids.tolist())}
+        self._season_to_row = {int(s): i for i, s in enumerate(self.seasons.tolist())}
+
+    @property
+    def n_weeks(self) -> int:
+        return int(self.points.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.points.nbytes + self.pos_codes.nbytes + self.player_ids.nbytes)
+
+    def player_idx(self, player_id: str) -> int:
+        """Returns the dense index for a player_id, or -1 if we never saw it."""
+        return self._id_to_idx.get(player_id, -1)
+
+    def cell(self, season: int, week: int) -> Optional[Tuple[int, int]]:
+        """(season_row, week_col) for a (season, week), or None if out of range."""
+        s = self._season_to_row.get(int(season))
+        w = int(week) - self.min_week
+        if s is None or w < 0 or w >= self.n_weeks:
+            return None
+        return s, w
+
+    def roster_arrays(
+        self,
+        roster: List[str],
+        season: int,
+        start_week: int,
+        end_week: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Builds (points, pos_codes) arrays of shape (len(roster), n_weeks) for
+        weeks start_week..end_week (inclusive).
+
+        Same rules as build_roster_week_views: a player without a row that
+        week gets 0.0 points and position code -1.
+        """
+        n_weeks = max(end_week - start_week + 1, 0)
+        points = np.zeros((len(roster), n_weeks), dtype=np.float64)
+        codes = np.full((len(roster), n_weeks), -1, dtype=np.int16)
+
+        s = self._season_to_row.get(int(season))
+        if s is None or n_weeks == 0:
+            return points, codes
+
+        # only part of the requested range may be inside the stored weeks
+        first = max(start_week - self.min_week, 0)
+        last = min(end_week - self.min_week, self.n_weeks - 1)
+        if last < first:
+            return points, codes
+        out = slice(first + self.min_week - start_week, last + self.min_week - start_week + 1)
+
+        idx = np.array([self.player_idx(pid) for pid in roster], dtype=np.int64)
+        known = idx >= 0
+        points[known, out] = self.points[s, first:last + 1][:, idx[known]].T
+        codes[known, out] = self.pos_codes[s, first:last + 1][:, idx[known]].T
+        return points, codes
+
+    @property
+    def points_index(self) -> "_SeasonWeekView":
+        return _SeasonWeekView(self, "points")
+
+    @property
+    def pos_index(self) -> "_SeasonWeekView":
+        return _SeasonWeekView(self, "pos")
+
+
+class _SeasonWeekView(Mapping):
+    """Read-only {(season, week): {player_id: value}} view over a WeeklyIndex."""
+
+    def __init__(self, index: WeeklyIndex, kind: str):
+        self._index = index
+        self._kind = kind
+
+    @property
+    def weekly_index(self) -> WeeklyIndex:
+        """The WeeklyIndex behind this view (for array-based fast paths)."""
+        return self._index
+
+    def __getitem__(self, key):
+        try:
+            cell = self._index.cell(*key)
+        except (TypeError, ValueError):  # not a (season, week) pair: missing, like any dict
+            raise KeyError(key) from None
+        if cell is None or not (self._index.pos_codes[cell] >= 0).any():
+            raise KeyError(key)
+        return _WeekView(self._index, cell, self._kind)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        present = (self._index.pos_codes >= 0).any(axis=2)
+        for s, w in zip(*np.nonzero(present)):
+            yield int(self._index.seasons[s]), int(w) + self._index.min_week
+
+    def __len__(self) -> int:
+        return int((self._index.pos_codes >= 0).any(axis=2).sum())
+
+
+class _WeekView(Mapping):
+    """Read-only {player_id: value} view for one (season, week)."""
+
+    def __init__(self, index: WeeklyIndex, cell: Tuple[int, int], kind: str):
+        self._index = index
+        self._codes = index.pos_codes[cell]
+        self._values = index.points[cell] if kind == "points" else None
+
+    def __getitem__(self, player_id):
+        p = self._index.player_idx(player_id)
+        if p < 0 or self._codes[p] < 0:
+            raise KeyError(player_id)
+        if self._values is None:
+            return self._index.positions[self._codes[p]]
+        return float(self._values[p])
+
+    def __contains__(self, player_id) -> bool:
+        p = self._index.player_idx(player_id)
+        return p >= 0 and self._codes[p] >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for p in np.flatnonzero(self._codes >= 0):
+            yield self._index.player_ids[p]
+
+    def __len__(self) -> int:
+        return int((self._codes >= 0).sum())
+
+
+def _factorize_str(values: pd.Series) -> Tuple[np.ndarray, List[str]]:
+    """
+    Codes + uniques of a column as strings (same as factorize(astype(str))),
+    without materializing a string per row when the column is categorical.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        uniques = [str(c) for c in values.cat.categories]
+        if (codes < 0).any():   # missing values become "nan", like astype(str)
+            codes = np.where(codes < 0, len(uniques), codes)
+            uniques.append("nan")
+        return codes, uniques
+    codes, uniques = pd.factorize(values.astype(str), sort=False)
+    return codes.astype(np.int64), [str(u) for u in uniques]
+
+
+def _dense_index(
+    season_vals: np.ndarray,
+    week_vals: np.ndarray,
+    player_codes: np.ndarray,
+    player_ids: List[str],
+    pos_codes_flat: np.ndarray,
+    positions: List[str],
+    point_vals: np.ndarray,
+    name_by_id: Dict[str, str],
+    points_dtype=np.float64,
+) -> WeeklyIndex:
+    season_vals = season_vals.astype(np.int64, copy=False)
+    week_vals = week_vals.astype(np.int64, copy=False)
+    seasons, season_rows = np.unique(season_vals, return_inverse=True)
+
+    if len(season_vals) == 0:
+        min_week, n_weeks = 1, 0
+    else:
+        min_week = int(week_vals.min())
+        n_weeks = int(week_vals.max()) - min_week + 1
+    week_cols = week_vals - min_week
+    n_players = len(player_ids)
+
+    # keep only the last row for each cell (reverse, then take first occurrence)
+    flat = (season_rows * n_weeks + week_cols) * n_players + player_codes
+    _, last_rev = np.unique(flat[::-1], return_index=True)
+    keep = len(flat) - 1 - last_rev
+
+    points = np.zeros((len(seasons), n_weeks, n_players), dtype=points_dtype)
+    pos_codes = np.full((len(seasons), n_weeks, n_players), -1, dtype=np.int16)
+    cells = (season_rows[keep], week_cols[keep], player_codes[keep])
+    points[cells] = point_vals[keep]
+    pos_codes[cells] = pos_codes_flat[keep]
+
+    return WeeklyIndex(
+        seasons=seasons,
+        min_week=min_week,
+        player_ids=np.asarray(player_ids, dtype=object),
+        positions=list(positions),
+        points=points,
+        pos_codes=pos_codes,
+        name_by_id=name_by_id,
+    )
+
+
+def build_weekly_index(df: pd.DataFrame) -> WeeklyIndex:
+    """
+    Builds a WeeklyIndex from a load_weekly_csv() style DataFrame using
+    vectorized pandas/NumPy ops (no per-row Python loop).
+
+    If a (season, week, player_id) appears more than once, the last row wins,
+    same as the old dict-building loop.
+    """
+    with span("index.build", rows=len(df)):
+        player_codes, player_ids = _factorize_str(df["player_id"])
+        pos_codes_flat, positions = _factorize_str(df["position"])
+
+        names = df[["player_id", "player_name"]].astype(str).drop_duplicates("player_id", keep="last")
+        name_by_id = dict(zip(names["player_id"], names["player_name"]))
+
+        return _dense_index(
+            df["season"].to_numpy(dtype=np.int64),
+            df["week"].to_numpy(dtype=np.int64),
+            player_codes,
+            player_ids,
+            pos_codes_flat,
+            positions,
+            df["fantasy_points_ppr"].to_numpy(dtype=np.float64),
+            name_by_id,
+        )
+
+
+class WeeklyIndexBuilder:
+    """
+    Builds a WeeklyIndex from DataFrame chunks as they arrive, so the full
+    table never has to exist at once. Per row it only keeps compact arrays
+    (int16 season/week, int32 player/position codes, float32 points); ids,
+    positions and names are interned across chunks.
+
+    Same result as build_weekly_index on the concatenated chunks (last row
+    wins), except points are stored as float32 unless points_dtype says otherwise.
+    """
+
+    def __init__(self, points_dtype=np.float32):
+        self.points_dtype = points_dtype
+        self.n_rows = 0
+        self._player_idx: Dict[str, int] = {}
+        self._pos_idx: Dict[str, int] = {}
+        self._name_by_id: Dict[str, str] = {}
+        self._parts: List[Tuple[np.ndarray, ...]] = []
+
+    @staticmethod
+    def _intern(table: Dict[str, int], codes: np.ndarray, uniques: List[str]) -> np.ndarray:
+        to_global = np.array([table.setdefault(u, len(table)) for u in uniques], dtype=np.int32)
+        return to_global[codes] if len(uniques) else codes.astype(np.int32)
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        local_codes, player_ids = _factorize_str(chunk["player_id"])
+        pos_codes, positions = _factorize_str(chunk["position"])
+
+        self._parts.append((
+            chunk["season"].to_numpy(dtype=np.int16),
+            chunk["week"].to_numpy(dtype=np.int16),
+            self._intern(self._player_idx, local_codes, player_ids),
+            self._intern(self._pos_idx, pos_codes, positions),
+            chunk["fantasy_points_ppr"].fillna(0.0).to_numpy(dtype=self.points_dtype),
+        ))
+
+        # last name per id in this chunk; later chunks overwrite -> last row wins overall
+        last = pd.Series(local_codes).drop_duplicates(keep="last")
+        names = chunk["player_name"].iloc[last.index.to_numpy()].astype(str).tolist()
+        for code, name in zip(last.tolist(), names):
+            self._name_by_id[player_ids[code]] = name
+        self.n_rows += len(chunk)
+
+    def build(self) -> WeeklyIndex:
+        with span("index.build_streamed", rows=self.n_rows):
+            if self._parts:
+                seasons, weeks, players, pos_codes, points = (np.concatenate(col) for col in zip(*self._parts))
+            else:
+                seasons = weeks = players = pos_codes = np.zeros(0, dtype=np.int64)
+                points = np.zeros(0, dtype=self.points_dtype)
+            self._parts = []   # release the per-chunk arrays before allocating the dense ones
+            return _dense_index(
+                seasons, weeks, players.astype(np.int64), list(self._player_idx),
+                pos_codes, list(self._pos_idx), points, self._name_by_id, self.points_dtype,
+            )
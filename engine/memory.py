@@ -0,0 +1,54 @@
+"""
+Rough memory accounting for cached objects (debug panels, reports).
+"""
+import itertools
+import sys
+from typing import Any, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# object arrays and big containers: estimate element sizes from a sample
+# instead of walking all of them
+_OBJECT_SAMPLE = 1000
+
+
+def approx_nbytes(obj: Any, _seen: Optional[Set[int]] = None) -> int:
+    """
+    Approximate deep size of obj in bytes: NumPy buffers, pandas frames (deep),
+    containers and plain objects' attributes. Shared objects are counted once.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object and obj.size:
+            sample = obj.ravel()[:_OBJECT_SAMPLE]
+            size += int(sum(sys.getsizeof(x) for x in sample) / len(sample) * obj.size)
+        return size
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = list(itertools.islice(obj.items(), _OBJECT_SAMPLE))
+        sample = sum(approx_nbytes(k, seen) + approx_nbytes(v, seen) for k, v in items)
+        return sys.getsizeof(obj) + (int(sample / len(items) * len(obj)) if items else 0)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(itertools.islice(obj, _OBJECT_SAMPLE))
+        sample = sum(approx_nbytes(x, seen) for x in items)
+        return sys.getsizeof(obj) + (int(sample / len(items) * len(obj)) if items else 0)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + approx_nbytes(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
@@ -0,0 +1,234 @@
+"""
+The next-week pipeline compiled to flat NumPy arrays, for fast small-batch
+inference without sklearn.
+
+    python -m engine.ml.compiled        (also runs at the end of train.py)
+
+compile_pipeline reads what the fitted Pipeline learned:
+
+  - SimpleImputer medians for the numeric columns
+  - OneHotEncoder categories -> a position code lookup (unknown -> all zeros)
+  - every HistGradientBoostingRegressor tree as one node table: split
+    feature, threshold, left child (the right one is next to it) and leaf
+    value; trees are concatenated and leaves point at themselves. Missing-
+    value routing is not kept: the imputer runs first, so trees never see NaN
+  - the baseline prediction
+
+CompiledModel.predict walks all trees for all rows at once, one array step
+per tree level, and matches Pipeline.predict to float rounding. It has the
+same predict(DataFrame) signature, so predict_next_week_points and the
+replays accept it as the model.
+
+Saved as an .npz next to the joblib file (no pickle, so loading takes
+milliseconds and never imports sklearn), stamped with the joblib file's
+fingerprint; load_compiled_model returns None if it is missing or stale.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+compiled_model_path = "models/next_week_model.npz"
+
+FORMAT_VERSION = 1
+_CHUNK_ROWS = 4_096   # rows per pass; keeps the (rows x trees) temporaries in cache
+
+
+class CompiledModel:
+    def __init__(
+        self,
+        num_cols: List[str],
+        cat_col: str,
+        medians: np.ndarray,
+        categories: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        depth: int,
+        baseline: float,
+        model_hash: Optional[str] = None,
+    ):
+        self.num_cols = list(num_cols)
+        self.cat_col = cat_col
+        self.medians = medians
+        self.categories = categories            # sorted, like OneHotEncoder
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left                        # right child = left + 1
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.baseline = float(baseline)
+        self.model_hash = model_hash
+        # row k = one-hot of category k; the last row (unknown) is all zeros
+        self._onehot = np.vstack([np.eye(len(categories)), np.zeros((1, len(categories)))])
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def position_codes(self, positions) -> np.ndarray:
+        """Category index per value, len(categories) for unknown ones."""
+        values = np.asarray(positions).astype(str)
+        k = len(self.categories)
+        if k == 0:
+            return np.zeros(len(values), dtype=np.int64)
+        codes = np.minimum(np.searchsorted(self.categories, values), k - 1)
+        return np.where(self.categories[codes] == values, codes, k)
+
+    def design_matrix(self, numeric: np.ndarray, positions) -> np.ndarray:
+        """What the ColumnTransformer produces: imputed numerics, then the one-hot block."""
+        numeric = np.asarray(numeric, dtype=np.float64).reshape(-1, len(self.num_cols))
+        numeric = np.where(np.isnan(numeric), self.medians, numeric)
+        return np.hstack([numeric, self._onehot[self.position_codes(positions)]])
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Predictions for a design_matrix() result (imputed, so no NaNs)."""
+        out = np.empty(len(X), dtype=np.float64)
+        n_features = X.shape[1]
+        for lo in range(0, len(X), _CHUNK_ROWS):
+            chunk = np.ascontiguousarray(X[lo:lo + _CHUNK_ROWS])
+            flat = chunk.ravel()
+            # (row, tree) pairs flattened row-major; take() is the cheapest gather
+            row_base = np.repeat(np.arange(len(chunk), dtype=np.int32) * n_features, self.n_trees)
+            node = np.tile(self.roots, len(chunk))
+            for _ in range(self.depth):
+                x = flat.take(row_base + self.feature.take(node))
+                node = self.left.take(node) + (x > self.threshold.take(node))   # <= goes left, like sklearn
+            out[lo:lo + len(chunk)] = self.value.take(node).reshape(len(chunk), self.n_trees).sum(axis=1) + self.baseline
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        """Same input as the sklearn pipeline: a DataFrame with num_cols + cat_col."""
+        numeric = np.column_stack([X[col].to_numpy(dtype=np.float64) for col in self.num_cols])
+        return self.predict_matrix(self.design_matrix(numeric, X[self.cat_col].to_numpy()))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "medians": self.medians, "categories": self.categories,
+            "feature": self.feature, "threshold": self.threshold,
+            "left": self.left, "value": self.value, "roots": self.roots,
+        }
+
+    def save(self, path: str = compiled_model_path) -> str:
+        meta = {
+            "version": FORMAT_VERSION, "num_cols": self.num_cols, "cat_col": self.cat_col,
+            "depth": self.depth, "baseline": self.baseline, "model_hash": self.model_hash,
+        }
+        np.savez(path, meta=np.array(json.dumps(meta)), **self.arrays())
+        return path
+
+
+def compile_pipeline(pipe, model_hash: Optional[str] = None) -> CompiledModel:
+    """
+    Flattens a fitted build_pipeline() Pipeline. Raises ValueError for
+    anything this evaluator doesn't reproduce (other transformers,
+    categorical splits, multi-output models).
+    """
+    pre, model = pipe.named_steps["pre"], pipe.named_steps["model"]
+    blocks = {name: (trans, cols) for name, trans, cols in pre.transformers_ if name != "remainder"}
+    if set(blocks) != {"num", "cat"} or [name for name, _, _ in pre.transformers_][:2] != ["num", "cat"]:
+        raise ValueError(f"expected num + cat transformers, got {list(blocks)}")
+    num_trans, num_cols = blocks["num"]
+    cat_trans, cat_cols = blocks["cat"]
+    imputer = num_trans.named_steps["imp"] if hasattr(num_trans, "named_steps") else num_trans
+    if getattr(imputer, "strategy", None) != "median" or len(cat_cols) != 1:
+        raise ValueError("expected a median imputer and a one-hot encoder on a single column")
+    if getattr(cat_trans, "handle_unknown", None) != "ignore" or getattr(cat_trans, "drop_idx_", None) is not None:
+        raise ValueError("one-hot encoder must use handle_unknown='ignore' and no drop")
+    if model.n_trees_per_iteration_ != 1 or getattr(model, "is_categorical_", None) is not None:
+        raise ValueError("only single-output models without categorical splits are supported")
+
+    categories = np.asarray(cat_trans.categories_[0]).astype(str)
+    if (np.sort(categories) != categories).any():
+        raise ValueError("encoder categories must be sorted")
+
+    medians = np.asarray(imputer.statistics_, dtype=np.float64)
+    if not np.isfinite(medians).all():
+        raise ValueError("imputer has no median for some column")
+
+    features, thresholds, lefts, values, roots = [], [], [], [], []
+    offset, depth = 0, 0
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("categorical splits are not supported")
+        # breadth-first renumbering puts each right child right after its
+        # left one; leaves point at themselves so every row can take the
+        # same number of steps
+        order, new_id = [0], {0: 0}
+        for old in order:
+            if not nodes["is_leaf"][old]:
+                for child in (nodes["left"][old], nodes["right"][old]):
+                    new_id[int(child)] = len(order)
+                    order.append(int(child))
+        nodes = nodes[order]
+        leaf = nodes["is_leaf"].astype(bool)
+        ids = np.arange(len(nodes))
+        left = np.where(leaf, ids, [new_id.get(int(i), 0) for i in nodes["left"]])
+        features.append(np.where(leaf, 0, nodes["feature_idx"]).astype(np.int32))
+        thresholds.append(np.where(leaf, np.inf, nodes["num_threshold"]).astype(np.float64))
+        lefts.append((left + offset).astype(np.int32))
+        values.append(np.where(leaf, nodes["value"], 0.0).astype(np.float64))
+        roots.append(offset)
+        depth = max(depth, int(nodes["depth"].max()))
+        offset += len(nodes)
+
+    return CompiledModel(
+        num_cols=list(num_cols),
+        cat_col=cat_cols[0],
+        medians=medians,
+        categories=categories,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        depth=depth,
+        baseline=float(np.ravel(model._baseline_prediction)[0]),
+        model_hash=model_hash,
+    )
+
+
+def load_compiled_model(path: str = compiled_model_path, model_hash: Optional[str] = None) -> Optional[CompiledModel]:
+    """
+    The compiled model at path, or None if it is missing, from another
+    format version, or (when model_hash is given) compiled from a
+    different joblib file.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+        if model_hash is not None and meta.get("model_hash") != model_hash:
+            return None
+        arrays = {name: data[name] for name in data.files if name != "meta"}
+    model = CompiledModel(
+        num_cols=meta["num_cols"], cat_col=meta["cat_col"], depth=meta["depth"],
+        baseline=meta["baseline"], model_hash=meta["model_hash"], **arrays,
+    )
+    if model.model_hash is not None:
+        from engine.ml.predict import register_fingerprint
+        # same fingerprint as the joblib model: caches and the prediction table carry over
+        register_fingerprint(model, model.model_hash)
+    return model
+
+
+def export_compiled_model(pipe, path: str = compiled_model_path, model_hash: Optional[str] = None) -> str:
+    return compile_pipeline(pipe, model_hash).save(path)
+
+
+def main():
+    from engine.ml.predict import file_fingerprint, load_model, model_path
+
+    path = export_compiled_model(load_model(model_path), compiled_model_path, file_fingerprint(model_path))
+    print("Saved:", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Versioned, season-partitioned store of model features.
+
+Layout on disk:
+
+  dataset/feature_store/v2/
+    _manifest.json              weekly store stamp + per-season digests
+    season=1999/part-0.parquet  every player-week row of the season
+    ...
+
+Each partition holds feature_rows(..., through=True) for the whole season
+(including each player-season's last week, where y_next_week is NaN) plus a
+per-player digest of that player's raw rows. Features of a player-season
+only depend on its own rows, so on update:
+
+  - weekly store unchanged                -> nothing is read
+  - season digest unchanged               -> partition kept as-is
+  - otherwise only player-seasons whose digest changed are recomputed
+
+Bump FEATURES_VERSION whenever feature definitions change; the new version
+gets its own directory and is rebuilt from scratch.
+
+Run `python -m engine.ml.feature_store` to update it by hand.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engine.loading_data.store import WeeklyStore, open_store
+from engine.ml.features import feature_rows, target_col
+from engine.simulator.expected import _KEY_STRIDE, SeasonFeatureTable
+
+data_path = "dataset/weekly.csv"
+store_path = "dataset/weekly_store"
+feature_store_path = "dataset/feature_store"
+manifest_name = "_manifest.json"
+FEATURES_VERSION = 2
+
+raw_cols = ["season", "week", "player_id", "player_name", "position", target_col]
+train_cols = raw_cols + ["lag1_points", "roll3_mean", "roll5_mean", "y_next_week"]
+
+
+def _player_digests(raw: pd.DataFrame) -> pd.Series:
+    """player_id -> uint64 digest of that player's rows (order-independent)."""
+    rows = raw[["week", "player_name", "position", target_col]].copy()
+    rows[target_col] = rows[target_col].fillna(0.0).astype(float)
+    hashed = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    pid = raw["player_id"].astype(str).to_numpy()
+    order = np.argsort(pid, kind="stable")
+    pid, hashed = pid[order], hashed[order]
+    starts = np.flatnonzero(np.r_[True, pid[1:] != pid[:-1]]) if len(pid) else np.array([], dtype=np.int64)
+    with np.errstate(over="ignore"):
+        sums = np.add.reduceat(hashed, starts) if len(pid) else hashed
+    return pd.Series(sums, index=pid[starts], dtype=np.uint64)
+
+
+def _season_digest(digests: pd.Series) -> str:
+    h = hashlib.sha256()
+    h.update(digests.index.to_numpy(dtype=str).astype("U").tobytes())
+    h.update(digests.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class FeatureStore:
+    """Handle on a built feature store; partitions are read lazily."""
+
+    def __init__(self, store_dir: str, manifest: Dict[str, object]):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self._seasons = {int(k): v for k, v in manifest["seasons"].items()}
+
+    @property
+    def seasons(self) -> List[int]:
+        return sorted(self._seasons)
+
+    @property
+    def last_update(self) -> Dict[str, int]:
+        """Player-seasons recomputed / kept by the update that produced this store."""
+        return dict(self.manifest.get("last_update", {}))
+
+    def _read(self, season: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        meta = self._seasons.get(int(season))
+        if meta is None:
+            raise ValueError(f"No features for season={season}")
+        path = os.path.join(self.store_dir, meta["file"])
+        return pq.ParquetFile(path, memory_map=True).read(columns=columns).to_pandas()
+
+    def load(self, seasons: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """Training rows: same columns, rows and order as make_features."""
+        if seasons is None:
+            seasons = self.seasons
+        frames = [self._read(s, train_cols) for s in seasons]
+        if not frames:
+            return pd.DataFrame(columns=train_cols)
+        df = pd.concat(frames, ignore_index=True)
+        df = df.dropna(subset=["y_next_week"])
+        return df.sort_values(["player_id", "season", "week"], kind="stable").reset_index(drop=True)
+
+    def season_feature_table(self, season: int) -> SeasonFeatureTable:
+        """SeasonFeatureTable for the expected replay, without touching raw rows."""
+        df = self._read(season, ["player_id", "week", "position", target_col, "roll3_through", "roll5_through"])
+        codes, uniques = pd.factorize(df["player_id"], sort=True)
+        keys = codes.astype(np.int64) * _KEY_STRIDE + df["week"].to_numpy(dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        return SeasonFeatureTable(
+            season=int(season),
+            player_idx={pid: i for i, pid in enumerate(uniques)},
+            keys=keys[order],
+            position=df["position"].to_numpy(dtype=object)[order],
+            lag1_points=df[target_col].to_numpy(dtype=np.float64)[order],
+            roll3_mean=df["roll3_through"].to_numpy(dtype=np.float64)[order],
+            roll5_mean=df["roll5_through"].to_numpy(dtype=np.float64)[order],
+            data_stamp=self.manifest["source_stamp"].get("sha256"),
+        )
+
+
+def _version_dir(store_dir: str) -> str:
+    return os.path.join(store_dir, f"v{FEATURES_VERSION}")
+
+
+def read_manifest(store_dir: str = feature_store_path) -> Optional[Dict[str, object]]:
+    path = os.path.join(_version_dir(store_dir), manifest_name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _update_season(
+    raw: pd.DataFrame,
+    season: int,
+    old_meta: Optional[Dict[str, object]],
+    out_dir: str,
+) -> Dict[str, object]:
+    rel = f"season={int(season)}/part-0.parquet"
+    path = os.path.join(out_dir, rel)
+    digests = _player_digests(raw)
+    season_digest = _season_digest(digests)
+
+    meta = {"file": rel, "digest": season_digest, "rows": int(len(raw)), "recomputed": 0}
+    if old_meta is not None and old_meta["digest"] == season_digest and os.path.exists(path):
+        meta["kept"] = int(len(digests))
+        return meta
+
+    kept = pd.DataFrame()
+    todo = digests.index
+    if old_meta is not None and os.path.exists(path):
+        old = pq.ParquetFile(path).read().to_pandas()
+        # compare as Python ints: reindexing would turn uint64 into float64
+        old_digests = old.groupby("player_id", sort=False)["digest"].first().to_dict()
+        same = np.array([old_digests.get(pid) == d for pid, d in digests.items()], dtype=bool)
+        todo = digests.index[~same]
+        kept = old[old["player_id"].isin(digests.index[same])]
+
+    fresh = feature_rows(raw[raw["player_id"].astype(str).isin(todo)], through=True)
+    fresh["digest"] = digests.reindex(fresh["player_id"]).to_numpy()
+
+    df = pd.concat([kept, fresh], ignore_index=True) if len(kept) else fresh.reset_index(drop=True)
+    df = df.sort_values(["player_id", "week"], kind="stable").reset_index(drop=True)
+    for col in ["player_id", "player_name", "position"]:
+        df[col] = df[col].astype(str)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    meta.update(recomputed=int(len(todo)), kept=int(len(digests) - len(todo)))
+    return meta
+
+
+def update_feature_store(
+    weekly: WeeklyStore,
+    store_dir: str = feature_store_path,
+) -> FeatureStore:
+    """
+    Brings the feature store in line with the weekly store, recomputing only
+    player-seasons whose raw rows changed. Manifest is written last.
+    """
+    out_dir = _version_dir(store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    old_manifest = read_manifest(store_dir) or {"seasons": {}}
+    manifest_file = os.path.join(out_dir, manifest_name)
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+
+    seasons = {}
+    for season in weekly.seasons:
+        raw = weekly.load([season], raw_cols)
+        seasons[str(season)] = _update_season(raw, season, old_manifest["seasons"].get(str(season)), out_dir)
+
+    manifest = {
+        "version": FEATURES_VERSION,
+        "source_stamp": weekly.manifest["stamp"],
+        "seasons": seasons,
+        "last_update": {
+            "recomputed": sum(m["recomputed"] for m in seasons.values()),
+            "kept": sum(m["kept"] for m in seasons.values()),
+        },
+    }
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return FeatureStore(out_dir, manifest)
+
+
+def open_feature_store(
+    csv_path: str = data_path,
+    weekly_store_dir: str = store_path,
+    store_dir: str = feature_store_path,
+) -> FeatureStore:
+    """
+    Returns a fresh FeatureStore. If the weekly store was built from the same
+    CSV (same sha256) as the features, nothing else is read.
+    """
+    weekly = open_store(csv_path, weekly_store_dir)
+    manifest = read_manifest(store_dir)
+    if (
+        manifest is not None
+        and manifest.get("version") == FEATURES_VERSION
+        and manifest["source_stamp"].get("sha256") == weekly.manifest["stamp"].get("sha256")
+    ):
+        return FeatureStore(_version_dir(store_dir), manifest)
+    return update_feature_store(weekly, store_dir)
+
+
+if __name__ == "__main__":
+    store = open_feature_store()
+    print(f"Feature store v{FEATURES_VERSION}: {len(store.seasons)} seasons, last update {store.last_update}")
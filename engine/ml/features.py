@@ -1,9 +1,45 @@
+import numpy as np
 import pandas as pd
 
+from engine.loading_data.scoring import Scoring, apply_scoring
+from engine.tracing import traced
+
 target_col = "fantasy_points_ppr"
 
-def make_features(df: pd.DataFrame) -> pd.DataFrame:
-#the arrow means to basically return something with the type "pd.DataFrame" in this case
+def _group_positions(df: pd.DataFrame) -> np.ndarray:
+    """Row number inside each (player_id, season) run of a frame sorted by player, season, week."""
+    pid_codes, _ = pd.factorize(df["player_id"])
+    seasons = df["season"].to_numpy()
+    n = len(df)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (pid_codes[1:] != pid_codes[:-1]) | (seasons[1:] != seasons[:-1])
+    starts = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    return np.arange(n) - starts
+
+
+def _rolling_mean(values: pd.Series, groups, k: int) -> np.ndarray:
+    """
+    rolling(k, min_periods=1).mean() within each group, in row order (groups
+    must be contiguous runs). The same pandas rolling as the replay's feature
+    builders, so both give bit-identical features.
+    """
+    return values.groupby(groups, sort=False).rolling(k, min_periods=1).mean().to_numpy()
+
+
+def feature_rows(df: pd.DataFrame, through: bool = False, scoring: Scoring = None) -> pd.DataFrame:
+    """
+    Every input row with its features, including the last week of each
+    player-season (y_next_week is NaN there). Vectorized: one grouped
+    rolling call per window instead of a Python lambda per (player, season).
+
+    through=True also adds roll3_through / roll5_through: rolling means that
+    include the row's own week, i.e. the features a prediction for the
+    player's next week would use.
+
+    scoring re-scores the rows under that format first (df then needs the
+    format's stat columns), so features and target are in its points.
+    """
+    df = apply_scoring(df, scoring)
     needed = ["season", "week", "player_id", "player_name", "position", target_col]
     df = df[needed].copy()
 
@@ -15,20 +51,33 @@ def make_features(df: pd.DataFrame) -> pd.DataFrame:
 
     df = df.sort_values(["player_id", "season", "week"])
 
-    g = df.groupby(["player_id", "season"], sort=False)
+    points = df[target_col].to_numpy()
+    pos = _group_positions(df)
+    is_last = np.ones(len(df), dtype=bool)
+    is_last[:-1] = pos[1:] == 0
 
-    # Lag features
-    df["lag1_points"] = g[target_col].shift(1)
+    # Lag features (week 1 has no lag)
+    df["lag1_points"] = np.where(pos >= 1, np.roll(points, 1), 0.0)
 
     # Rolling features based only on past weeks
-    df["roll3_mean"] = g[target_col].transform(lambda s: s.shift(1).rolling(3, min_periods=1).mean())
-    df["roll5_mean"] = g[target_col].transform(lambda s: s.shift(1).rolling(5, min_periods=1).mean())
+    groups = [df["player_id"], df["season"]]
+    previous = pd.Series(np.where(pos >= 1, np.roll(points, 1), np.nan), index=df.index)
+    df["roll3_mean"] = _rolling_mean(previous, groups, 3)
+    df["roll5_mean"] = _rolling_mean(previous, groups, 5)
 
     # Target: next week's points
-    df["y_next_week"] = g[target_col].shift(-1)
+    df["y_next_week"] = np.where(is_last, np.nan, np.roll(points, -1))
+
+    if through:
+        df["roll3_through"] = _rolling_mean(df[target_col], groups, 3)
+        df["roll5_through"] = _rolling_mean(df[target_col], groups, 5)
+    return df
+
 
-    # Fill early-week missing lag (week 1 has no lag)
-    df["lag1_points"] = df["lag1_points"].fillna(0.0)
+@traced("features.make", rows=len)
+def make_features(df: pd.DataFrame, scoring: Scoring = None) -> pd.DataFrame:
+#the arrow means to basically return something with the type "pd.DataFrame" in this case
+    df = feature_rows(df, scoring=scoring)
 
     # Drop rows with no next week target (last week of each player-season)
     df = df.dropna(subset=["y_next_week"]).copy()
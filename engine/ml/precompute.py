@@ -0,0 +1,215 @@
+"""
+Offline prediction table: every (season, week, player_id) scored once,
+so ML replays become lookups instead of live model.predict calls.
+
+    python -m engine.ml.precompute      (also runs at the end of train.py)
+
+Rows are only stored for players with history before that week; everyone
+else gets the model's "no history" prediction, which is stored once in the
+file metadata. The file is stamped with the model fingerprint
+(engine.ml.predict.model_fingerprint) and with the data it was scored from
+(the weekly CSV's sha256 and FEATURES_VERSION), and ignored if either
+doesn't match.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engine.ml.feature_store import FEATURES_VERSION, FeatureStore
+from engine.ml.predict import model_fingerprint, predict_next_week_points
+from engine.tracing import traced
+from engine.simulator.expected import _KEY_STRIDE, SeasonFeatureTable, build_season_feature_table
+
+data_path = "dataset/weekly.csv"
+model_path = "models/next_week_model.joblib"
+predictions_path = "models/next_week_predictions.parquet"
+
+TABLE_VERSION = 1
+
+
+def prediction_data_stamp(weekly_store) -> Dict[str, object]:
+    """What a table built from weekly_store's data today would be stamped with."""
+    return {"source_sha256": weekly_store.manifest["stamp"].get("sha256"), "features_version": FEATURES_VERSION}
+
+
+def _season_rows(table: SeasonFeatureTable, season: int) -> pd.DataFrame:
+    """Feature rows for every player with history, every target week of a season."""
+    season_weeks = table.keys % _KEY_STRIDE
+    # weeks after max_week + 1 see the same history as max_week + 1
+    weeks = range(int(season_weeks.min()) + 1, int(season_weeks.max()) + 2)
+    players = list(table.player_idx)
+
+    frames = []
+    for wk in weeks:
+        feat = table.features_for_week(wk, players)
+        has_history = feat["position"] != "UNK"
+        if not has_history.any():
+            continue
+        feat = feat[has_history.to_numpy()]
+        feat.insert(0, "week", wk)
+        frames.append(feat)
+
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, ignore_index=True)
+    out.insert(0, "season", season)
+    return out
+
+
+def precompute_predictions(
+    model,
+    df: Optional[pd.DataFrame],
+    out_path: str = predictions_path,
+    model_hash: Optional[str] = None,
+    feature_store: Optional[FeatureStore] = None,
+    data_stamp: Optional[Dict[str, object]] = None,
+) -> str:
+    """
+    Scores every player-week of every season in df with one model.predict
+    and writes a Parquet table stamped with the model's hash and data_stamp
+    (see prediction_data_stamp).
+
+    With a feature_store, its seasons and feature tables are used, df can
+    be None and the data stamp is taken from the feature store.
+    """
+    if feature_store is not None:
+        if data_stamp is None:
+            data_stamp = {
+                "source_sha256": feature_store.manifest["source_stamp"].get("sha256"),
+                "features_version": feature_store.manifest["version"],
+            }
+        tables = {s: feature_store.season_feature_table(s) for s in feature_store.seasons}
+    else:
+        tables = {int(s): build_season_feature_table(df, int(s)) for s in sorted(df["season"].unique())}
+    rows = pd.concat([_season_rows(t, s) for s, t in tables.items()], ignore_index=True)
+
+    preds = predict_next_week_points(model, rows).astype(float).to_numpy()
+    no_history = pd.DataFrame({
+        "player_id": ["_"], "position": ["UNK"],
+        "lag1_points": [0.0], "roll3_mean": [0.0], "roll5_mean": [0.0],
+    })
+    default_pred = float(predict_next_week_points(model, no_history).iloc[0])
+
+    table = pa.table({
+        "season": pa.array(rows["season"].to_numpy(dtype=np.int16)),
+        "week": pa.array(rows["week"].to_numpy(dtype=np.int16)),
+        "player_id": pa.array(rows["player_id"].astype(str)).dictionary_encode(),
+        "position": pa.array(rows["position"].astype(str)).dictionary_encode(),
+        "pred": pa.array(preds),
+    })
+    meta = {
+        "version": TABLE_VERSION,
+        "model_hash": model_hash or model_fingerprint(model),
+        "data": data_stamp,
+        "default_pred": default_pred,
+        "seasons": {
+            str(s): [int(w.min()), int(w.max())]
+            for s, w in rows.groupby("season")["week"]
+        },
+    }
+    table = table.replace_schema_metadata({"tradezone": json.dumps(meta)})
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    pq.write_table(table, out_path)
+    return out_path
+
+
+class PredictionTable:
+    """
+    In-memory lookup over a precomputed table. predict_weeks returns the
+    same (pred_points[week][pid], pred_pos[week][pid]) dicts as
+    engine.simulator.expected.predict_weeks, without calling the model.
+    """
+
+    def __init__(self, frame: pd.DataFrame, meta: Dict[str, object]):
+        self.model_hash = meta["model_hash"]
+        self.default_pred = float(meta["default_pred"])
+        self._week_range = {int(s): (int(lo), int(hi)) for s, (lo, hi) in meta["seasons"].items()}
+        self._by_season: Dict[int, Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray]] = {}
+
+        for season, part in frame.groupby("season", sort=False):
+            codes, uniques = pd.factorize(part["player_id"].astype(str), sort=True)
+            keys = codes.astype(np.int64) * _KEY_STRIDE + part["week"].to_numpy(dtype=np.int64)
+            order = np.argsort(keys, kind="stable")
+            self._by_season[int(season)] = (
+                {pid: i for i, pid in enumerate(uniques)},
+                keys[order],
+                part["pred"].to_numpy(dtype=np.float64)[order],
+                part["position"].astype(str).to_numpy(dtype=object)[order],
+            )
+
+    def covers(self, season: int) -> bool:
+        return int(season) in self._week_range
+
+    @traced("predict.table")
+    def predict_weeks(
+        self,
+        season: int,
+        player_ids: List[str],
+        weeks: List[int],
+    ) -> Tuple[Dict[int, Dict[str, float]], Dict[int, Dict[str, str]]]:
+        player_ids = list(dict.fromkeys(player_ids))
+        lo, hi = self._week_range[int(season)]
+        player_idx, keys, preds, positions = self._by_season[int(season)]
+        idx = np.array([player_idx.get(pid, -1) for pid in player_ids], dtype=np.int64)
+
+        pred_points: Dict[int, Dict[str, float]] = {}
+        pred_pos: Dict[int, Dict[str, str]] = {}
+        for wk in weeks:
+            target = min(wk, hi)   # later weeks see the same history as the last one
+            pts = np.full(len(player_ids), self.default_pred)
+            pos = np.full(len(player_ids), "UNK", dtype=object)
+            if target >= lo:
+                want = idx * _KEY_STRIDE + target
+                row = np.minimum(np.searchsorted(keys, want), len(keys) - 1)
+                hit = (idx >= 0) & (keys[row] == want)
+                pts[hit] = preds[row[hit]]
+                pos[hit] = positions[row[hit]]
+            pred_points[wk] = dict(zip(player_ids, pts.tolist()))
+            pred_pos[wk] = dict(zip(player_ids, pos.tolist()))
+        return pred_points, pred_pos
+
+
+def load_prediction_table(
+    path: str = predictions_path,
+    model=None,
+    data_stamp: Optional[Dict[str, object]] = None,
+) -> Optional[PredictionTable]:
+    """
+    Loads the table (memory-mapped) if it exists and, when a model and/or
+    data_stamp (prediction_data_stamp of the current weekly store) are
+    given, was built from that same model and data. Returns None otherwise,
+    meaning "use live inference".
+    """
+    if not os.path.exists(path):
+        return None
+    pf = pq.ParquetFile(path, memory_map=True)
+    raw = (pf.schema_arrow.metadata or {}).get(b"tradezone")
+    if raw is None:
+        return None
+    meta = json.loads(raw)
+    if meta.get("version") != TABLE_VERSION:
+        return None
+    if model is not None and meta["model_hash"] != model_fingerprint(model):
+        return None
+    if data_stamp is not None and meta.get("data") != data_stamp:
+        return None
+    return PredictionTable(pf.read().to_pandas(), meta)
+
+
+def main():
+    from engine.ml.feature_store import open_feature_store
+    from engine.ml.predict import load_model
+
+    model = load_model(model_path)
+    out = precompute_predictions(model, None, feature_store=open_feature_store(data_path))
+    print("Saved:", out)
+
+
+if __name__ == "__main__":
+    main()
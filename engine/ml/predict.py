@@ -1,12 +1,69 @@
-import joblib
+import hashlib
+import os
+import pickle
+import weakref
 import pandas as pd
 from typing import Optional
 
+from engine.tracing import traced
+
 model_path= "models/next_week_model.joblib"
 
+# model object -> fingerprint, so we hash each loaded model only once
+_fingerprints = weakref.WeakKeyDictionary()
+
 def load_model(path: str = model_path):
-    return joblib.load(path)
+    """
+    The fitted sklearn pipeline. joblib (and sklearn, while unpickling) are
+    imported here, on first use, not when this module is imported. Arrays
+    are memory-mapped read-only from the file instead of copied.
+    """
+    import joblib
+
+    model = joblib.load(path, mmap_mode="r")
+    # fingerprint = hash of the file we loaded, so every load of it agrees
+    _fingerprints[model] = file_fingerprint(path)
+    return model
+
+def load_inference_model(path: str = model_path):
+    """
+    What replays should predict with: the compiled copy of the model at
+    path (engine.ml.compiled, no sklearn) if one was exported from this
+    exact file, else load_model(path). Both give the same fingerprint.
+    """
+    from engine.ml.compiled import load_compiled_model
+
+    compiled = load_compiled_model(os.path.splitext(path)[0] + ".npz", model_hash=file_fingerprint(path))
+    return compiled if compiled is not None else load_model(path)
+
+def register_fingerprint(model, fingerprint: str) -> None:
+    """Makes model_fingerprint(model) return fingerprint (e.g. a model compiled from that file)."""
+    _fingerprints[model] = fingerprint
+
+def file_fingerprint(path: str = model_path) -> str:
+    """Same fingerprint load_model(path) would give, without loading the model."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def model_fingerprint(model) -> str:
+    """
+    Short content hash of a fitted model, used to key caches and stamp
+    files derived from it. Models from load_model() use the joblib file's
+    hash; anything else falls back to hashing its pickle (stable for the
+    life of the object).
+    """
+    try:
+        return _fingerprints[model]
+    except (KeyError, TypeError):
+        pass
+    fp = hashlib.sha256(pickle.dumps(model, protocol=4)).hexdigest()[:16]
+    try:
+        _fingerprints[model] = fp
+    except TypeError:
+        pass  # not weak-referenceable; just recompute next time
+    return fp
 
+@traced("predict.sklearn", rows=len)
 def predict_next_week_points(
     model,
     features_df: pd.DataFrame,
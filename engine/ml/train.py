@@ -1,5 +1,11 @@
+import argparse
+import json
 import os
+import time
+from typing import Dict, List, Optional, Tuple
+
 import joblib
+import numpy as np
 import pandas as pd
 
 from sklearn.compose import ColumnTransformer
@@ -9,15 +15,29 @@ from sklearn.impute import SimpleImputer
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from sklearn.metrics import r2_score
+from sklearn.model_selection import ParameterGrid
 
-from engine.ml.features import make_features
+from engine.ml.compiled import compiled_model_path, export_compiled_model
+from engine.ml.feature_store import open_feature_store
+from engine.ml.precompute import precompute_predictions, predictions_path
+from engine.ml.predict import file_fingerprint
 
 data_path = "dataset/weekly.csv"
 model_path= "models/next_week_model.joblib"
+cv_report_path = "models/cv_report.json"
 
 num_cols = ["lag1_points", "roll3_mean", "roll5_mean"]
 cat_cols = ["position"]
 
+default_params = {"max_depth": 6, "learning_rate": 0.07}
+
+# --cv search space; the default model is one of the candidates
+param_grid = {
+    "max_depth": [4, 6, 8],
+    "learning_rate": [0.05, 0.07, 0.1],
+    "max_leaf_nodes": [31, 63],
+}
+
 def train_test_split_by_season(feat_df: pd.DataFrame):
     seasons = sorted(feat_df["season"].unique())
     if len(seasons) < 3:
@@ -30,25 +50,173 @@ def train_test_split_by_season(feat_df: pd.DataFrame):
     test_df = feat_df[feat_df["season"].isin(test_seasons)].copy()
     return train_df, test_df, train_seasons, test_seasons
 
-def build_pipeline():
-    pre = ColumnTransformer(
+def walk_forward_splits(seasons: List[int], min_train_seasons: int = 2) -> List[Tuple[List[int], int]]:
+    """(train on seasons < S, test on S) for every S with enough seasons before it."""
+    seasons = sorted(seasons)
+    if len(seasons) <= min_train_seasons:
+        raise ValueError(f"Need more than {min_train_seasons} seasons for walk-forward validation.")
+    return [(seasons[:i], seasons[i]) for i in range(min_train_seasons, len(seasons))]
+
+def build_preprocessor():
+    return ColumnTransformer(
         transformers=[
             ("num", Pipeline([("imp", SimpleImputer(strategy="median"))]), num_cols),
             ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), cat_cols),
         ]
     )
 
-    model = HistGradientBoostingRegressor(
-        max_depth=6,
-        learning_rate=0.07,
-        random_state=42
+def build_model(params: Optional[Dict[str, object]] = None):
+    return HistGradientBoostingRegressor(**{**default_params, **(params or {}), "random_state": 42})
+
+def build_pipeline(params: Optional[Dict[str, object]] = None):
+    return Pipeline([("pre", build_preprocessor()), ("model", build_model(params))])
+
+def _fold_matrices(feat_df: pd.DataFrame, train_seasons: List[int], test_season: int) -> Dict[str, object]:
+    """
+    Preprocessed train/test matrices of one fold. The preprocessor doesn't
+    depend on hyperparameters, so it is fit once per fold and every candidate
+    reuses the arrays (joblib memory-maps them into the workers).
+    """
+    start = time.perf_counter()
+    train_df = feat_df[feat_df["season"].isin(train_seasons)]
+    test_df = feat_df[feat_df["season"] == test_season]
+
+    pre = build_preprocessor()
+    X_train = pre.fit_transform(train_df[num_cols + cat_cols])
+    X_test = pre.transform(test_df[num_cols + cat_cols])
+    return {
+        "test_season": int(test_season),
+        "train_seasons": [int(s) for s in train_seasons],
+        "X_train": np.ascontiguousarray(X_train, dtype=np.float64),
+        "y_train": train_df["y_next_week"].to_numpy(dtype=np.float64),
+        "X_test": np.ascontiguousarray(X_test, dtype=np.float64),
+        "y_test": test_df["y_next_week"].to_numpy(dtype=np.float64),
+        "baseline": test_df["lag1_points"].to_numpy(dtype=np.float64),
+        "prep_seconds": time.perf_counter() - start,
+    }
+
+def _fit_and_score(fold: Dict[str, object], params: Dict[str, object]) -> Dict[str, object]:
+    start = time.perf_counter()
+    model = build_model(params).fit(fold["X_train"], fold["y_train"])
+    preds = model.predict(fold["X_test"])
+    return {
+        "test_season": fold["test_season"],
+        "params": params,
+        "mae": float(mean_absolute_error(fold["y_test"], preds)),
+        "rmse": float(mean_squared_error(fold["y_test"], preds) ** 0.5),
+        "fit_seconds": time.perf_counter() - start,
+    }
+
+def walk_forward_search(
+    feat_df: pd.DataFrame,
+    grid: Optional[Dict[str, list]] = None,
+    n_jobs: int = -1,
+    min_train_seasons: int = 2,
+) -> Dict[str, object]:
+    """
+    Walk-forward CV for every hyperparameter candidate, with (fold, candidate)
+    fits spread across processes. The winner has the lowest mean MAE over folds.
+
+    Returns best_params, candidates (mean MAE/RMSE per candidate) and folds:
+    per test season, the winner's MAE/RMSE next to the lag1 baseline plus
+    wall-clock (preprocessing, the winner's fit, all fits of that fold).
+    """
+    seasons = sorted(int(s) for s in feat_df["season"].unique())
+    folds = [_fold_matrices(feat_df, train, test) for train, test in walk_forward_splits(seasons, min_train_seasons)]
+    candidates = list(ParameterGrid(grid if grid is not None else param_grid))
+
+    start = time.perf_counter()
+    results = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(_fit_and_score)(fold, params) for params in candidates for fold in folds
     )
+    search_seconds = time.perf_counter() - start
+
+    by_candidate = [results[i * len(folds):(i + 1) * len(folds)] for i in range(len(candidates))]
+    summary = [
+        {
+            "params": params,
+            "mean_mae": float(np.mean([r["mae"] for r in rows])),
+            "mean_rmse": float(np.mean([r["rmse"] for r in rows])),
+        }
+        for params, rows in zip(candidates, by_candidate)
+    ]
+    best = min(range(len(candidates)), key=lambda i: summary[i]["mean_mae"])
+
+    fold_reports = []
+    for k, fold in enumerate(folds):
+        baseline_mae = float(mean_absolute_error(fold["y_test"], fold["baseline"]))
+        win = by_candidate[best][k]
+        fold_reports.append({
+            "test_season": fold["test_season"],
+            "n_train": int(len(fold["y_train"])),
+            "n_test": int(len(fold["y_test"])),
+            "mae": win["mae"],
+            "rmse": win["rmse"],
+            "baseline_mae": baseline_mae,
+            "baseline_rmse": float(mean_squared_error(fold["y_test"], fold["baseline"]) ** 0.5),
+            "mae_improvement_pct": (baseline_mae - win["mae"]) / baseline_mae * 100,
+            "prep_seconds": fold["prep_seconds"],
+            "fit_seconds": win["fit_seconds"],
+            "all_fits_seconds": float(sum(rows[k]["fit_seconds"] for rows in by_candidate)),
+        })
+
+    return {
+        "best_params": candidates[best],
+        "candidates": sorted(summary, key=lambda c: c["mean_mae"]),
+        "folds": fold_reports,
+        "search_seconds": search_seconds,
+    }
 
-    return Pipeline([("pre", pre), ("model", model)])
+def _save_model(pipe, store):
+    os.makedirs("models", exist_ok=True)
+    joblib.dump(pipe, model_path)
+    print("Saved:", model_path)
+
+    # flat-array copy for fast small-batch inference without sklearn
+    export_compiled_model(pipe, compiled_model_path, model_hash=file_fingerprint(model_path))
+    print("Saved:", compiled_model_path)
+
+    # score every player-week once so ML replays can be table lookups
+    precompute_predictions(pipe, None, predictions_path, model_hash=file_fingerprint(model_path), feature_store=store)
+    print("Saved:", predictions_path)
+
+def main_cv(feat_df: pd.DataFrame, store, n_jobs: int = -1, min_train_seasons: int = 2):
+    report = walk_forward_search(feat_df, n_jobs=n_jobs, min_train_seasons=min_train_seasons)
+
+    print("\n=== Walk-Forward CV (Next-Week Fantasy Points) ===")
+    print("Best params:", report["best_params"])
+    print("Search wall-clock (s):", round(report["search_seconds"], 1))
+    print("\nseason  n_train  MAE     RMSE    base_MAE  base_RMSE  impr%   prep_s  fit_s  all_fits_s")
+    for f in report["folds"]:
+        print(
+            f"{f['test_season']:<7} {f['n_train']:<8} {f['mae']:<7.3f} {f['rmse']:<7.3f} "
+            f"{f['baseline_mae']:<9.3f} {f['baseline_rmse']:<10.3f} {f['mae_improvement_pct']:<7.1f} "
+            f"{f['prep_seconds']:<7.2f} {f['fit_seconds']:<6.2f} {f['all_fits_seconds']:.2f}"
+        )
 
-def main():
-    df = pd.read_csv(data_path)
-    feat_df = make_features(df)
+    # the winner is refit on every season before saving
+    pipe = build_pipeline(report["best_params"])
+    pipe.fit(feat_df[num_cols + cat_cols], feat_df["y_next_week"])
+    _save_model(pipe, store)
+
+    with open(cv_report_path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print("Saved:", cv_report_path)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the next-week points model.")
+    parser.add_argument("--cv", action="store_true", help="walk-forward CV + hyperparameter search")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="processes for --cv (default: all cores)")
+    parser.add_argument("--min-train-seasons", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    # features are recomputed only for player-seasons whose rows changed
+    store = open_feature_store(data_path)
+    feat_df = store.load()
+
+    if args.cv:
+        main_cv(feat_df, store, args.n_jobs, args.min_train_seasons)
+        return
 
     train_df, test_df, train_seasons, test_seasons = train_test_split_by_season(feat_df)
 
@@ -89,11 +257,8 @@ def main():
 
     print("\n-- Improvement --")
     print("MAE improvement vs baseline (%):", round(mae_improvement, 1))
-        
 
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(pipe, model_path)
-    print("Saved:", model_path)
+    _save_model(pipe, store)
 
     print("\n=== Model Evaluation ===")
     print("Test MAE:", round(mae, 3))
@@ -0,0 +1,440 @@
+"""
+Batch replay runner: many (season, roster, trade) jobs from a file.
+
+    python -m engine.run_batch jobs.jsonl --out results.jsonl [--mode historical,expected] [--workers 4]
+    python -m engine.run_batch jobs.csv --out results_dir --format parquet
+
+Jobs, JSONL (one object per line):
+    {"job_id": "a1", "season": 2023, "roster": ["00-0033873", ...],
+     "trade": {"week": 6, "give": [...], "get": [...]}, "end_week": 17}
+
+Jobs, CSV: columns job_id, season, roster, trade_week, give, get and
+optionally end_week; the id lists are separated by "|".
+
+job_id defaults to the job's line number; end_week defaults to the
+season's last week, capped at 17 like the app.
+
+Jobs are cut into shards of --shard-size and run on a process pool. Each
+worker loads a season's data, index and feature table (and the model, for
+expected replays) the first time it needs them and keeps them for the
+following shards. With --shared-index the weekly index of every season is
+built once up front and shared with the workers through shared memory
+(engine/loading_data/shared_index.py) instead. Results are written as
+shards finish, one row per (job, mode), so memory stays flat however long
+the job file is:
+
+  - jsonl: appended to --out
+  - parquet: --out is a directory; every run adds a part-NNNNN.parquet
+    with one row group per shard
+
+After a shard's rows are written its job ids are appended to the
+checkpoint file (--out + ".done" by default). Rerunning the same command
+skips those jobs, so an interrupted run picks up where it stopped. A crash
+between the two writes can repeat at most the in-flight shards; dedupe on
+(job_id, mode) if that matters. A job that fails is written with its
+error message and counts as done.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engine.simulator.simulate import Trade
+
+data_path = "dataset/weekly.csv"
+store_path = "dataset/weekly_store"
+model_path = "models/next_week_model.joblib"
+predictions_path = "models/next_week_predictions.parquet"
+
+MODES = ("historical", "expected")
+
+RESULT_SCHEMA = pa.schema([
+    ("job_id", pa.string()),
+    ("mode", pa.string()),
+    ("season", pa.int32()),
+    ("trade_week", pa.int32()),
+    ("end_week", pa.int32()),
+    ("total_delta", pa.float64()),
+    ("weekly_delta", pa.list_(pa.float64())),
+    ("weekly_with_trade", pa.list_(pa.float64())),
+    ("weekly_without_trade", pa.list_(pa.float64())),
+    ("error", pa.string()),
+])
+
+
+def _split_ids(value: str) -> List[str]:
+    return [pid.strip() for pid in str(value or "").split("|") if pid.strip()]
+
+
+def iter_jobs(path: str) -> Iterator[Dict[str, object]]:
+    """Jobs from a .jsonl or .csv file, normalized, in file order (streamed)."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            for n, row in enumerate(csv.DictReader(f), start=1):
+                yield {
+                    "job_id": row.get("job_id") or str(n),
+                    "season": row["season"],
+                    "roster": _split_ids(row["roster"]),
+                    "trade": {"week": row["trade_week"], "give": _split_ids(row["give"]), "get": _split_ids(row["get"])},
+                    "end_week": row.get("end_week") or None,
+                }
+        return
+
+    with open(path) as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job.setdefault("job_id", str(n))
+            job["job_id"] = str(job["job_id"])
+            yield job
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+# ---- worker side ----
+
+class _Worker:
+    """Per-process data: season indexes and feature tables (small LRU), model once."""
+
+    def __init__(self, modes, csv_path, store_dir, model_file, predictions_file, shared_name=None, max_seasons=4):
+        self.modes = modes
+        self.csv_path = csv_path
+        self.store_dir = store_dir
+        self.model_file = model_file
+        self.predictions_file = predictions_file
+        self.max_seasons = max_seasons
+        self.seasons: "OrderedDict[int, Dict[str, object]]" = OrderedDict()
+        self.model = None
+        self.prediction_table = None
+        self.memo = None
+        self.shared = None
+        if shared_name is not None:
+            from engine.loading_data.shared_index import attach_weekly_index
+            self.shared = attach_weekly_index(shared_name)
+
+    def _shared_season(self, season: int) -> Dict[str, object]:
+        cell = self.shared.cell(season, self.shared.min_week)
+        present = np.flatnonzero((self.shared.pos_codes[cell[0]] >= 0).any(axis=1)) if cell else []
+        if not len(present):
+            raise ValueError(f"no rows for season {season}")
+        return {
+            "df": None, "points_index": self.shared.points_index, "pos_index": self.shared.pos_index,
+            "max_week": int(present[-1]) + self.shared.min_week, "feature_table": None, "data_stamp": None,
+        }
+
+    def _load_rows(self, season: int):
+        """(season rows, sha256 of the CSV they were read from)."""
+        from engine.loading_data.load import load_weekly_seasons
+        from engine.loading_data.store import open_store
+
+        stamp = open_store(self.csv_path, self.store_dir).manifest["stamp"].get("sha256")
+        return load_weekly_seasons([season], self.csv_path, self.store_dir), stamp
+
+    def season(self, season: int) -> Dict[str, object]:
+        from engine.loading_data.load import build_weekly_indexes
+
+        data = self.seasons.get(season)
+        if data is None:
+            if self.shared is not None:
+                data = self._shared_season(season)
+            else:
+                df, stamp = self._load_rows(season)
+                if df.empty:
+                    raise ValueError(f"no rows for season {season}")
+                points_index, pos_index, _ = build_weekly_indexes(df)
+                data = {
+                    "df": df, "points_index": points_index, "pos_index": pos_index,
+                    "max_week": int(df["week"].max()), "feature_table": None, "data_stamp": stamp,
+                }
+            self.seasons[season] = data
+            if len(self.seasons) > self.max_seasons:
+                self.seasons.popitem(last=False)
+        self.seasons.move_to_end(season)
+        return data
+
+    def load_model(self):
+        if self.model is None:
+            from engine.loading_data.store import open_store
+            from engine.ml.precompute import load_prediction_table, prediction_data_stamp
+            from engine.ml.predict import load_inference_model
+            from engine.simulator.expected import PredictionMemo
+
+            store = open_store(self.csv_path, self.store_dir)
+            self.model = load_inference_model(self.model_file)
+            self.prediction_table = load_prediction_table(
+                self.predictions_file, self.model, prediction_data_stamp(store)
+            )
+            # like the service's: only valid for feature tables built from the same CSV
+            self.memo = PredictionMemo(data_stamp=store.manifest["stamp"].get("sha256"))
+        return self.model
+
+    def run_job(self, job: Dict[str, object]) -> List[Dict[str, object]]:
+        from engine.simulator.expected import build_season_feature_table, expected_counterfactual_replay
+        from engine.simulator.lineup import optimal_lineup_points
+        from engine.simulator.simulate import counterfactual_replay
+
+        base = {"job_id": job["job_id"], "season": None, "trade_week": None, "end_week": None}
+        try:
+            season = int(job["season"])
+            raw = job["trade"]
+            trade = Trade(week=int(raw["week"]), give=[str(p) for p in raw["give"]], get=[str(p) for p in raw["get"]])
+            roster = [str(p) for p in job["roster"]]
+            data = self.season(season)
+            end_week = int(job.get("end_week") or min(data["max_week"], 17))
+            if not 1 <= trade.week <= end_week:
+                raise ValueError(f"trade week {trade.week} outside 1..{end_week}")
+        except Exception as exc:
+            return [{**base, "mode": mode, "error": f"{type(exc).__name__}: {exc}"} for mode in self.modes]
+
+        base.update(season=season, trade_week=trade.week, end_week=end_week)
+        rows = []
+        for mode in self.modes:
+            try:
+                if mode == "historical":
+                    res = counterfactual_replay(roster, trade, data["points_index"], data["pos_index"], season, end_week)
+                else:
+                    model = self.load_model()
+                    if data["df"] is None:   # shared index: rows only needed for expected replays
+                        data["df"], data["data_stamp"] = self._load_rows(season)
+                    if data["feature_table"] is None and not (
+                        self.prediction_table is not None and self.prediction_table.covers(season)
+                    ):
+                        data["feature_table"] = build_season_feature_table(data["df"], season, data["data_stamp"])
+                    res = expected_counterfactual_replay(
+                        model, data["df"], roster, trade, season, end_week, optimal_lineup_points,
+                        feature_table=data["feature_table"], memo=self.memo,
+                        prediction_table=self.prediction_table,
+                    )
+                rows.append({
+                    **base, "mode": mode, "error": None,
+                    "total_delta": float(res["total_delta"]),
+                    "weekly_delta": [float(x) for x in res["weekly_delta"]],
+                    "weekly_with_trade": [float(x) for x in res["weekly_with_trade"]],
+                    "weekly_without_trade": [float(x) for x in res["weekly_without_trade"]],
+                })
+            except Exception as exc:
+                rows.append({**base, "mode": mode, "error": f"{type(exc).__name__}: {exc}"})
+        return rows
+
+    def run_shard(self, shard: List[Dict[str, object]]):
+        rows = [row for job in shard for row in self.run_job(job)]
+        return [job["job_id"] for job in shard], rows
+
+
+# set once per process by the pool initializer
+_worker: Optional[_Worker] = None
+
+
+def _init_worker(*args):
+    global _worker
+    _worker = _Worker(*args)
+
+
+def _run_shard_in_worker(shard):
+    return _worker.run_shard(shard)
+
+
+# ---- output ----
+
+class _JsonlSink:
+    def __init__(self, path: str):
+        self.f = open(path, "a")
+
+    def write(self, rows) -> None:
+        for row in rows:
+            self.f.write(json.dumps(row) + "\n")
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.writer = None
+
+    def write(self, rows) -> None:
+        if not rows:
+            return
+        if self.writer is None:   # opened on first rows: a run with nothing left adds no file
+            os.makedirs(self.out_dir, exist_ok=True)
+            n = len(glob.glob(os.path.join(self.out_dir, "part-*.parquet")))
+            self.writer = pq.ParquetWriter(os.path.join(self.out_dir, f"part-{n:05d}.parquet"), RESULT_SCHEMA)
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=RESULT_SCHEMA))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        n = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    return n - 1 if path.endswith(".csv") else n   # csv header
+
+
+def _shards(jobs: Iterator[Dict[str, object]], done: Set[str], size: int) -> Iterator[List[Dict[str, object]]]:
+    shard = []
+    for job in jobs:
+        if job["job_id"] in done:
+            continue
+        shard.append(job)
+        if len(shard) >= size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+class _Progress:
+    def __init__(self, total: int, skipped: int, every: float = 2.0, stream=sys.stderr):
+        self.total, self.skipped, self.every, self.stream = total, skipped, every, stream
+        self.done = 0
+        self.start = self._last = time.perf_counter()
+
+    def update(self, n: int, force: bool = False) -> None:
+        self.done += n
+        now = time.perf_counter()
+        if not force and now - self._last < self.every:
+            return
+        self._last = now
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        left = max(self.total - self.skipped - self.done, 0)
+        eta = f"{left / rate:.0f}s" if rate > 0 else "?"
+        print(
+            f"[batch] {self.skipped + self.done}/{self.total} jobs"
+            f"  {rate:.1f} jobs/s  elapsed {elapsed:.0f}s  eta {eta}",
+            file=self.stream, flush=True,
+        )
+
+
+def run_batch(
+    jobs_path: str,
+    out: str,
+    modes=("historical",),
+    fmt: str = "jsonl",
+    workers: int = 1,
+    shard_size: int = 64,
+    checkpoint: Optional[str] = None,
+    csv_path: str = data_path,
+    store_dir: str = store_path,
+    model_file: str = model_path,
+    predictions_file: str = predictions_path,
+    progress_every: float = 2.0,
+    shared_index: bool = False,
+) -> Dict[str, int]:
+    """
+    Runs every job not yet in the checkpoint. Returns counts: jobs run,
+    skipped (already done), rows written, failed rows.
+
+    shared_index (workers > 1): build the weekly index of every season once
+    here and publish it in shared memory; workers attach to it instead of
+    loading and indexing seasons themselves.
+    """
+    modes = tuple(modes)
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        raise ValueError(f"unknown modes {unknown}; choose from {MODES}")
+    checkpoint = checkpoint or out.rstrip("/") + ".done"
+    done = read_checkpoint(checkpoint)
+    progress = _Progress(_count_lines(jobs_path), len(done), progress_every)
+    shards = _shards(iter_jobs(jobs_path), done, shard_size)
+    worker_args = (modes, csv_path, store_dir, model_file, predictions_file)
+
+    sink = _ParquetSink(out) if fmt == "parquet" else _JsonlSink(out)
+    counts = {"jobs": 0, "skipped": len(done), "rows": 0, "failed": 0}
+
+    with open(checkpoint, "a") as ckpt:
+        def finish(job_ids, rows):
+            sink.write(rows)
+            ckpt.write("".join(f"{job_id}\n" for job_id in job_ids))
+            ckpt.flush()
+            counts["jobs"] += len(job_ids)
+            counts["rows"] += len(rows)
+            counts["failed"] += sum(row["error"] is not None for row in rows)
+            progress.update(len(job_ids))
+
+        try:
+            if workers <= 1:
+                local = _Worker(*worker_args)
+                for shard in shards:
+                    finish(*local.run_shard(shard))
+            else:
+                stack = ExitStack()
+                if shared_index:
+                    from engine.loading_data.load import load_weekly_seasons
+                    from engine.loading_data.shared_index import publish_weekly_index
+                    from engine.loading_data.weekly_index import build_weekly_index
+
+                    index = build_weekly_index(load_weekly_seasons(None, csv_path, store_dir))
+                    worker_args += (stack.enter_context(publish_weekly_index(index)).name,)
+                    del index
+                # at most 2 shards per worker in flight: results stream out, memory stays flat
+                with stack, ProcessPoolExecutor(workers, initializer=_init_worker, initargs=worker_args) as ex:
+                    pending = set()
+                    for shard in shards:
+                        pending.add(ex.submit(_run_shard_in_worker, shard))
+                        if len(pending) >= 2 * workers:
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for fut in finished:
+                                finish(*fut.result())
+                    for fut in wait(pending).done:
+                        finish(*fut.result())
+        finally:
+            sink.close()
+            progress.update(0, force=True)
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run replay jobs from a JSONL/CSV file.")
+    parser.add_argument("jobs", help="jobs file (.jsonl or .csv)")
+    parser.add_argument("--out", required=True, help="results .jsonl file, or a directory for --format parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default=None, help="default: from --out")
+    parser.add_argument("--mode", default="historical", help="comma list of historical, expected")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=64)
+    parser.add_argument("--checkpoint", default=None, help="default: <out>.done")
+    parser.add_argument("--data", default=data_path)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--model", default=model_path)
+    parser.add_argument("--predictions", default=predictions_path)
+    parser.add_argument("--shared-index", action="store_true",
+                        help="index every season once and share it with the workers (shared memory)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("jsonl" if args.out.endswith(".jsonl") else "parquet")
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    try:
+        counts = run_batch(
+            args.jobs, args.out, modes, fmt, args.workers, args.shard_size, args.checkpoint,
+            args.data, args.store, args.model, args.predictions, shared_index=args.shared_index,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(f"Ran {counts['jobs']} jobs ({counts['skipped']} already done), "
+          f"wrote {counts['rows']} rows, {counts['failed']} failed -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
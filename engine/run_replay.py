@@ -1,14 +1,18 @@
-from engine.loading_data.load import load_weekly_csv, build_weekly_indexes, get_season_week_range
+from engine.loading_data.load import load_weekly_seasons, build_weekly_indexes, get_season_week_range
+from engine.loading_data.store import open_store
 from engine.simulator.simulate import Trade, counterfactual_replay
 
 def main():
-    #1 let's load + index data
-    df = load_weekly_csv("dataset/weekly.csv")
-    points_index, pos_index, name_by_id = build_weekly_indexes(df)
+    #1 open the season store (only the manifest is read here)
+    store = open_store("dataset/weekly.csv", "dataset/weekly_store")
 
     #2 choose a season and week range
-    season = int(df["season"].max())  # most recent season in file
-    min_w, max_w = get_season_week_range(df, season)
+    season = store.seasons[-1]  # most recent season in file
+    min_w, max_w = get_season_week_range(store, season)
+
+    # load + index just that season
+    df = load_weekly_seasons([season])
+    points_index, pos_index, name_by_id = build_weekly_indexes(df)
 
     print(f"Using season={season}, weeks={min_w}..{max_w}")
 
@@ -0,0 +1,536 @@
+"""
+Long-running local replay service: data, indexes and the model stay warm
+in memory between requests.
+
+    python -m engine.service [--port 8765] [--preload 2023] [--live-inference]
+
+HTTP/JSON on asyncio (stdlib only, HTTP/1.1 keep-alive):
+
+    GET  /health                 status, loaded seasons, model info
+    GET  /stats                  micro-batch counters + timing spans
+    GET  /players?season=2023    player ids / names / positions of a season
+    POST /replay/historical      {"season", "roster", "trade": {"week", "give", "get"}, "end_week"?}
+    POST /replay/expected        same body, replayed on ML predictions
+    POST /replay/batch           {"season", "roster", "trades": [...], "end_week"?}
+
+end_week defaults to the season's last week, capped at 17 like the app.
+
+Replays run on a thread pool so a slow request (a cold season, a big
+batch) doesn't hold up quick ones. Expected replays without a matching
+precomputed prediction table go through MicroBatcher: feature rows of
+requests that arrive close together are scored with one model.predict.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from engine import tracing
+from engine.loading_data.load import build_weekly_indexes, get_season_week_range, load_weekly_seasons
+from engine.loading_data.store import open_store
+from engine.simulator.expected import (
+    SeasonFeatureTable,
+    PredictionMemo,
+    build_season_feature_table,
+    counterfactual_from_predictions,
+    pending_features,
+    scatter_predictions,
+)
+from engine.simulator.lineup import optimal_lineup_points
+from engine.simulator.simulate import Trade, apply_trade_to_roster, counterfactual_replay, counterfactual_replay_many
+
+data_path = "dataset/weekly.csv"
+store_path = "dataset/weekly_store"
+model_path = "models/next_week_model.joblib"
+predictions_path = "models/next_week_predictions.parquet"
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+FEATURE_COLS = ["lag1_points", "roll3_mean", "roll5_mean", "position"]
+
+
+class RequestError(Exception):
+    """Bad request body or parameters (-> HTTP 400)."""
+
+
+@dataclass
+class SeasonData:
+    season: int
+    df: pd.DataFrame
+    points_index: object
+    pos_index: object
+    name_by_id: Dict[str, str]
+    max_week: int
+    memo: PredictionMemo
+    feature_table: Optional[SeasonFeatureTable] = None
+
+
+class ServiceState:
+    """
+    Everything the endpoints need, loaded once. Seasons are loaded on first
+    use (or up front with preload) and kept; the model and prediction table
+    are loaded on the first expected replay.
+
+    A fitted model can be passed in directly (tests, notebooks);
+    live_inference=True ignores the precomputed prediction table.
+    """
+
+    def __init__(
+        self,
+        csv_path: str = data_path,
+        store_dir: str = store_path,
+        model_file: str = model_path,
+        predictions_file: str = predictions_path,
+        model=None,
+        live_inference: bool = False,
+    ):
+        self.csv_path = csv_path
+        self.store_dir = store_dir
+        self.model_file = model_file
+        self.predictions_file = predictions_file
+        self.live_inference = live_inference
+        self.store = open_store(csv_path, store_dir)
+        self._seasons: Dict[int, SeasonData] = {}
+        # _lock only guards the per-season lock table; loads run under their season's own lock,
+        # so a cold season never holds up requests for warm ones
+        self._lock = threading.Lock()
+        self._season_locks: Dict[int, threading.Lock] = {}
+        self._model_lock = threading.Lock()
+        self._model = model
+        self._model_key: Optional[str] = None
+        self._prediction_table = None
+        self._model_loaded = model is not None
+
+    def _season_lock(self, season: int) -> threading.Lock:
+        with self._lock:
+            return self._season_locks.setdefault(season, threading.Lock())
+
+    def season(self, season: int) -> SeasonData:
+        season = int(season)
+        data = self._seasons.get(season)
+        if data is not None:
+            return data
+        if season not in self.store.seasons:
+            raise RequestError(f"unknown season {season}; have {self.store.seasons}")
+        with self._season_lock(season):
+            data = self._seasons.get(season)   # loaded while we waited
+            if data is not None:
+                return data
+            df = load_weekly_seasons([season], self.csv_path, self.store_dir)
+            points_index, pos_index, name_by_id = build_weekly_indexes(df)
+            _, max_week = get_season_week_range(self.store, season)
+            # memoized predictions live and die with the rows their features come from
+            memo = PredictionMemo(data_stamp=self.store.manifest["stamp"].get("sha256"))
+            data = SeasonData(season, df, points_index, pos_index, name_by_id, int(max_week), memo)
+            self._seasons[season] = data
+            return data
+
+    def feature_table(self, season: int) -> SeasonFeatureTable:
+        data = self.season(season)
+        if data.feature_table is not None:
+            return data.feature_table
+        with self._season_lock(data.season):
+            if data.feature_table is None:
+                data.feature_table = build_season_feature_table(data.df, data.season, data.memo.data_stamp)
+            return data.feature_table
+
+    def model(self):
+        """(model, model_key, prediction_table or None)."""
+        if self._model_key is not None:
+            return self._model, self._model_key, self._prediction_table
+
+        from engine.ml.precompute import load_prediction_table, prediction_data_stamp
+        from engine.ml.predict import load_inference_model, model_fingerprint
+
+        with self._model_lock:
+            if not self._model_loaded:
+                if not os.path.exists(self.model_file):
+                    raise RequestError(f"no model at {self.model_file}; run python -m engine.ml.train")
+                self._model = load_inference_model(self.model_file)
+                self._model_loaded = True
+            if self._model_key is None:
+                if not self.live_inference:
+                    self._prediction_table = load_prediction_table(
+                        self.predictions_file, self._model, prediction_data_stamp(self.store)
+                    )
+                self._model_key = model_fingerprint(self._model)   # set last: it marks the model as ready
+            return self._model, self._model_key, self._prediction_table
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._model_loaded
+
+    @property
+    def loaded_seasons(self) -> List[int]:
+        return sorted(self._seasons)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predict calls. Each caller awaits predict(frame);
+    a single consumer task gathers whatever is queued (waiting up to
+    max_wait_ms after the first item, at most max_rows rows), runs ONE
+    predict_fn on the concatenated frame in the executor and hands each
+    caller its slice.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[pd.DataFrame], np.ndarray],
+        executor=None,
+        max_rows: int = 100_000,
+        max_wait_ms: float = 2.0,
+    ):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future))
+        return await future
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "mean_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _drain(self, batch, n_rows: int) -> int:
+        while n_rows < self.max_rows and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            n_rows += len(item[0])
+        return n_rows
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n_rows = self._drain(batch, len(batch[0][0]))
+            if n_rows < self.max_rows and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                n_rows = self._drain(batch, n_rows)
+
+            frames = [frame for frame, _ in batch]
+            try:
+                preds = await loop.run_in_executor(
+                    self.executor, self.predict_fn, pd.concat(frames, ignore_index=True)
+                )
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += n_rows
+            start = 0
+            for frame, future in batch:
+                if not future.done():   # caller may have gone away
+                    future.set_result(preds[start:start + len(frame)])
+                start += len(frame)
+
+
+def _parse_trade(raw) -> Trade:
+    if not isinstance(raw, dict):
+        raise RequestError("trade must be an object with week, give, get")
+    try:
+        return Trade(week=int(raw["week"]), give=[str(p) for p in raw["give"]], get=[str(p) for p in raw["get"]])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise RequestError(f"bad trade {raw!r}: {exc}")
+
+
+def _parse_replay(body: Dict[str, object], state: ServiceState) -> Tuple[SeasonData, List[str], int]:
+    try:
+        season = int(body["season"])
+        roster = [str(p) for p in body["roster"]]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise RequestError(f"body needs season and roster: {exc}")
+    if not roster:
+        raise RequestError("roster is empty")
+    data = state.season(season)
+    try:
+        end_week = int(body.get("end_week") or min(data.max_week, 17))
+    except (TypeError, ValueError) as exc:
+        raise RequestError(f"bad end_week {body.get('end_week')!r}: {exc}")
+    return data, roster, end_week
+
+
+def _check_week(trade: Trade, end_week: int) -> None:
+    if not 1 <= trade.week <= end_week:
+        raise RequestError(f"trade week {trade.week} outside 1..{end_week}")
+
+
+def _to_json(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+
+class ReplayService:
+    """Endpoint handlers plus the asyncio HTTP server around them."""
+
+    def __init__(self, state: ServiceState, workers: int = 4, max_batch_rows: int = 100_000, max_wait_ms: float = 2.0):
+        self.state = state
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay")
+        # one thread for the model: batches run back to back, never concurrently
+        self.model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+        self.batcher = MicroBatcher(self._predict, self.model_executor, max_batch_rows, max_wait_ms)
+        self.started = time.time()
+        self.requests = 0
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("GET", "/players"): self.players,
+            ("POST", "/replay/historical"): self.historical,
+            ("POST", "/replay/expected"): self.expected,
+            ("POST", "/replay/batch"): self.batch,
+        }
+
+    def _predict(self, frame: pd.DataFrame) -> np.ndarray:
+        from engine.ml.predict import predict_next_week_points
+
+        model, _, _ = self.state.model()
+        return predict_next_week_points(model, frame).to_numpy(dtype=float)
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ---- endpoints ----
+
+    async def health(self, query, body):
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started, 1),
+            "seasons": self.state.store.seasons,
+            "loaded_seasons": self.state.loaded_seasons,
+            "model_loaded": self.state.model_loaded,
+        }
+
+    async def stats(self, query, body):
+        return {"requests": self.requests, "micro_batch": self.batcher.stats(), "spans": tracing.summary()}
+
+    async def players(self, query, body):
+        try:
+            season = int(query["season"][0])
+        except (KeyError, ValueError) as exc:
+            raise RequestError(f"need ?season=YYYY: {exc}")
+        data = await self._call(self.state.season, season)
+        players = data.df[["player_id", "player_name", "position"]].drop_duplicates("player_id")
+        return {"season": season, "players": players.astype(str).to_dict(orient="records")}
+
+    async def historical(self, query, body):
+        def run():
+            data, roster, end_week = _parse_replay(body, self.state)
+            trade = _parse_trade(body.get("trade"))
+            _check_week(trade, end_week)
+            return counterfactual_replay(roster, trade, data.points_index, data.pos_index, data.season, end_week)
+        return await self._call(run)
+
+    async def batch(self, query, body):
+        def run():
+            data, roster, end_week = _parse_replay(body, self.state)
+            raw = body.get("trades")
+            if not isinstance(raw, list) or not raw:
+                raise RequestError("trades must be a non-empty list")
+            trades = [_parse_trade(t) for t in raw]
+            for trade in trades:
+                _check_week(trade, end_week)
+            out = counterfactual_replay_many(roster, trades, data.points_index, data.pos_index, data.season, end_week)
+            return {k: out[k] for k in ("weeks", "weekly_without_trade", "total_delta", "cumulative_delta")}
+        return await self._call(run)
+
+    async def expected(self, query, body):
+        def prepare():
+            data, roster, end_week = _parse_replay(body, self.state)
+            trade = _parse_trade(body.get("trade"))
+            _check_week(trade, end_week)
+            model, model_key, table = self.state.model()
+            weeks = list(range(trade.week, end_week + 1))
+            players = list(dict.fromkeys(roster + apply_trade_to_roster(roster, trade)))
+            if table is not None and table.covers(data.season):
+                pred_points, pred_pos = table.predict_weeks(data.season, players, weeks)
+                return roster, trade, end_week, pred_points, pred_pos, None, data, model_key
+            feature_table = self.state.feature_table(data.season)
+            pred_points, pred_pos, feat = pending_features(model_key, feature_table, players, weeks, data.memo)
+            return roster, trade, end_week, pred_points, pred_pos, feat, data, model_key
+
+        roster, trade, end_week, pred_points, pred_pos, feat, data, model_key = await self._call(prepare)
+        if feat is not None:
+            preds = await self.batcher.predict(feat[FEATURE_COLS + ["player_id", "week"]])
+            scatter_predictions(feat, preds, pred_points, pred_pos, data.season, model_key, data.memo)
+        return await self._call(
+            counterfactual_from_predictions, roster, trade, end_week, pred_points, pred_pos, optimal_lineup_points
+        )
+
+    # ---- HTTP ----
+
+    async def dispatch(self, method: str, target: str, body_bytes: bytes) -> Tuple[int, Dict[str, object]]:
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                return 405, {"error": f"{method} not allowed on {url.path}"}
+            return 404, {"error": f"no route {url.path}"}
+        try:
+            body = json.loads(body_bytes) if body_bytes else {}
+            if not isinstance(body, dict):
+                raise RequestError("body must be a JSON object")
+            return 200, await handler(parse_qs(url.query), body)
+        except json.JSONDecodeError as exc:
+            return 400, {"error": f"invalid JSON: {exc}"}
+        except RequestError as exc:
+            return 400, {"error": str(exc)}
+        except Exception as exc:   # keep serving; report what broke
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "bad content-length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                self.requests += 1
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, writer, status: int, payload, keep_alive: bool) -> None:
+        data = json.dumps(payload, default=_to_json).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  413: "Payload Too Large", 500: "Internal Server Error"}.get(status, "")
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        self.batcher.start()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def close(self) -> None:
+        await self.batcher.close()
+        self.executor.shutdown(wait=False)
+        self.model_executor.shutdown(wait=False)
+
+
+async def serve(service: ReplayService, host: str, port: int) -> None:
+    server = await service.start(host, port)
+    bound = server.sockets[0].getsockname()
+    print(f"Replay service on http://{bound[0]}:{bound[1]} (seasons {service.state.store.seasons})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local replay service (HTTP/JSON).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=data_path)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--model", default=model_path)
+    parser.add_argument("--predictions", default=predictions_path)
+    parser.add_argument("--preload", default="", help="comma list of seasons to load at startup ('latest' works)")
+    parser.add_argument("--workers", type=int, default=4, help="replay threads")
+    parser.add_argument("--max-batch-rows", type=int, default=100_000)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="how long a batch waits for company")
+    parser.add_argument("--live-inference", action="store_true", help="ignore the precomputed prediction table")
+    args = parser.parse_args(argv)
+
+    state = ServiceState(args.data, args.store, args.model, args.predictions, live_inference=args.live_inference)
+    for raw in filter(None, (s.strip() for s in args.preload.split(","))):
+        season = state.store.seasons[-1] if raw == "latest" else int(raw)
+        state.season(season)
+        print(f"Preloaded season {season}")
+    if os.path.exists(args.model):
+        state.model()
+
+    service = ReplayService(state, args.workers, args.max_batch_rows, args.max_wait_ms)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
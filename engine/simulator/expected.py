@@ -1,11 +1,19 @@
 from __future__ import annotations #stores hints as strings
 
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-from engine.ml.predict import predict_next_week_points
+from engine.ml.predict import predict_next_week_points, model_fingerprint
+from engine.tracing import traced
+from engine.simulator.simulate import apply_trade_to_roster
 
+# keys are player_idx * _KEY_STRIDE + week, so one sorted array covers all players
+_KEY_STRIDE = 1000
 
+
+@traced("features.week", rows=len)
 def _build_features_for_week(
     history_df: pd.DataFrame,
     season: int,
@@ -54,6 +62,256 @@ def _build_features_for_week(
     return feat
 
 
+@dataclass
+class SeasonFeatureTable:
+    """
+    Features for every player in one season, built once.
+
+    Row r is a player's observed week; its values are what
+    _build_features_for_week would return for any target week after it,
+    up to and including that player's next observed week:
+
+      lag1_points = points that week
+      roll3_mean / roll5_mean = rolling means ending at that week
+      position = position that week
+
+    So "features for (week w, player p)" is just "p's last row with
+    week < w", found with one searchsorted (same no-leakage rule).
+
+    data_stamp identifies the rows the table was built from (the weekly
+    CSV's sha256), or None if unknown.
+    """
+    season: int
+    player_idx: Dict[str, int]
+    keys: np.ndarray            # sorted player_idx * _KEY_STRIDE + week
+    position: np.ndarray
+    lag1_points: np.ndarray
+    roll3_mean: np.ndarray
+    roll5_mean: np.ndarray
+    data_stamp: Optional[str] = None
+
+    def features_for_week(self, week: int, roster_ids: List[str]) -> pd.DataFrame:
+        """Same DataFrame (values, dtypes, row order) as _build_features_for_week."""
+        base = pd.DataFrame({"player_id": roster_ids})
+
+        idx = np.array([self.player_idx.get(pid, -1) for pid in roster_ids], dtype=np.int64)
+        row = np.searchsorted(self.keys, idx * _KEY_STRIDE + week, side="left") - 1
+        # the row found must belong to the same player (and player must be known)
+        hit = (idx >= 0) & (row >= 0)
+        hit[hit] = self.keys[row[hit]] // _KEY_STRIDE == idx[hit]
+
+        if not hit.any():
+            base["position"] = "UNK"
+            base["lag1_points"] = 0.0
+            base["roll3_mean"] = 0.0
+            base["roll5_mean"] = 0.0
+            return base
+
+        rows = row[hit]
+        position = np.full(len(roster_ids), "UNK", dtype=object)
+        position[hit] = self.position[rows]
+        base["position"] = position
+        for col in ["lag1_points", "roll3_mean", "roll5_mean"]:
+            values = np.zeros(len(roster_ids), dtype=np.float64)
+            values[hit] = getattr(self, col)[rows]
+            base[col] = values
+        return base
+
+
+@traced("features.season_table", rows=lambda table: len(table.keys))
+def build_season_feature_table(
+    history_df: pd.DataFrame, season: int, data_stamp: Optional[str] = None
+) -> SeasonFeatureTable:
+    """
+    One pass over a season (instead of one filter/sort/rolling per week).
+    Uses the exact same sort + groupby rolling as _build_features_for_week,
+    so the numbers come out identical. data_stamp is recorded on the table.
+    """
+    df = history_df[history_df["season"] == season].copy()
+    df = df.sort_values(["player_id", "week"])
+    g = df.groupby("player_id", sort=False)
+
+    df["roll3_mean"] = g["fantasy_points_ppr"].rolling(3, min_periods=1).mean().reset_index(level=0, drop=True)
+    df["roll5_mean"] = g["fantasy_points_ppr"].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True)
+
+    codes, uniques = pd.factorize(df["player_id"], sort=True)
+    keys = codes.astype(np.int64) * _KEY_STRIDE + df["week"].to_numpy(dtype=np.int64)
+    order = np.argsort(keys, kind="stable")
+
+    return SeasonFeatureTable(
+        season=season,
+        player_idx={pid: i for i, pid in enumerate(uniques)},
+        keys=keys[order],
+        position=df["position"].to_numpy(dtype=object)[order],
+        lag1_points=df["fantasy_points_ppr"].to_numpy(dtype=np.float64)[order],
+        roll3_mean=df["roll3_mean"].to_numpy(dtype=np.float64)[order],
+        roll5_mean=df["roll5_mean"].to_numpy(dtype=np.float64)[order],
+        data_stamp=data_stamp,
+    )
+
+
+class PredictionMemo:
+    """
+    (model fingerprint, season, week, player_id) -> (predicted points, position).
+
+    Lets overlapping rosters and repeated clicks skip rows that were already
+    scored. Features only depend on the history data, so a memo is only
+    valid for the data its feature tables were built from: data_stamp
+    records which (e.g. the weekly CSV's sha256), and callers build a new
+    memo when it changes. Using it with a feature table stamped with other
+    data raises ValueError. Oldest entries are dropped past max_entries.
+    """
+
+    def __init__(self, max_entries: int = 500_000, data_stamp: Optional[str] = None):
+        self.max_entries = max_entries
+        self.data_stamp = data_stamp
+        self._store: Dict[Tuple[str, int, int, str], Tuple[float, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get(self, key):
+        value = self._store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def check(self, data_stamp: Optional[str]) -> None:
+        """Raises ValueError if data_stamp is known and is not the memo's."""
+        if self.data_stamp is not None and data_stamp is not None and data_stamp != self.data_stamp:
+            raise ValueError(f"prediction memo is for data {self.data_stamp}, not {data_stamp}")
+
+    def put(self, key, value):
+        self._store[key] = value
+        if len(self._store) > self.max_entries:
+            # dicts keep insertion order -> drop the oldest tenth
+            for old in list(self._store)[: self.max_entries // 10 or 1]:
+                self._store.pop(old, None)
+
+
+def pending_features(
+    model_key: Optional[str],
+    feature_table: SeasonFeatureTable,
+    player_ids: List[str],
+    weeks: List[int],
+    memo: Optional[PredictionMemo] = None,
+) -> Tuple[Dict[int, Dict[str, float]], Dict[int, Dict[str, str]], Optional[pd.DataFrame]]:
+    """
+    First half of predict_weeks: fills pred_points / pred_pos from the memo
+    and returns the feature rows (with a "week" column) still to be scored,
+    or None if the memo had everything. Lets a caller batch the model call
+    across requests; scatter_predictions does the second half.
+    """
+    if memo is not None:
+        memo.check(feature_table.data_stamp)
+    pred_points: Dict[int, Dict[str, float]] = {wk: {} for wk in weeks}
+    pred_pos: Dict[int, Dict[str, str]] = {wk: {} for wk in weeks}
+
+    frames = []
+    for wk in weeks:
+        todo = player_ids
+        if memo is not None:
+            todo = []
+            for pid in player_ids:
+                hit = memo.get((model_key, feature_table.season, wk, pid))
+                if hit is None:
+                    todo.append(pid)
+                else:
+                    pred_points[wk][pid], pred_pos[wk][pid] = hit
+        if todo:
+            feat = feature_table.features_for_week(wk, todo)
+            feat["week"] = wk
+            frames.append(feat)
+
+    feat = pd.concat(frames, ignore_index=True) if frames else None
+    return pred_points, pred_pos, feat
+
+
+def scatter_predictions(
+    feat: pd.DataFrame,
+    preds,
+    pred_points: Dict[int, Dict[str, float]],
+    pred_pos: Dict[int, Dict[str, str]],
+    season: int,
+    model_key: Optional[str] = None,
+    memo: Optional[PredictionMemo] = None,
+) -> None:
+    """Writes model outputs for pending_features rows into the dicts (and memo)."""
+    for wk, pid, pos, pts in zip(
+        feat["week"].tolist(), feat["player_id"].tolist(),
+        feat["position"].astype(str).tolist(), np.asarray(preds, dtype=float).tolist(),
+    ):
+        pred_points[wk][pid] = pts
+        pred_pos[wk][pid] = pos
+        if memo is not None:
+            memo.put((model_key, season, wk, pid), (pts, pos))
+
+
+@traced("predict.weeks")
+def predict_weeks(
+    model,
+    feature_table: SeasonFeatureTable,
+    player_ids: List[str],
+    weeks: List[int],
+    memo: Optional[PredictionMemo] = None,
+) -> Tuple[Dict[int, Dict[str, float]], Dict[int, Dict[str, str]]]:
+    """
+    Predicted points and positions for every (week, player) pair,
+    with ONE model.predict call for all rows the memo doesn't already have.
+
+    Returns (pred_points[week][player_id], pred_pos[week][player_id]).
+    """
+    player_ids = list(dict.fromkeys(player_ids))
+    model_key = model_fingerprint(model) if memo is not None else None
+
+    pred_points, pred_pos, feat = pending_features(model_key, feature_table, player_ids, weeks, memo)
+    if feat is not None:
+        preds = predict_next_week_points(model, feat)
+        scatter_predictions(feat, preds, pred_points, pred_pos, feature_table.season, model_key, memo)
+    return pred_points, pred_pos
+
+
+def _predictions(
+    model,
+    history_df: pd.DataFrame,
+    season: int,
+    player_ids: List[str],
+    weeks: List[int],
+    feature_table: Optional[SeasonFeatureTable],
+    memo: Optional[PredictionMemo],
+    prediction_table,
+):
+    # precomputed lookup when we have it, live inference otherwise
+    if prediction_table is not None and prediction_table.covers(season):
+        return prediction_table.predict_weeks(season, player_ids, weeks)
+    if feature_table is None:
+        feature_table = build_season_feature_table(history_df, season)
+    return predict_weeks(model, feature_table, player_ids, weeks, memo)
+
+
+def _expected_lineups(
+    roster_ids: List[str],
+    weeks: List[int],
+    pred_points: Dict[int, Dict[str, float]],
+    pred_pos: Dict[int, Dict[str, str]],
+    optimal_lineup_fn,
+) -> Tuple[List[float], List[List[str]]]:
+    weekly_totals: List[float] = []
+    weekly_lineups: List[List[str]] = []
+    for wk in weeks:
+        points = {pid: pred_points[wk][pid] for pid in roster_ids}
+        positions = {pid: pred_pos[wk][pid] for pid in roster_ids}
+        total, chosen = optimal_lineup_fn(points, positions)
+        weekly_totals.append(float(total))
+        weekly_lineups.append(chosen)
+    return weekly_totals, weekly_lineups
+
+
+@traced("replay.expected")
 def simulate_expected_points(
     model,
     history_df: pd.DataFrame,
@@ -62,24 +320,94 @@ def simulate_expected_points(
     start_week: int,
     end_week: int,
     optimal_lineup_fn,
+    feature_table: Optional[SeasonFeatureTable] = None,
+    memo: Optional[PredictionMemo] = None,
+    prediction_table=None,
 ) -> Tuple[List[float], List[List[str]]]:
     """
     For each week in [start_week, end_week], predict player points using ML,
     then select optimal lineup and sum points.
     Returns (weekly_totals, weekly_lineups).
+
+    Features come from a SeasonFeatureTable (built here if not passed in),
+    so pass one in when replaying several rosters of the same season.
+    All weeks are scored with a single model.predict call (minus memo hits).
+
+    prediction_table: a PredictionTable from engine.ml.precompute. If it
+    covers the season, predictions are looked up instead of computed.
     """
-    weekly_totals: List[float] = []
-    weekly_lineups: List[List[str]] = []
+    weeks = list(range(start_week, end_week + 1))
+    pred_points, pred_pos = _predictions(
+        model, history_df, season, roster_ids, weeks, feature_table, memo, prediction_table
+    )
+    return _expected_lineups(roster_ids, weeks, pred_points, pred_pos, optimal_lineup_fn)
 
-    for wk in range(start_week, end_week + 1):
-        feat = _build_features_for_week(history_df, season, wk, roster_ids)
 
-        preds = predict_next_week_points(model, feat)
-        pred_points: Dict[str, float] = dict(zip(feat["player_id"], preds.astype(float).tolist()))
-        pred_pos: Dict[str, str] = dict(zip(feat["player_id"], feat["position"].astype(str).tolist()))
+@traced("replay.expected_counterfactual")
+def expected_counterfactual_replay(
+    model,
+    history_df: pd.DataFrame,
+    original_roster: List[str],
+    trade,
+    season: int,
+    end_week: int,
+    optimal_lineup_fn,
+    feature_table: Optional[SeasonFeatureTable] = None,
+    memo: Optional[PredictionMemo] = None,
+    prediction_table=None,
+) -> Dict[str, object]:
+    """
+    ML version of counterfactual_replay: both worlds from trade.week..end_week
+    on predicted points. Features for the union of both rosters across every
+    week are scored in one model.predict call, then scattered back per week.
 
-        total, chosen = optimal_lineup_fn(pred_points, pred_pos)
-        weekly_totals.append(float(total))
-        weekly_lineups.append(chosen)
+    Returns the same keys as counterfactual_replay.
+    """
+    weeks = list(range(trade.week, end_week + 1))
+    pred_points, pred_pos = _predictions(
+        model, history_df, season, original_roster + apply_trade_to_roster(original_roster, trade), weeks,
+        feature_table, memo, prediction_table,
+    )
+    return counterfactual_from_predictions(original_roster, trade, end_week, pred_points, pred_pos, optimal_lineup_fn)
 
-    return weekly_totals, weekly_lineups
+
+def counterfactual_from_predictions(
+    original_roster: List[str],
+    trade,
+    end_week: int,
+    pred_points: Dict[int, Dict[str, float]],
+    pred_pos: Dict[int, Dict[str, str]],
+    optimal_lineup_fn,
+) -> Dict[str, object]:
+    """
+    Lineup half of expected_counterfactual_replay, for callers that got
+    predictions some other way (e.g. a batched model call). pred_points /
+    pred_pos must cover both rosters for trade.week..end_week.
+    """
+    roster_without = original_roster.copy()
+    roster_with = apply_trade_to_roster(original_roster, trade)
+    weeks = list(range(trade.week, end_week + 1))
+
+    weekly_without, lineups_without = _expected_lineups(
+        roster_without, weeks, pred_points, pred_pos, optimal_lineup_fn
+    )
+    weekly_with, lineups_with = _expected_lineups(
+        roster_with, weeks, pred_points, pred_pos, optimal_lineup_fn
+    )
+
+    weekly_delta = [w - wo for w, wo in zip(weekly_with, weekly_without)]
+    cumulative_delta = []
+    running = 0.0
+    for d in weekly_delta:
+        running += d
+        cumulative_delta.append(running)
+
+    return {
+        "weekly_with_trade": weekly_with,
+        "weekly_without_trade": weekly_without,
+        "weekly_delta": weekly_delta,
+        "cumulative_delta": cumulative_delta,
+        "total_delta": cumulative_delta[-1] if cumulative_delta else 0.0,
+        "lineups_with_trade": lineups_with,
+        "lineups_without_trade": lineups_without,
+    }
@@ -0,0 +1,356 @@
+"""
+League simulator: does a trade change either team's playoff odds?
+
+A League is N team rosters, a head-to-head regular-season schedule and a
+single-elimination playoff bracket (one round per week after the regular
+season, byes for the top seeds when the field isn't a power of 2).
+
+Standings: wins (ties count half), then points for, then team order.
+Playoff games: higher score wins, ties go to the higher seed.
+
+league_season replays one season on real points (simulate_season_points).
+league_trade_odds resamples weekly scores like monte_carlo_replay and
+plays thousands of seasons with and without the trade. Both worlds share
+every draw, so the only difference is the trade.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engine.simulator.lineup import DEFAULT_LINEUP, LineupConfig, batch_lineup_totals, lineup_positions
+from engine.simulator.monte_carlo import ResidualModel
+from engine.simulator.simulate import (
+    Trade,
+    apply_trade_to_roster,
+    roster_week_matrix,
+    simulate_season_points,
+)
+
+
+@dataclass
+class League:
+    """
+    rosters: team name -> player_ids
+    schedule: one list of (home, away) team names per regular-season week
+    start_week: the first regular-season week
+    playoff_teams: teams that make the bracket
+    lineup_config: starting slots (None = the default layout; laminar only)
+    """
+    rosters: Dict[str, List[str]]
+    schedule: List[List[Tuple[str, str]]]
+    start_week: int = 1
+    playoff_teams: int = 4
+    lineup_config: Optional[LineupConfig] = None
+
+    @property
+    def teams(self) -> List[str]:
+        return list(self.rosters)
+
+    @property
+    def regular_season_end(self) -> int:
+        return self.start_week + len(self.schedule) - 1
+
+    @property
+    def playoff_rounds(self) -> int:
+        return int(np.ceil(np.log2(self.playoff_teams))) if self.playoff_teams > 1 else 0
+
+    @property
+    def end_week(self) -> int:
+        return self.regular_season_end + self.playoff_rounds
+
+
+def round_robin_schedule(teams: List[str], n_weeks: int) -> List[List[Tuple[str, str]]]:
+    """Circle-method round robin, repeated until n_weeks. Odd leagues get a bye each week."""
+    slots: List[Optional[str]] = list(teams) + ([None] if len(teams) % 2 else [])
+    n = len(slots)
+    schedule = []
+    for week in range(n_weeks):
+        r = week % (n - 1)
+        rotated = [slots[0]] + slots[1:][-r:] + slots[1:][:-r] if r else list(slots)
+        games = [(rotated[i], rotated[n - 1 - i]) for i in range(n // 2)]
+        schedule.append([(a, b) for a, b in games if a is not None and b is not None])
+    return schedule
+
+
+def make_league(
+    rosters: Dict[str, List[str]],
+    n_weeks: int,
+    start_week: int = 1,
+    playoff_teams: int = 4,
+    lineup_config: Optional[LineupConfig] = None,
+) -> League:
+    return League(
+        rosters=rosters,
+        schedule=round_robin_schedule(list(rosters), n_weeks),
+        start_week=start_week,
+        playoff_teams=playoff_teams,
+        lineup_config=lineup_config,
+    )
+
+
+def traded_rosters(
+    league: League,
+    trade: Trade,
+    from_team: str,
+    to_team: str,
+) -> Dict[str, List[str]]:
+    """
+    Rosters after the trade: from_team sends trade.give and receives
+    trade.get, to_team does the opposite. Everyone else is unchanged.
+    """
+    if from_team == to_team:
+        raise ValueError("A trade needs two different teams")
+    for team, pids in ((from_team, trade.give), (to_team, trade.get)):
+        missing = [pid for pid in pids if pid not in league.rosters[team]]
+        if missing:
+            raise ValueError(f"{missing} not on {team}'s roster")
+
+    reverse = Trade(week=trade.week, give=list(trade.get), get=list(trade.give))
+    rosters = {team: list(r) for team, r in league.rosters.items()}
+    rosters[from_team] = apply_trade_to_roster(rosters[from_team], trade)
+    rosters[to_team] = apply_trade_to_roster(rosters[to_team], reverse)
+    return rosters
+
+
+def _bracket_order(size: int) -> List[int]:
+    """Seed order of a standard bracket: 1v8, 4v5, 2v7, 3v6 for size 8 (0-based)."""
+    order = [0]
+    while len(order) < size:
+        m = 2 * len(order)
+        order = [s for seed in order for s in (seed, m - 1 - seed)]
+    return order
+
+
+def _schedule_arrays(league: League) -> Tuple[np.ndarray, np.ndarray]:
+    """(week, game) home/away team indices; -1 pads weeks with fewer games."""
+    team_idx = {t: i for i, t in enumerate(league.teams)}
+    width = max((len(w) for w in league.schedule), default=0)
+    home = np.full((len(league.schedule), width), -1, dtype=np.int64)
+    away = np.full_like(home, -1)
+    for w, games in enumerate(league.schedule):
+        for g, (a, b) in enumerate(games):
+            home[w, g], away[w, g] = team_idx[a], team_idx[b]
+    return home, away
+
+
+def _play_seasons(
+    scores: np.ndarray,
+    home: np.ndarray,
+    away: np.ndarray,
+    playoff_teams: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    scores: (S, T, W) team points per sim, from the first regular-season week
+    through the last playoff week.
+
+    Returns wins (S, T), seeds (S, playoff_teams) team indices best first,
+    and champion (S,) team index.
+    """
+    n_sims, n_teams, _ = scores.shape
+    n_regular = len(home)
+    sims = np.arange(n_sims)
+
+    wins = np.zeros((n_sims, n_teams))
+    for w in range(n_regular):
+        ok = home[w] >= 0
+        h, a = home[w][ok], away[w][ok]
+        sh, sa = scores[:, h, w], scores[:, a, w]
+        # a team plays once a week, so no repeated indices here
+        wins[:, h] += (sh > sa) + 0.5 * (sh == sa)
+        wins[:, a] += (sa > sh) + 0.5 * (sh == sa)
+    points_for = scores[:, :, :n_regular].sum(axis=2)
+
+    team_order = np.broadcast_to(np.arange(n_teams), wins.shape)
+    standings = np.lexsort((team_order, -points_for, -wins), axis=-1)
+    n_seeds = min(playoff_teams, n_teams)
+    seeds = standings[:, :n_seeds]
+
+    size = 1 << int(np.ceil(np.log2(n_seeds))) if n_seeds > 1 else 1
+    slots = np.broadcast_to(np.array(_bracket_order(size)), (n_sims, size))
+    week = n_regular
+    while slots.shape[1] > 1:
+        a, b = slots[:, 0::2], slots[:, 1::2]
+        # seeds >= n_seeds are byes and always lose
+        team_a = seeds[sims[:, None], np.minimum(a, n_seeds - 1)]
+        team_b = seeds[sims[:, None], np.minimum(b, n_seeds - 1)]
+        sa = scores[sims[:, None], team_a, week]
+        sb = scores[sims[:, None], team_b, week]
+        a_wins = (b >= n_seeds) | ((a < n_seeds) & ((sa > sb) | ((sa == sb) & (a < b))))
+        slots = np.where(a_wins, a, b)
+        week += 1
+    champion = seeds[sims, slots[:, 0]]
+    return wins, seeds, champion
+
+
+def league_season(
+    league: League,
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    trade: Optional[Trade] = None,
+    from_team: Optional[str] = None,
+    to_team: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Plays one season on real points. With a trade, both teams use their
+    old roster before trade.week and the new one from trade.week on.
+
+    Returns weekly scores per team, wins, standings (best first),
+    playoff teams and champion.
+    """
+    start, end = league.start_week, league.end_week
+    after = traded_rosters(league, trade, from_team, to_team) if trade else league.rosters
+
+    weekly = {}
+    for team, roster in league.rosters.items():
+        before, _ = simulate_season_points(
+            roster, points_index, pos_index, season, start, end, league.lineup_config, vectorized=True
+        )
+        if after[team] != roster:
+            changed, _ = simulate_season_points(
+                after[team], points_index, pos_index, season, start, end, league.lineup_config, vectorized=True
+            )
+            split = min(max(trade.week - start, 0), len(before))
+            before = before[:split] + changed[split:]
+        weekly[team] = before
+
+    teams = league.teams
+    home, away = _schedule_arrays(league)
+    scores = np.array([[weekly[t] for t in teams]], dtype=np.float64)
+    wins, seeds, champion = _play_seasons(scores, home, away, league.playoff_teams)
+    standings = np.lexsort((np.arange(len(teams)), -scores[0, :, :len(home)].sum(axis=1), -wins[0]))
+
+    return {
+        "weekly_scores": weekly,
+        "wins": dict(zip(teams, wins[0].tolist())),
+        "standings": [teams[i] for i in standings],
+        "playoff_teams": [teams[i] for i in seeds[0]],
+        "champion": teams[int(champion[0])],
+    }
+
+
+def _simulate_chunk(state, seed_seq, n_sims):
+    center, codes, pools, roster_rows, swaps, split, home, away, playoff_teams, config, positions = state
+    rng = np.random.default_rng(seed_seq)
+
+    noise = np.zeros((n_sims,) + center.shape)
+    if pools is not None:
+        for code, pool in enumerate(pools):
+            mask = codes == code
+            k = int(mask.sum())
+            if k:
+                noise[:, mask] = pool[rng.integers(0, len(pool), size=(n_sims, k))]
+    sampled = center[None] + noise                                      # (S, P, W)
+
+    lineups = np.empty((n_sims, len(roster_rows), center.shape[1]))
+    for i, rows in enumerate(roster_rows):
+        pts = sampled[:, rows].transpose(0, 2, 1)                       # (S, W, R)
+        lineups[:, i] = batch_lineup_totals(pts, np.broadcast_to(codes[rows].T, pts.shape), config, positions)
+
+    n_teams = len(roster_rows) - len(swaps)
+    without = lineups[:, :n_teams]
+    with_trade = without.copy()
+    for team, row in swaps:
+        with_trade[:, team, split:] = lineups[:, row, split:]
+
+    out = []
+    for scores in (without, with_trade):
+        wins, seeds, champion = _play_seasons(scores, home, away, playoff_teams)
+        made = np.zeros(n_teams)
+        np.add.at(made, seeds.ravel(), 1)
+        out.append((wins.sum(axis=0), made, np.bincount(champion, minlength=n_teams)))
+    return out
+
+
+# per-process copy of the league matrices, set once by the pool initializer
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _simulate_chunk_in_worker(seed_seq, n_sims):
+    return _simulate_chunk(_worker_state, seed_seq, n_sims)
+
+
+def league_trade_odds(
+    league: League,
+    trade: Trade,
+    from_team: str,
+    to_team: str,
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    error_model: Optional[ResidualModel] = None,
+    n_sims: int = 5_000,
+    seed: Optional[int] = None,
+    chunk_size: int = 500,
+    n_workers: int = 1,
+) -> Dict[str, object]:
+    """
+    Simulates n_sims seasons of the whole league with and without the trade.
+    Weekly points are center points (real or predicted, whatever
+    points_index holds) plus residuals from error_model; error_model=None
+    replays the center points as-is.
+
+    Every chunk of chunk_size sims gets its own child of SeedSequence(seed),
+    so results depend on seed and chunk_size but not on n_workers.
+    n_workers > 1 runs chunks on a process pool; each worker receives the
+    league matrices once (pool initializer).
+
+    Returns:
+      teams, n_sims
+      without_trade / with_trade: {"playoff_prob", "champion_prob", "mean_wins"} per team
+      delta: {team: {"playoff_prob", "champion_prob", "mean_wins"}} for from_team and to_team
+    """
+    teams = league.teams
+    after = traded_rosters(league, trade, from_team, to_team)
+
+    rosters = [league.rosters[t] for t in teams] + [after[from_team], after[to_team]]
+    players = list(dict.fromkeys(pid for r in rosters for pid in r))
+    row_of = {pid: i for i, pid in enumerate(players)}
+    roster_rows = [np.array([row_of[p] for p in dict.fromkeys(r)], dtype=np.int64) for r in rosters]
+    swaps = [(teams.index(from_team), len(teams)), (teams.index(to_team), len(teams) + 1)]
+
+    start, end = league.start_week, league.end_week
+    config = league.lineup_config or DEFAULT_LINEUP
+    positions = lineup_positions(config)
+    center, codes = roster_week_matrix(players, points_index, pos_index, season, start, end, positions)
+    pools = None
+    if error_model is not None:
+        pools = [error_model.pool_for(pos) for pos in positions]
+    split = min(max(trade.week - start, 0), center.shape[1])
+    home, away = _schedule_arrays(league)
+    state = (center, codes, pools, roster_rows, swaps, split, home, away, league.playoff_teams, config, positions)
+
+    sizes = [min(chunk_size, n_sims - lo) for lo in range(0, n_sims, chunk_size)]
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(sizes))
+    if n_workers <= 1:
+        chunks = [_simulate_chunk(state, ss, n) for ss, n in zip(seed_seqs, sizes)]
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(state,)) as ex:
+            chunks = list(ex.map(_simulate_chunk_in_worker, seed_seqs, sizes))
+
+    worlds = {}
+    for w, name in enumerate(("without_trade", "with_trade")):
+        wins = sum(c[w][0] for c in chunks)
+        made = sum(c[w][1] for c in chunks)
+        champs = sum(c[w][2] for c in chunks)
+        worlds[name] = {
+            "playoff_prob": dict(zip(teams, (made / n_sims).tolist())),
+            "champion_prob": dict(zip(teams, (champs / n_sims).tolist())),
+            "mean_wins": dict(zip(teams, (wins / n_sims).tolist())),
+        }
+
+    delta = {
+        team: {
+            key: worlds["with_trade"][key][team] - worlds["without_trade"][key][team]
+            for key in ("playoff_prob", "champion_prob", "mean_wins")
+        }
+        for team in (from_team, to_team)
+    }
+    return {"teams": teams, "n_sims": n_sims, **worlds, "delta": delta}
@@ -1,17 +1,102 @@
-from typing import Dict, List, Tuple, Set
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple, Set
+
+import numpy as np
+
+from engine.tracing import traced
 
 SLOTS = {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1}
 FLEX_ALLOWED: Set[str] = {"RB", "WR", "TE"}
 
+
+@dataclass(frozen=True)
+class LineupConfig:
+    """
+    A league's starting slots.
+
+    slots: (slot_name, count, eligible positions) in the order the league
+    lists them, e.g. ("FLEX", 1, {"RB", "WR", "TE"}). Build one with
+    lineup_config() rather than by hand.
+    """
+    slots: Tuple[Tuple[str, int, FrozenSet[str]], ...]
+
+    @property
+    def positions(self) -> FrozenSet[str]:
+        """Every position that can start somewhere."""
+        out: Set[str] = set()
+        for _, _, eligible in self.slots:
+            out |= eligible
+        return frozenset(out)
+
+    @property
+    def n_starters(self) -> int:
+        return sum(count for _, count, _ in self.slots)
+
+    @property
+    def is_laminar(self) -> bool:
+        """
+        True when any two slots' eligible sets are either disjoint or nested
+        (QB / RB / FLEX / SUPERFLEX style). Then filling the most specific
+        slots first with the best remaining player is provably optimal,
+        so the solver can use the greedy fast path.
+        """
+        sets = [eligible for _, _, eligible in self.slots]
+        for i, a in enumerate(sets):
+            for b in sets[i + 1:]:
+                if (a & b) and not (a <= b or b <= a):
+                    return False
+        return True
+
+
+def lineup_config(
+    slots: Dict[str, int],
+    eligibility: Optional[Dict[str, Set[str]]] = None,
+) -> LineupConfig:
+    """
+    slots: slot name -> how many, e.g. {"QB": 1, "RB": 2, "FLEX": 1}
+    eligibility: slot name -> positions allowed there. Slots not listed
+    only take their own position ("QB" -> {"QB"}).
+    """
+    eligibility = eligibility or {}
+    built = []
+    for name, count in slots.items():
+        if count < 0:
+            raise ValueError(f"Slot {name} has a negative count: {count}")
+        eligible = frozenset(eligibility.get(name, {name}))
+        if not eligible:
+            raise ValueError(f"Slot {name} has no eligible positions")
+        built.append((name, int(count), eligible))
+    return LineupConfig(slots=tuple(built))
+
+
+# Today's layout (same answer as the default optimal_lineup_points)
+DEFAULT_LINEUP = lineup_config(SLOTS, {"FLEX": FLEX_ALLOWED})
+
+# 1QB + superflex (QB/RB/WR/TE) on top of the default layout
+SUPERFLEX_LINEUP = lineup_config(
+    {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "FLEX": 1, "SUPERFLEX": 1},
+    {"FLEX": FLEX_ALLOWED, "SUPERFLEX": {"QB", "RB", "WR", "TE"}},
+)
+
+
+@traced("lineup.optimal")
 def optimal_lineup_points(
     roster_points: Dict[str, float],
     roster_position: Dict[str, str],
+    config: Optional[LineupConfig] = None,
 ) -> Tuple[float, List[str]]:
     """
     Greedy:
         1) Pick top scorers for QB/RB/WR/TE
         2) Pick top remaining RB/WR/TE for FLEX
+
+    Pass a LineupConfig for any other slot layout; that goes through
+    solve_lineup, which is exact for every layout.
     """
+    if config is not None:
+        return solve_lineup(roster_points, roster_position, config)
+
     # Group player_ids by position (O(n))
     by_pos: Dict[str, List[str]] = {"QB": [], "RB": [], "WR": [], "TE": []}
     for pid in roster_points:
@@ -51,3 +136,256 @@ def optimal_lineup_points(
 
     total = sum(roster_points[pid] for pid in chosen)
     return total, chosen
+
+
+# Position codes used by the array-based lineup code below.
+# Anything else (or a player with no row that week) is code -1 and never starts.
+LINEUP_POSITIONS: List[str] = ["QB", "RB", "WR", "TE"]
+
+
+def lineup_position_codes(positions: List[str], table: List[str] = LINEUP_POSITIONS) -> np.ndarray:
+    """Maps position strings to codes in `table` (-1 for anything else)."""
+    code_of = {pos: i for i, pos in enumerate(table)}
+    return np.array([code_of.get(p, -1) for p in positions], dtype=np.int16)
+
+
+def lineup_positions(config: LineupConfig = DEFAULT_LINEUP) -> List[str]:
+    """Position code table for a layout: LINEUP_POSITIONS, then any extra positions it starts."""
+    return LINEUP_POSITIONS + sorted(config.positions - set(LINEUP_POSITIONS))
+
+
+@traced("lineup.kernel", rows=lambda out: out[0].size)
+def lineup_kernel(
+    points: np.ndarray,
+    codes: np.ndarray,
+    config: LineupConfig = DEFAULT_LINEUP,
+    positions: List[str] = LINEUP_POSITIONS,
+    with_selected: bool = True,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Lineups for every (roster, week, ...) cell of a points tensor at once.
+
+    points: float array (..., n_players), e.g. (rosters, weeks, players)
+    codes:  int array, same shape; index into `positions` (-1 = can't start)
+
+    Returns:
+      totals:   (...,) lineup points per cell
+      selected: (..., n_starters) player indices in slot fill order,
+                -1 where a slot stays empty (None with with_selected=False,
+                which skips the index bookkeeping)
+
+    Each position's players are argsorted once along the last axis (stable,
+    so ties go to the earlier player like the greedy). Slots are then filled
+    most-specific first; every slot takes the best next-in-line player among
+    its eligible positions. That is the greedy fast path of solve_lineup, so
+    the config must be laminar. On DEFAULT_LINEUP the fill order is
+    QB, RB, RB, WR, WR, TE, FLEX and totals match optimal_lineup_points
+    exactly.
+    """
+    if not config.is_laminar:
+        raise ValueError("lineup_kernel only supports laminar slot layouts")
+
+    lead = points.shape[:-1]
+    depth = config.n_starters + 1   # a position can't be picked more than n_starters times
+
+    ranked_val: Dict[str, np.ndarray] = {}
+    ranked_idx: Dict[str, np.ndarray] = {}
+    for code, pos in enumerate(positions):
+        if pos not in config.positions:
+            continue
+        key = np.where(codes == code, points, -np.inf)
+        if with_selected:
+            order = np.argsort(-key, axis=-1, kind="stable")[..., :depth]
+            vals = np.take_along_axis(key, order, axis=-1)
+        else:
+            vals = -np.sort(-key, axis=-1)[..., :depth]   # same values, no indices to gather
+        if vals.shape[-1] < depth:
+            pad = depth - vals.shape[-1]
+            vals = np.concatenate([vals, np.full(lead + (pad,), -np.inf)], axis=-1)
+            if with_selected:
+                order = np.concatenate([order, np.full(lead + (pad,), -1, dtype=order.dtype)], axis=-1)
+        ranked_val[pos] = vals
+        if with_selected:
+            ranked_idx[pos] = order
+
+    head = {pos: np.zeros(lead + (1,), dtype=np.int64) for pos in ranked_val}
+    total = np.zeros(lead, dtype=np.float64)
+    selected = []
+
+    for _, count, eligible in sorted(config.slots, key=lambda slot: len(slot[2])):
+        elig = [pos for pos in positions if pos in eligible and pos in ranked_val]
+        for _ in range(count):
+            if not elig:
+                selected.append(np.full(lead, -1, dtype=np.int64))
+                continue
+            cand_val = np.stack([np.take_along_axis(ranked_val[p], head[p], -1)[..., 0] for p in elig], axis=-1)
+            best = np.argmax(cand_val, axis=-1)[..., None]
+            val = np.take_along_axis(cand_val, best, -1)[..., 0]
+            valid = np.isfinite(val)
+
+            total = total + np.where(valid, val, 0.0)
+            if with_selected:
+                cand_idx = np.stack([np.take_along_axis(ranked_idx[p], head[p], -1)[..., 0] for p in elig], axis=-1)
+                idx = np.take_along_axis(cand_idx, best, -1)[..., 0]
+                selected.append(np.where(valid, idx, -1))
+            for k, pos in enumerate(elig):
+                head[pos] = head[pos] + ((best[..., 0] == k) & valid)[..., None]
+
+    if not with_selected:
+        return total, None
+    if selected:
+        return total, np.stack(selected, axis=-1)
+    return total, np.zeros(lead + (0,), dtype=np.int64)
+
+
+@traced("lineup.batch", rows=lambda totals: totals.size)
+def batch_lineup_totals(
+    points: np.ndarray,
+    codes: np.ndarray,
+    config: LineupConfig = DEFAULT_LINEUP,
+    positions: List[str] = LINEUP_POSITIONS,
+) -> np.ndarray:
+    """
+    Lineup totals only, for many rosters/weeks at once: lineup_kernel
+    without the selected-player indices.
+
+    points: float array (..., n_players)
+    codes:  codes into `positions` (see lineup_positions), same shape (-1 = can't start)
+    Returns lineup totals with shape points.shape[:-1]; on DEFAULT_LINEUP
+    they match optimal_lineup_points bit for bit.
+    """
+    return lineup_kernel(points, codes, config, positions, with_selected=False)[0]
+
+
+def solve_lineup(
+    roster_points: Dict[str, float],
+    roster_position: Dict[str, str],
+    config: LineupConfig = DEFAULT_LINEUP,
+    method: str = "auto",
+) -> Tuple[float, List[str]]:
+    """
+    Best lineup for any slot/eligibility layout.
+
+    Like optimal_lineup_points, it fills as many slots as the roster allows
+    and maximizes points among those lineups; players with no position
+    (or one no slot takes) never start.
+
+    method:
+      "auto"   -> "greedy" if config.is_laminar, else "exact"
+      "greedy" -> most specific slots first, best remaining player each time
+                  (only optimal for laminar layouts, so only allowed there)
+      "exact"  -> matroid greedy: walk players best-first and keep one if
+                  the kept set can still be matched to slots (checked with
+                  an augmenting path over slot types). Starter sets form a
+                  transversal matroid, so this is optimal for any layout.
+    """
+    if method == "auto":
+        method = "greedy" if config.is_laminar else "exact"
+    if method == "greedy" and not config.is_laminar:
+        raise ValueError("Greedy lineup fill is only optimal for laminar slot layouts")
+    if method not in ("greedy", "exact"):
+        raise ValueError(f"Unknown lineup method: {method}")
+
+    startable = config.positions
+    by_pos: Dict[str, List[str]] = {pos: [] for pos in startable}
+    for pid in roster_points:
+        pos = roster_position.get(pid)
+        if pos in startable:
+            by_pos[pos].append(pid)
+    for pids in by_pos.values():
+        pids.sort(key=lambda pid: roster_points[pid], reverse=True)
+
+    if method == "greedy":
+        chosen = _fill_laminar(roster_points, by_pos, config)
+    else:
+        chosen = _fill_matroid(roster_points, roster_position, by_pos, config)
+
+    total = sum(roster_points[pid] for pid in chosen)
+    return total, chosen
+
+
+def _fill_laminar(
+    roster_points: Dict[str, float],
+    by_pos: Dict[str, List[str]],
+    config: LineupConfig,
+) -> List[str]:
+    # most specific (smallest eligible set) first; ties keep the league's order
+    order = sorted(config.slots, key=lambda slot: len(slot[2]))
+    head = {pos: 0 for pos in by_pos}
+    chosen: List[str] = []
+
+    for _, count, eligible in order:
+        for _ in range(count):
+            best_pos = None
+            for pos in eligible:
+                i = head.get(pos, 0)
+                if pos not in by_pos or i >= len(by_pos[pos]):
+                    continue
+                if best_pos is None or roster_points[by_pos[pos][i]] > roster_points[by_pos[best_pos][head[best_pos]]]:
+                    best_pos = pos
+            if best_pos is None:
+                break  # nobody left who can play this slot
+            chosen.append(by_pos[best_pos][head[best_pos]])
+            head[best_pos] += 1
+    return chosen
+
+
+def _fill_matroid(
+    roster_points: Dict[str, float],
+    roster_position: Dict[str, str],
+    by_pos: Dict[str, List[str]],
+    config: LineupConfig,
+) -> List[str]:
+    slots = [(count, eligible) for _, count, eligible in config.slots if count > 0]
+    # used[t][pos] = how many kept players of `pos` currently sit in slot type t
+    used: List[Dict[str, int]] = [dict() for _ in slots]
+    filled = [0] * len(slots)
+    slots_for: Dict[str, List[int]] = {
+        pos: [t for t, (_, eligible) in enumerate(slots) if pos in eligible] for pos in by_pos
+    }
+
+    # only the top n_starters of each position can ever matter
+    cap = config.n_starters
+    candidates = [pid for pids in by_pos.values() for pid in pids[:cap]]
+    candidates.sort(key=lambda pid: roster_points[pid], reverse=True)
+
+    chosen: List[str] = []
+    for pid in candidates:
+        if len(chosen) == cap:
+            break
+        if _augment(roster_position[pid], slots, used, filled, slots_for):
+            chosen.append(pid)
+    return chosen
+
+
+def _augment(pos, slots, used, filled, slots_for) -> bool:
+    """
+    Tries to seat one more `pos` player, moving already-seated players
+    between slot types if needed (BFS for an augmenting path).
+    """
+    parent: Dict[int, Tuple[int, str]] = {}
+    queue = deque()
+    for t in slots_for[pos]:
+        parent[t] = (-1, pos)
+        queue.append(t)
+
+    while queue:
+        t = queue.popleft()
+        if filled[t] < slots[t][0]:
+            # free seat: walk the path back, shifting each mover one slot over
+            filled[t] += 1
+            while t != -1:
+                prev, moved = parent[t]
+                used[t][moved] = used[t].get(moved, 0) + 1
+                if prev != -1:
+                    used[prev][moved] -= 1
+                t = prev
+            return True
+        for moved, n in used[t].items():
+            if n == 0:
+                continue
+            for nxt in slots_for[moved]:
+                if nxt not in parent:
+                    parent[nxt] = (t, moved)
+                    queue.append(nxt)
+    return False
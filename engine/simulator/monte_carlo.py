@@ -0,0 +1,180 @@
+"""
+Monte Carlo replay: a distribution of regret instead of one curve.
+
+Each simulated season draws every player's weekly points as
+    center points (actual or predicted) + a residual drawn from that
+    position's empirical error distribution,
+then scores both rosters on the SAME draws (common random numbers), so the
+difference between worlds comes from the trade, not from sampling noise.
+All seasons in a chunk go through batch_lineup_totals at once.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from engine.ml.features import make_features, target_col
+from engine.tracing import traced
+from engine.simulator.lineup import DEFAULT_LINEUP, LineupConfig, batch_lineup_totals, lineup_positions
+from engine.simulator.simulate import (
+    Trade,
+    apply_trade_to_roster,
+    counterfactual_replay,
+    roster_week_matrix,
+)
+
+
+@dataclass
+class ResidualModel:
+    """
+    Empirical residuals (actual - center) per position. Positions without
+    enough data fall back to the pooled residuals of every position.
+    """
+    by_position: Dict[str, np.ndarray]
+    pooled: np.ndarray
+
+    def pool_for(self, position: str) -> np.ndarray:
+        pool = self.by_position.get(position)
+        return pool if pool is not None and len(pool) else self.pooled
+
+
+def _residual_model(positions: pd.Series, residuals: np.ndarray, min_count: int) -> ResidualModel:
+    residuals = np.asarray(residuals, dtype=np.float64)
+    ok = np.isfinite(residuals)
+    positions, residuals = positions[ok].astype(str).to_numpy(), residuals[ok]
+    by_position = {}
+    for pos in np.unique(positions):
+        pool = residuals[positions == pos]
+        if len(pool) >= min_count:
+            by_position[str(pos)] = pool
+    return ResidualModel(by_position=by_position, pooled=residuals)
+
+
+def residuals_from_model(model, df: pd.DataFrame, min_count: int = 50) -> ResidualModel:
+    """Residuals of the trained next-week model: y_next_week - prediction."""
+    from engine.ml.predict import predict_next_week_points
+
+    feat = make_features(df)
+    preds = predict_next_week_points(model, feat).to_numpy()
+    return _residual_model(feat["position"], feat["y_next_week"].to_numpy() - preds, min_count)
+
+
+def residuals_from_history(df: pd.DataFrame, min_count: int = 50) -> ResidualModel:
+    """
+    No model needed: residual of each week vs the player's past 3-week mean
+    (the same roll3_mean feature the model uses, so no leakage either).
+    """
+    feat = make_features(df)
+    return _residual_model(feat["position"], (feat[target_col] - feat["roll3_mean"]).to_numpy(), min_count)
+
+
+def expected_points_index(
+    pred_points: Dict[int, Dict[str, float]],
+    pred_pos: Dict[int, Dict[str, str]],
+    season: int,
+) -> Tuple[Dict[Tuple[int, int], Dict[str, float]], Dict[Tuple[int, int], Dict[str, str]]]:
+    """
+    Turns predict_weeks / PredictionTable output into points_index/pos_index
+    shape, so the Monte Carlo replay can be centered on predictions.
+    """
+    points_index = {(season, wk): d for wk, d in pred_points.items()}
+    pos_index = {(season, wk): d for wk, d in pred_pos.items()}
+    return points_index, pos_index
+
+
+@traced("replay.monte_carlo")
+def monte_carlo_replay(
+    original_roster: List[str],
+    trade: Trade,
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    end_week: int,
+    error_model: ResidualModel,
+    n_sims: int = 10_000,
+    seed: Optional[int] = None,
+    percentiles: Sequence[float] = (10, 50, 90),
+    chunk_size: int = 2_000,
+    lineup_config: Optional[LineupConfig] = None,
+) -> Dict[str, object]:
+    """
+    Runs counterfactual_replay on the center points (actual or predicted),
+    plus n_sims sampled seasons of both worlds. Lineups use the default
+    slots, or lineup_config if given (laminar layouts only).
+
+    Returns every counterfactual_replay key, plus:
+      - n_sims
+      - prob_positive             P(total delta > 0)
+      - expected_total_delta      mean total delta
+      - total_delta_percentiles   {p: value}
+      - cumulative_delta_bands    {p: [per-week cumulative delta]}
+      - downside_risk             prob_negative, expected_shortfall (mean of
+                                  the worst 10% of totals), worst total
+    Same seed -> same numbers.
+    """
+    if n_sims < 1:
+        raise ValueError("n_sims must be >= 1")
+
+    result = counterfactual_replay(
+        original_roster=original_roster,
+        trade=trade,
+        points_index=points_index,
+        pos_index=pos_index,
+        season=season,
+        end_week=end_week,
+        lineup_config=lineup_config,
+    )
+
+    roster_without = list(dict.fromkeys(original_roster))
+    roster_with = list(dict.fromkeys(apply_trade_to_roster(original_roster, trade)))
+    players = list(dict.fromkeys(roster_without + roster_with))
+    row_of = {pid: i for i, pid in enumerate(players)}
+    rows_without = np.array([row_of[p] for p in roster_without], dtype=np.int64)
+    rows_with = np.array([row_of[p] for p in roster_with], dtype=np.int64)
+
+    config = lineup_config or DEFAULT_LINEUP
+    positions = lineup_positions(config)
+    center, codes = roster_week_matrix(players, points_index, pos_index, season, trade.week, end_week, positions)
+    n_weeks = center.shape[1]
+
+    rng = np.random.default_rng(seed)
+    pools = [(code, error_model.pool_for(pos)) for code, pos in enumerate(positions)]
+    cumulative = np.empty((n_sims, n_weeks), dtype=np.float64)
+
+    for lo in range(0, n_sims, chunk_size):
+        n = min(chunk_size, n_sims - lo)
+        # one residual per (sim, player, week); both worlds read the same draws
+        noise = np.zeros((n,) + center.shape, dtype=np.float64)
+        for code, pool in pools:
+            mask = codes == code
+            k = int(mask.sum())
+            if k:
+                noise[:, mask] = pool[rng.integers(0, len(pool), size=(n, k))]
+        sampled = center[None] + noise                                  # (n, P, W)
+
+        totals = []
+        for rows in (rows_without, rows_with):
+            pts = sampled[:, rows].transpose(0, 2, 1)                   # (n, W, R)
+            cds = np.broadcast_to(codes[rows].T, pts.shape)
+            totals.append(batch_lineup_totals(pts, cds, config, positions))
+        cumulative[lo:lo + n] = np.cumsum(totals[1] - totals[0], axis=1)
+
+    total = cumulative[:, -1] if n_weeks else np.zeros(n_sims)
+    worst = np.sort(total)[: max(1, n_sims // 10)]
+
+    result.update({
+        "n_sims": n_sims,
+        "prob_positive": float((total > 0).mean()),
+        "expected_total_delta": float(total.mean()),
+        "total_delta_percentiles": {p: float(np.percentile(total, p)) for p in percentiles},
+        "cumulative_delta_bands": {
+            p: np.percentile(cumulative, p, axis=0).tolist() for p in percentiles
+        },
+        "downside_risk": {
+            "prob_negative": float((total < 0).mean()),
+            "expected_shortfall": float(worst.mean()),
+            "worst_total_delta": float(total.min()),
+        },
+    })
+    return result
@@ -0,0 +1,70 @@
+"""
+Bounded LRU cache for replay results.
+
+Keys describe everything a replay result depends on, so toggling between
+modes or clicking Run again with the same inputs is a lookup.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+from engine.memory import approx_nbytes
+from engine.simulator.simulate import Trade
+
+
+def replay_key(
+    season: int,
+    end_week: int,
+    roster: List[str],
+    trade: Trade,
+    mode: str,
+    model_version: Optional[str] = None,
+    scoring: Optional[str] = None,
+    data_version: Optional[str] = None,
+) -> Tuple[Hashable, ...]:
+    """
+    (season, end_week, roster, trade, mode, model_version, scoring,
+    data_version). Roster and trade sides are order-insensitive, same as the
+    replay itself.
+    """
+    return (
+        int(season),
+        int(end_week),
+        tuple(sorted(set(roster))),
+        (int(trade.week), tuple(sorted(set(trade.give))), tuple(sorted(set(trade.get)))),
+        mode,
+        model_version,
+        scoring,
+        data_version,
+    )
+
+
+class ReplayCache:
+    """Least-recently-used cache of replay results, at most max_entries of them."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._store: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get(self, key):
+        value = self._store.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._store[key] = value
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+
+    @property
+    def nbytes(self) -> int:
+        return approx_nbytes(list(self._store.values()))
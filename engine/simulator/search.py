@@ -0,0 +1,296 @@
+"""
+Trade search: find the best k-for-m trades for a roster instead of guessing one.
+
+Every candidate is "give G from my roster, get P from the pool" at one trade
+week, scored exactly like counterfactual_replay (total delta with - without).
+The full 2-for-2 space over a ~600 player pool is tens of millions of trades,
+so we only score candidates whose upper bound can still beat the current
+top-K.
+
+Upper bound (why it is safe):
+  - clip every weekly score at 0 -> best lineup f+(roster) >= real lineup f(roster)
+  - f+ is a weighted matroid rank function, so it is submodular:
+        f+(A - G + P) <= f+(A - G) + sum_p [f+(A - G + p) - f+(A - G)]
+  - and each marginal gain is at most the player's own clipped points.
+So  delta(G, P) <= f+(A - G) + sum_p gain_p - f(A).
+"""
+import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine.simulator.lineup import DEFAULT_LINEUP, LineupConfig, lineup_positions
+from engine.simulator.simulate import Trade, roster_week_matrix, roster_lineup_totals
+
+DEFAULT_SHAPES: Tuple[Tuple[int, int], ...] = ((1, 1), (2, 1), (2, 2))
+
+# bounds are compared against real deltas; leave room for float noise
+_EPS = 1e-9
+
+
+@dataclass(frozen=True)
+class ScoredTrade:
+    trade: Trade
+    total_delta: float
+
+
+@dataclass
+class TradeSearchResult:
+    best: List[ScoredTrade]     # top-K, best first
+    n_candidates: int           # size of the full enumerated space
+    n_scored: int               # trades that were actually lineup-scored
+
+
+def season_player_pool(
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    season: int,
+    start_week: int,
+    end_week: int,
+) -> List[str]:
+    """Every player_id with at least one row in start_week..end_week of a season."""
+    seen: Dict[str, None] = {}
+    for week in range(start_week, end_week + 1):
+        for pid in points_index.get((season, week), {}):
+            seen.setdefault(pid, None)
+    return list(seen)
+
+
+class _Searcher:
+    """Search state for one roster. Rows index into the shared player x week matrix."""
+
+    def __init__(
+        self, points, codes, roster_rows, pool_rows, top_k, batch_size, config=DEFAULT_LINEUP, positions=None
+    ):
+        self.points = points
+        self.codes = codes
+        self.config = config
+        self.positions = positions or lineup_positions(config)
+        self.clipped = np.maximum(points, 0.0)
+        self.roster_rows = np.asarray(roster_rows, dtype=np.int64)
+        self.top_k = top_k
+        self.batch_size = batch_size
+
+        base = self._totals(points, self.roster_rows[None, :])[0]
+        self.base_weekly = base
+        self.base_total = float(np.cumsum(base)[-1]) if len(base) else 0.0
+
+        # crude per-player bound: own clipped points in weeks they can start
+        ub = np.where(codes >= 0, self.clipped, 0.0).sum(axis=1)
+        pool_rows = np.asarray(pool_rows, dtype=np.int64)
+        order = np.argsort(-ub[pool_rows], kind="stable")
+        self.pool_rows = pool_rows[order]
+        self.pool_ub = ub[self.pool_rows]
+
+        self.heap: List[Tuple[float, int, Tuple[int, ...], Tuple[int, ...]]] = []
+        self.n_scored = 0
+        self._seq = 0
+        self._pending: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
+
+    def _totals(self, points: np.ndarray, members: np.ndarray) -> np.ndarray:
+        return roster_lineup_totals(points, self.codes, members, self.batch_size, self.config, self.positions)
+
+    @property
+    def threshold(self) -> float:
+        return self.heap[0][0] if len(self.heap) == self.top_k else -np.inf
+
+    def _members(self, give: Tuple[int, ...], get: Sequence[int]) -> List[int]:
+        return [r for r in self.roster_rows.tolist() if r not in give] + list(get)
+
+    def _clipped_totals(self, member_lists: List[List[int]]) -> np.ndarray:
+        width = max(len(m) for m in member_lists)
+        members = np.full((len(member_lists), width), -1, dtype=np.int64)
+        for i, m in enumerate(member_lists):
+            members[i, :len(m)] = m
+        return self._totals(self.clipped, members).sum(axis=1)
+
+    def _push(self, give, get):
+        self._pending.append((give, get))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        width = max(len(self._members(g, p)) for g, p in self._pending)
+        members = np.full((len(self._pending), width), -1, dtype=np.int64)
+        for i, (give, get) in enumerate(self._pending):
+            m = self._members(give, get)
+            members[i, :len(m)] = m
+
+        weekly = self._totals(self.points, members)
+        # same arithmetic as counterfactual_replay: running sum of weekly deltas
+        totals = np.cumsum(weekly - self.base_weekly[None, :], axis=1)[:, -1]
+
+        for (give, get), delta in zip(self._pending, totals.tolist()):
+            item = (delta, self._seq, give, get)
+            self._seq += 1
+            if len(self.heap) < self.top_k:
+                heapq.heappush(self.heap, item)
+            elif delta > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+        self.n_scored += len(self._pending)
+        self._pending = []
+
+    def run(self, shape: Tuple[int, int], give_sets: List[Tuple[int, ...]]):
+        n_get = shape[1]
+        if not give_sets or len(self.pool_rows) < n_get:
+            return
+
+        # f+(A - G) for every give set, best first
+        give_bound = self._clipped_totals([self._members(g, ()) for g in give_sets]) - self.base_total
+        order = np.argsort(-give_bound, kind="stable")
+
+        if n_get == 1:
+            for gi in order.tolist():
+                give = give_sets[gi]
+                for row, ub in zip(self.pool_rows.tolist(), self.pool_ub.tolist()):
+                    if give_bound[gi] + ub <= self.threshold - _EPS:
+                        break
+                    self._push(give, (row,))
+                self._flush()
+            return
+
+        if n_get != 2:
+            raise ValueError(f"Unsupported trade shape {shape}; get side must be 1 or 2 players")
+
+        for gi in order.tolist():
+            give = give_sets[gi]
+            self._flush()
+            top_pair = self.pool_ub[0] + self.pool_ub[1]
+            if give_bound[gi] + top_pair <= self.threshold - _EPS:
+                break  # give sets are sorted, later ones can't do better
+
+            # players who could be in a surviving pair even with the best partner
+            keep = give_bound[gi] + self.pool_ub + self.pool_ub[0] > self.threshold - _EPS
+            rows = self.pool_rows[keep]
+            if len(rows) < 2:
+                continue
+
+            # tighter bound: real clipped marginal gain of each player on top of A - G
+            base_g = give_bound[gi] + self.base_total
+            gains = self._clipped_totals([self._members(give, (r,)) for r in rows.tolist()]) - base_g
+            by_gain = np.argsort(-gains, kind="stable")
+            rows, gains = rows[by_gain].tolist(), gains[by_gain].tolist()
+
+            for i in range(len(rows) - 1):
+                if give_bound[gi] + gains[i] + gains[i + 1] <= self.threshold - _EPS:
+                    break
+                for j in range(i + 1, len(rows)):
+                    if give_bound[gi] + gains[i] + gains[j] <= self.threshold - _EPS:
+                        break
+                    self._push(give, (rows[i], rows[j]))
+        self._flush()
+
+
+def _search_chunk(state, jobs, top_k, batch_size):
+    points, codes, roster_rows, pool_rows, config, positions = state
+    searcher = _Searcher(points, codes, roster_rows, pool_rows, top_k, batch_size, config, positions)
+    for shape, give_sets in jobs:
+        searcher.run(shape, give_sets)
+    searcher._flush()
+    return searcher.heap, searcher.n_scored
+
+
+# per-process copy of the matrices, set once by the pool initializer
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _search_chunk_in_worker(jobs, top_k, batch_size):
+    return _search_chunk(_worker_state, jobs, top_k, batch_size)
+
+
+def search_trades(
+    original_roster: List[str],
+    week: int,
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    end_week: int,
+    pool: Optional[List[str]] = None,
+    top_k: int = 10,
+    shapes: Sequence[Tuple[int, int]] = DEFAULT_SHAPES,
+    batch_size: int = 4096,
+    n_workers: int = 1,
+    lineup_config: Optional[LineupConfig] = None,
+) -> TradeSearchResult:
+    """
+    Finds the top_k trades (by total delta from `week` to `end_week`) among
+    all give-k / get-m combinations in `shapes` (default 1-for-1, 2-for-1, 2-for-2).
+
+    pool: players you could receive. Defaults to everyone with a row in the
+    season's remaining weeks. Players already on the roster are skipped.
+
+    n_workers > 1 splits the give sets across a process pool; each worker
+    gets the matrices once (pool initializer), keeps its own top-K and the
+    results are merged at the end.
+
+    lineup_config: starting slots (default layout if None; laminar only).
+    """
+    if top_k < 1:
+        raise ValueError("top_k must be >= 1")
+
+    roster = list(dict.fromkeys(original_roster))
+    if pool is None:
+        pool = season_player_pool(points_index, season, week, end_week)
+    on_roster = set(roster)
+    pool = [pid for pid in dict.fromkeys(pool) if pid not in on_roster]
+
+    players = roster + pool
+    config = lineup_config or DEFAULT_LINEUP
+    positions = lineup_positions(config)
+    points, codes = roster_week_matrix(players, points_index, pos_index, season, week, end_week, positions)
+    roster_rows = list(range(len(roster)))
+    pool_rows = list(range(len(roster), len(players)))
+
+    jobs = []
+    n_candidates = 0
+    for n_give, n_get in shapes:
+        give_sets = list(itertools.combinations(roster_rows, n_give))
+        jobs.append(((n_give, n_get), give_sets))
+        n_candidates += len(give_sets) * _n_choose_k(len(pool_rows), n_get)
+
+    state = (points, codes, roster_rows, pool_rows, config, positions)
+    if n_workers <= 1:
+        chunks = [_search_chunk(state, jobs, top_k, batch_size)]
+    else:
+        # round-robin give sets so every worker sees strong and weak ones
+        split = [[(shape, gs[w::n_workers]) for shape, gs in jobs] for w in range(n_workers)]
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(state,)) as ex:
+            futures = [ex.submit(_search_chunk_in_worker, part, top_k, batch_size) for part in split]
+            chunks = [f.result() for f in futures]
+
+    merged = [item for heap, _ in chunks for item in heap]
+    merged.sort(key=lambda item: (-item[0], item[2], item[3]))
+    best = [
+        ScoredTrade(
+            trade=Trade(
+                week=week,
+                give=[players[r] for r in give],
+                get=[players[r] for r in get],
+            ),
+            total_delta=delta,
+        )
+        for delta, _, give, get in merged[:top_k]
+    ]
+    return TradeSearchResult(
+        best=best,
+        n_candidates=n_candidates,
+        n_scored=sum(n for _, n in chunks),
+    )
+
+
+def _n_choose_k(n: int, k: int) -> int:
+    if k > n:
+        return 0
+    out = 1
+    for i in range(k):
+        out = out * (n - i) // (i + 1)
+    return out
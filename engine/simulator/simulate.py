@@ -1,6 +1,20 @@
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
-from engine.simulator.lineup import optimal_lineup_points
+
+import numpy as np
+
+from engine.tracing import traced
+
+from engine.simulator.lineup import (
+    LineupConfig,
+    LINEUP_POSITIONS,
+    DEFAULT_LINEUP,
+    optimal_lineup_points,
+    batch_lineup_totals,
+    lineup_kernel,
+    lineup_position_codes,
+    lineup_positions,
+)
 
 
 @dataclass(frozen=True)
@@ -72,18 +86,29 @@ def simulate_season_points(
     season: int,
     start_week: int,
     end_week: int,
+    lineup_config: Optional[LineupConfig] = None,
+    vectorized: bool = False,
 ) -> Tuple[List[float], List[List[str]]]:
     """
     Simulates team points from start_week..end_week (inclusive).
     Each week:
       - pull each roster player's real historical points
-      - choose optimal lineup
+      - choose optimal lineup (default slots, or lineup_config if given)
       - sum points
 
+    vectorized=True builds one roster x week matrix and picks every week's
+    lineup with lineup_kernel in one call (same totals; laminar layouts only).
+
     Returns:
       weekly_totals: list of floats
       weekly_lineups: list of chosen-player-id lists
     """
+    if vectorized:
+        return _simulate_season_points_vectorized(
+            roster, points_index, pos_index, season, start_week, end_week,
+            lineup_config or DEFAULT_LINEUP,
+        )
+
     weekly_totals = []
     weekly_lineups = []
 
@@ -103,6 +128,7 @@ def simulate_season_points(
         total_points, chosen_players = optimal_lineup_points(
             roster_points=roster_points,
             roster_position=roster_positions,
+            config=lineup_config,
         )
 
         weekly_totals.append(total_points)
@@ -111,6 +137,26 @@ def simulate_season_points(
     return weekly_totals, weekly_lineups
 
 
+def _simulate_season_points_vectorized(
+    roster: List[str],
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    start_week: int,
+    end_week: int,
+    config: LineupConfig,
+) -> Tuple[List[float], List[List[str]]]:
+    # dict keys dedupe the roster, same as build_roster_week_views
+    players = list(dict.fromkeys(roster))
+    positions = lineup_positions(config)
+    points, codes = roster_week_matrix(players, points_index, pos_index, season, start_week, end_week, positions)
+
+    totals, selected = lineup_kernel(points.T, codes.T, config, positions)
+    weekly_lineups = [[players[i] for i in row if i >= 0] for row in selected.tolist()]
+    return totals.tolist(), weekly_lineups
+
+
+@traced("replay.counterfactual")
 def counterfactual_replay(
     original_roster: List[str],
     trade: Trade,
@@ -118,6 +164,7 @@ def counterfactual_replay(
     pos_index: Dict[Tuple[int, int], Dict[str, str]],
     season: int,
     end_week: int,
+    lineup_config: Optional[LineupConfig] = None,
 ) -> Dict[str, object]:
     """
     Runs two simulations from trade.week .. end_week:
@@ -146,6 +193,7 @@ def counterfactual_replay(
         season=season,
         start_week=start_week,
         end_week=end_week,
+        lineup_config=lineup_config,
     )
 
     weekly_with, lineups_with = simulate_season_points(
@@ -155,6 +203,7 @@ def counterfactual_replay(
         season=season,
         start_week=start_week,
         end_week=end_week,
+        lineup_config=lineup_config,
     )
     
     #calculating weekly_delta
@@ -183,3 +232,223 @@ def counterfactual_replay(
     }
     return result
 
+
+
+def roster_week_matrix(
+    players: List[str],
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    start_week: int,
+    end_week: int,
+    positions: List[str] = LINEUP_POSITIONS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    players x weeks arrays for start_week..end_week (inclusive):
+
+      points[i, w] = points (0.0 if no entry that week)
+      codes[i, w]  = index into `positions` (-1 if no entry / not listed)
+
+    Same rules as build_roster_week_views, just for many weeks at once.
+    """
+    index = getattr(points_index, "weekly_index", None)
+    if index is not None and getattr(pos_index, "weekly_index", None) is index:
+        # dense index: slice the arrays instead of doing dict lookups
+        points, pos_codes = index.roster_arrays(players, season, start_week, end_week)
+        to_lineup = np.append(lineup_position_codes(index.positions, positions), np.int16(-1))
+        return points, to_lineup[pos_codes]
+
+    weeks = list(range(start_week, end_week + 1))
+    points = np.zeros((len(players), len(weeks)), dtype=np.float64)
+    week_positions = [["" for _ in weeks] for _ in players]
+
+    for w, week in enumerate(weeks):
+        points_for_week = points_index.get((season, week), {})
+        pos_for_week = pos_index.get((season, week), {})
+        for i, pid in enumerate(players):
+            points[i, w] = points_for_week.get(pid, 0.0)
+            week_positions[i][w] = pos_for_week.get(pid, "")
+
+    codes = lineup_position_codes([p for row in week_positions for p in row], positions)
+    return points, codes.reshape(len(players), len(weeks))
+
+
+def roster_lineup_totals(
+    points: np.ndarray,
+    codes: np.ndarray,
+    members: np.ndarray,
+    batch_size: int = 2048,
+    config: LineupConfig = DEFAULT_LINEUP,
+    positions: List[str] = LINEUP_POSITIONS,
+) -> np.ndarray:
+    """
+    Weekly lineup totals for many rosters drawn from one player x week matrix.
+
+    points/codes: (n_players, W) from roster_week_matrix (codes into positions)
+    members:      (N, R) row indices into points, -1 = empty roster spot
+    Returns (N, W) weekly totals, evaluated batch_size rosters at a time.
+    """
+    n_players, n_weeks = points.shape
+    # pad with a dummy player that can never start
+    points_t = np.vstack([points, np.zeros((1, n_weeks))]).T        # (W, P+1)
+    codes_t = np.vstack([codes, np.full((1, n_weeks), -1, dtype=codes.dtype)]).T
+
+    totals = np.empty((len(members), n_weeks), dtype=np.float64)
+    for lo in range(0, len(members), batch_size):
+        rows = members[lo:lo + batch_size]          # (B, R)
+        rows = np.where(rows < 0, n_players, rows)
+        # (W, B, R) -> (B, W, R)
+        batch_points = points_t[:, rows].transpose(1, 0, 2)
+        batch_codes = codes_t[:, rows].transpose(1, 0, 2)
+        totals[lo:lo + batch_size] = batch_lineup_totals(batch_points, batch_codes, config, positions)
+    return totals
+
+
+@traced("replay.many", rows=lambda out: len(out["total_delta"]))
+def counterfactual_replay_many(
+    original_roster: List[str],
+    trades: List[Trade],
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    end_week: int,
+    batch_size: int = 2048,
+    lineup_config: Optional[LineupConfig] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Batch version of counterfactual_replay: scores many trades against one roster.
+
+    The "without trade" world is simulated once. Every player that shows up
+    (roster + all received players) gets one row in a player x week matrix,
+    each trade's roster becomes a row of indices into it, and lineups for all
+    trades/weeks are picked with batch_lineup_totals in one go (default
+    slots, or lineup_config if given; laminar layouts only).
+
+    Trades may have different weeks. Everything is laid out on a shared week
+    axis (min trade week .. end_week); before a trade's week nothing has
+    changed yet, so its "with" points equal the "without" points and its
+    delta is 0 there.
+
+    Returns a dict of arrays (N = len(trades), W = number of weeks):
+      - weeks                  (W,)
+      - weekly_without_trade   (W,)
+      - weekly_with_trade      (N, W)
+      - weekly_delta           (N, W)
+      - cumulative_delta       (N, W)
+      - total_delta            (N,)
+    """
+    if not trades:
+        raise ValueError("Need at least one trade")
+
+    start_week = min(t.week for t in trades)
+    weeks = np.arange(start_week, end_week + 1)
+
+    # player universe: roster first, then every received player once
+    players = list(original_roster)
+    slot_of = {pid: i for i, pid in enumerate(players)}
+    for trade in trades:
+        for pid in trade.get:
+            if pid not in slot_of:
+                slot_of[pid] = len(players)
+                players.append(pid)
+
+    config = lineup_config or DEFAULT_LINEUP
+    positions = lineup_positions(config)
+    points, codes = roster_week_matrix(players, points_index, pos_index, season, start_week, end_week, positions)
+
+    # World B (no trade) once
+    base_rows = np.array([slot_of[pid] for pid in original_roster], dtype=np.int64)
+    weekly_without = batch_lineup_totals(points[base_rows].T, codes[base_rows].T, config, positions)
+
+    # each trade's roster as a padded row of player indices (-1 = empty)
+    rosters = [apply_trade_to_roster(original_roster, t) for t in trades]
+    width = max(len(r) for r in rosters)
+    members = np.full((len(trades), width), -1, dtype=np.int64)
+    for i, roster in enumerate(rosters):
+        members[i, :len(roster)] = [slot_of[pid] for pid in roster]
+
+    weekly_with = roster_lineup_totals(points, codes, members, batch_size, config, positions)
+
+    trade_weeks = np.array([t.week for t in trades])
+    active = weeks[None, :] >= trade_weeks[:, None]
+    weekly_with = np.where(active, weekly_with, weekly_without[None, :])
+
+    weekly_delta = weekly_with - weekly_without[None, :]
+    cumulative_delta = np.cumsum(weekly_delta, axis=1)
+
+    return {
+        "weeks": weeks,
+        "weekly_without_trade": weekly_without,
+        "weekly_with_trade": weekly_with,
+        "weekly_delta": weekly_delta,
+        "cumulative_delta": cumulative_delta,
+        "total_delta": cumulative_delta[:, -1] if len(weeks) else np.zeros(len(trades)),
+    }
+
+
+@traced("replay.sweep")
+def trade_week_sweep(
+    original_roster: List[str],
+    give: List[str],
+    get: List[str],
+    points_index: Dict[Tuple[int, int], Dict[str, float]],
+    pos_index: Dict[Tuple[int, int], Dict[str, str]],
+    season: int,
+    start_week: int,
+    end_week: int,
+    lineup_config: Optional[LineupConfig] = None,
+    vectorized: bool = True,
+) -> Dict[str, object]:
+    """
+    "When should I have made this trade?": counterfactual_replay's total
+    delta for every trade week in start_week..end_week, from one pass.
+
+    On real points a roster's weekly total doesn't depend on when the trade
+    happened, so both rosters are simulated once over the whole range and
+    every trade week is a suffix of the same weekly deltas:
+
+      total_delta[t]         = sum of weekly_delta[w] for w >= t
+      cumulative_delta[t, w] = running sum from week t (0.0 before t)
+
+    Returns (W = number of weeks, one trade week per week):
+      - weeks / trade_weeks      (W,)
+      - weekly_with_trade        (W,) traded roster, every week
+      - weekly_without_trade     (W,)
+      - weekly_delta             (W,)
+      - total_delta              (W,) total_delta[i] is trading in trade_weeks[i]
+      - cumulative_delta         (W, W)
+      - regret                   (W,) best total_delta minus this week's
+      - best_week, best_total_delta
+    """
+    weeks = np.arange(start_week, end_week + 1)
+    trade = Trade(week=start_week, give=list(give), get=list(get))
+    totals = {}
+    for name, roster in (("without", original_roster.copy()), ("with", apply_trade_to_roster(original_roster, trade))):
+        weekly, _ = simulate_season_points(
+            roster, points_index, pos_index, season, start_week, end_week,
+            lineup_config=lineup_config, vectorized=vectorized,
+        )
+        totals[name] = np.asarray(weekly, dtype=np.float64)
+
+    weekly_delta = totals["with"] - totals["without"]
+    # suffix sums: a trade in week t collects every delta from t on
+    total_delta = np.cumsum(weekly_delta[::-1])[::-1]
+    # cumulative curve for trade week t = prefix(w) - prefix(t - 1), from week t on
+    prefix = np.cumsum(weekly_delta)
+    before = np.concatenate([[0.0], prefix[:-1]])
+    cumulative_delta = np.triu(prefix[None, :] - before[:, None])
+
+    best = int(np.argmax(total_delta)) if len(weeks) else 0
+    best_total = float(total_delta[best]) if len(weeks) else 0.0
+    return {
+        "weeks": weeks,
+        "trade_weeks": weeks.copy(),
+        "weekly_with_trade": totals["with"],
+        "weekly_without_trade": totals["without"],
+        "weekly_delta": weekly_delta,
+        "total_delta": total_delta,
+        "cumulative_delta": cumulative_delta,
+        "regret": best_total - total_delta,
+        "best_week": int(weeks[best]) if len(weeks) else None,
+        "best_total_delta": best_total,
+    }
@@ -0,0 +1,218 @@
+"""
+Lightweight timing spans for the hot paths (load, index, features, predict,
+lineup, replay).
+
+    from engine import tracing
+
+    with tracing.span("index.build", rows=len(df)):
+        ...
+
+    @tracing.traced("replay.counterfactual")
+    def counterfactual_replay(...): ...
+
+Disabled by default: span() then returns a shared no-op object and traced()
+adds one flag check per call. Turn it on with tracing.enable() or the
+TRADEZONE_TRACE=1 environment variable, or for one thread only with
+
+    with tracing.collecting():
+        ...
+
+which is what a per-user toggle (one Streamlit session) should use, since
+enable()/disable() flip tracing for every thread in the process.
+
+Per span name we keep the call count, total seconds, rows processed and the
+last `_WINDOW` durations (for p95). summary() / export_json() report them;
+profile() runs one call under cProfile.
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_WINDOW = 2048
+
+_enabled = os.environ.get("TRADEZONE_TRACE", "") not in ("", "0")
+_lock = threading.Lock()
+_stats: Dict[str, "_SpanStats"] = {}
+_local = threading.local()   # .on: this thread is inside collecting()
+_scopes = 0                  # threads inside collecting(); 0 keeps the disabled check to one flag
+
+
+class _SpanStats:
+    __slots__ = ("count", "total", "rows", "durations")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=_WINDOW)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_rows(self, n: int) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "rows", "_start")
+
+    def __init__(self, name: str, rows: int):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self._start, self.rows)
+        return False
+
+    def add_rows(self, n: int) -> None:
+        """For row counts only known inside the span."""
+        self.rows += int(n)
+
+
+def _record(name: str, seconds: float, rows: int) -> None:
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _SpanStats()
+        stats.count += 1
+        stats.total += seconds
+        stats.rows += rows
+        stats.durations.append(seconds)
+
+
+def _active() -> bool:
+    return _enabled or (_scopes > 0 and getattr(_local, "on", False))
+
+
+def span(name: str, rows: int = 0):
+    """Context manager timing the block under `name` (no-op when disabled)."""
+    if not _enabled and not (_scopes and getattr(_local, "on", False)):
+        return _NOOP
+    return _Span(name, int(rows))
+
+
+def traced(name: str, rows: Optional[Callable[[Any], int]] = None):
+    """
+    Decorator version of span() for whole functions. rows, if given, maps
+    the function's return value to the number of rows it processed.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled and not (_scopes and getattr(_local, "on", False)):
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            _record(name, time.perf_counter() - start, rows(result) if rows else 0)
+            return result
+        return wrapper
+    return decorate
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """True when spans would be recorded in the calling thread."""
+    return _active()
+
+
+@contextmanager
+def collecting(on: bool = True):
+    """
+    Records spans of code run in this thread inside the block, whether or
+    not tracing is enabled process-wide. on=False makes it a no-op, for
+    callers with a per-user toggle.
+    """
+    global _scopes
+    if not on:
+        yield
+        return
+    with _lock:
+        _scopes += 1
+    previous = getattr(_local, "on", False)
+    _local.on = True
+    try:
+        yield
+    finally:
+        _local.on = previous
+        with _lock:
+            _scopes -= 1
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def _p95(durations) -> float:
+    ordered = sorted(durations)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    """name -> count, total_s, mean_s, p95_s, max_s, rows (sorted by total time)."""
+    with _lock:
+        items = [(name, s.count, s.total, s.rows, list(s.durations)) for name, s in _stats.items()]
+    out = {}
+    for name, count, total, rows, durations in sorted(items, key=lambda item: -item[2]):
+        out[name] = {
+            "count": count,
+            "total_s": total,
+            "mean_s": total / count if count else 0.0,
+            "p95_s": _p95(durations),
+            "max_s": max(durations) if durations else 0.0,
+            "rows": rows,
+        }
+    return out
+
+
+def export_json(path: Optional[str] = None) -> str:
+    """Summary as a JSON string; also written to path if given."""
+    text = json.dumps({"enabled": _active(), "spans": summary()}, indent=2)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
+
+
+def profile(fn: Callable, *args, out_path: Optional[str] = None, top: int = 30, **kwargs) -> Tuple[Any, str]:
+    """
+    Runs fn(*args, **kwargs) once under cProfile. Returns (result, report)
+    where report is the top functions by cumulative time; out_path also
+    keeps the raw .prof file (for snakeviz and friends).
+    """
+    prof = cProfile.Profile()
+    result = prof.runcall(fn, *args, **kwargs)
+    if out_path is not None:
+        prof.dump_stats(out_path)
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    return result, buf.getvalue()
@@ -0,0 +1,328 @@
+"""
+Headless regret reports for many replay results at once.
+
+    python -m engine.visualization.report results.jsonl --out reports/ [--format png,svg]
+        [--workers 4] [--overlay] [--no-charts]
+
+Input is what engine.run_batch writes (a .jsonl file or a Parquet
+directory), or, from code, any iterable of counterfactual_replay-style
+dicts with a trade_week (job_id, mode and season are optional):
+
+    generate_report(rows, "reports/", formats=("png", "svg"), workers=4, overlay=True)
+
+Per result, one chart with two panels: weekly points with vs without the
+trade, and the cumulative regret (delta) curve. Charts are rendered with
+the Agg backend (no display needed) across a process pool. Each worker
+builds one Figure and its artists once, then only swaps the line data,
+titles and limits per chart, instead of allocating a figure per chart.
+
+overlay=True also draws every result's cumulative delta curve in one
+chart (overlay.png / .svg) as a single LineCollection, so thousands of
+curves cost one draw call instead of one Line2D each.
+
+out/index.html lists every chart (worst total delta first) with its
+thumbnail, plus the overlay when there is one. Rows with an error are
+listed without a chart.
+"""
+import argparse
+import glob
+import html
+import os
+import re
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from engine.tracing import traced
+
+FORMATS = ("png", "svg")
+CHART_SIZE = (8.0, 6.0)   # inches
+OVERLAY_SIZE = (10.0, 6.0)
+
+# per-worker figure, built once by _init_worker
+_canvas = None
+
+
+def _chart_record(row: Dict[str, object], n: int) -> Dict[str, object]:
+    """A result row reduced to what a chart needs, with a file-safe name."""
+    def floats(key):
+        value = row.get(key)
+        return np.asarray(value if value is not None else [], dtype=np.float64)
+
+    with_, without = floats("weekly_with_trade"), floats("weekly_without_trade")
+    delta = floats("weekly_delta") if row.get("weekly_delta") is not None else with_ - without
+    first = int(row.get("trade_week") or 1)
+    label = str(row.get("job_id", n))
+    if row.get("mode"):
+        label += f" [{row['mode']}]"
+    return {
+        "n": n,
+        "label": label,
+        "name": f"{n:06d}-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")[:60],
+        "season": row.get("season"),
+        "trade_week": first,
+        "weeks": np.arange(first, first + len(delta)),
+        "with": with_,
+        "without": without,
+        "cumulative": np.cumsum(delta),
+        "total_delta": float(row["total_delta"]) if row.get("total_delta") is not None else float(delta.sum()),
+        "error": row.get("error"),
+    }
+
+
+def iter_results(path: str) -> Iterator[Dict[str, object]]:
+    """Rows of a run_batch output: a .jsonl file or a directory of Parquet parts."""
+    if os.path.isdir(path):
+        import pyarrow.parquet as pq
+
+        for part in sorted(glob.glob(os.path.join(path, "*.parquet"))):
+            yield from pq.read_table(part).to_pylist()
+        return
+    import json
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class _ChartCanvas:
+    """One Agg figure with both panels; render() only updates data and text."""
+
+    def __init__(self, figsize=CHART_SIZE, dpi: int = 80):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        # fixed margins: a layout engine would re-measure every text on every save
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax_weekly, self.ax_cum = self.fig.subplots(2, 1, sharex=True)
+        self.fig.subplots_adjust(left=0.1, right=0.97, top=0.93, bottom=0.09, hspace=0.25)
+        (self.line_with,) = self.ax_weekly.plot([], [], marker="o", ms=3, label="With trade")
+        (self.line_without,) = self.ax_weekly.plot([], [], marker="o", ms=3, label="Without trade")
+        self.ax_weekly.legend(loc="upper left")
+        self.ax_weekly.set_ylabel("Points")
+        (self.line_cum,) = self.ax_cum.plot([], [], color="tab:purple", label="Cumulative delta")
+        self.ax_cum.axhline(0, linestyle="--", color="grey", linewidth=1)
+        self.ax_cum.set_xlabel("Week")
+        self.ax_cum.set_ylabel("Cumulative delta")
+
+    def render(self, rec: Dict[str, object], base: str, formats: Sequence[str]) -> List[str]:
+        weeks = rec["weeks"]
+        self.line_with.set_data(weeks, rec["with"])
+        self.line_without.set_data(weeks, rec["without"])
+        self.line_cum.set_data(weeks, rec["cumulative"])
+        self.line_cum.set_color("tab:green" if rec["total_delta"] >= 0 else "tab:red")
+        for ax in (self.ax_weekly, self.ax_cum):
+            ax.relim()
+            ax.autoscale_view()
+        season = f"{rec['season']}, " if rec["season"] is not None else ""
+        self.ax_weekly.set_title(f"{rec['label']}: weekly points ({season}trade week {rec['trade_week']})")
+        self.ax_cum.set_title(f"Cumulative regret, total delta {rec['total_delta']:+.2f}")
+
+        files = []
+        for fmt in formats:
+            path = f"{base}.{fmt}"
+            self.fig.savefig(path, format=fmt)
+            files.append(path)
+        return files
+
+
+def _init_worker(figsize, dpi: int) -> None:
+    global _canvas
+    _canvas = _ChartCanvas(figsize, dpi)
+
+
+def _entry(rec: Dict[str, object], files: List[str]) -> Dict[str, object]:
+    """What the index needs about a record (small, so it is cheap to send back from workers)."""
+    return {
+        "n": rec["n"], "label": rec["label"], "season": rec["season"], "trade_week": rec["trade_week"],
+        "total_delta": rec["total_delta"], "error": rec["error"], "files": files,
+    }
+
+
+def _render_chunk(records: List[Dict[str, object]], chart_dir: str, formats: Sequence[str]) -> List[Dict[str, object]]:
+    out = []
+    for rec in records:
+        files = []
+        if not rec["error"] and len(rec["weeks"]):
+            files = _canvas.render(rec, os.path.join(chart_dir, rec["name"]), formats)
+        out.append(_entry(rec, files))
+    return out
+
+
+def render_overlay(records: Sequence[Dict[str, object]], out_base: str, formats: Sequence[str] = ("png",), dpi: int = 100) -> List[str]:
+    """
+    Every record's cumulative delta curve in one chart, drawn as a single
+    LineCollection (green = ended ahead, red = behind), plus the median.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    curves = [np.column_stack([r["weeks"], r["cumulative"]]) for r in records if not r["error"] and len(r["weeks"])]
+    fig = Figure(figsize=OVERLAY_SIZE, dpi=dpi, layout="constrained")
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    if curves:
+        ahead = np.array([c[-1, 1] >= 0 for c in curves])
+        alpha = float(np.clip(30.0 / len(curves), 0.02, 0.6))   # denser overlays get fainter lines
+        colors = np.where(ahead[:, None], [[0.17, 0.63, 0.17, alpha]], [[0.84, 0.15, 0.16, alpha]])
+        ax.add_collection(LineCollection(curves, colors=colors, linewidths=0.8))
+
+        # median cumulative delta per week, over the curves that cover it
+        weeks = np.arange(min(int(c[0, 0]) for c in curves), max(int(c[-1, 0]) for c in curves) + 1)
+        grid = np.full((len(curves), len(weeks)), np.nan)
+        for i, c in enumerate(curves):
+            grid[i, c[:, 0].astype(int) - weeks[0]] = c[:, 1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # a week no curve covers -> NaN, on purpose
+            median = np.nanmedian(grid, axis=0)
+        ax.plot(weeks, median, color="black", linewidth=2, label="Median")
+        ax.legend(loc="upper left")
+        ax.autoscale_view()
+        ax.set_title(f"Cumulative regret, {len(curves)} trades ({int(ahead.sum())} ended ahead)")
+    else:
+        ax.set_title("Cumulative regret: no results")
+    ax.axhline(0, linestyle="--", color="grey", linewidth=1)
+    ax.set_xlabel("Week")
+    ax.set_ylabel("Cumulative delta")
+
+    files = []
+    for fmt in formats:
+        fig.savefig(f"{out_base}.{fmt}", format=fmt)
+        files.append(f"{out_base}.{fmt}")
+    return files
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_index(out_dir: str, entries: List[Dict[str, object]], overlay_files: List[str], seconds: float) -> str:
+    def rel(path: str) -> str:
+        return html.escape(os.path.relpath(path, out_dir).replace(os.sep, "/"))
+
+    ok = [e for e in entries if not e["error"]]
+    rows = []
+    for e in sorted(entries, key=lambda e: (e["error"] is not None, e["total_delta"])):
+        links = " ".join(f'<a href="{rel(f)}">{html.escape(os.path.splitext(f)[1][1:])}</a>' for f in e["files"])
+        thumb = f'<a href="{rel(e["files"][0])}"><img src="{rel(e["files"][0])}" width="240" loading="lazy"></a>' if e["files"] else ""
+        delta = html.escape(e["error"]) if e["error"] else f"{e['total_delta']:+.2f}"
+        rows.append(
+            f"<tr><td>{html.escape(e['label'])}</td><td>{e['season'] if e['season'] is not None else ''}</td>"
+            f"<td>{e['trade_week']}</td><td>{delta}</td><td>{thumb}</td><td>{links}</td></tr>"
+        )
+    overlay = ""
+    if overlay_files:
+        overlay = f'<h2>All trades</h2><p><a href="{rel(overlay_files[0])}"><img src="{rel(overlay_files[0])}" width="900"></a></p>'
+    page = f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Trade regret report</title>
+<style>body{{font-family:sans-serif}} td,th{{padding:4px 8px;border-bottom:1px solid #ddd;text-align:left}}</style>
+</head><body>
+<h1>Trade regret report</h1>
+<p>{len(entries)} results, {len(ok)} charted, {sum(e['total_delta'] >= 0 for e in ok)} ended ahead; rendered in {seconds:.1f}s.</p>
+{overlay}
+<table><tr><th>Result</th><th>Season</th><th>Trade week</th><th>Total delta</th><th>Chart</th><th>Files</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+    path = os.path.join(out_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+@traced("report.generate")
+def generate_report(
+    results: Iterable[Dict[str, object]],
+    out_dir: str,
+    formats: Sequence[str] = ("png",),
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    overlay: bool = False,
+    charts: bool = True,
+    dpi: int = 80,
+) -> Dict[str, object]:
+    """
+    Renders a chart per result (charts=True) and/or the overlay into
+    out_dir, then writes out_dir/index.html. workers=0 renders in this
+    process; None uses one worker per CPU. Returns counts, the index path
+    and the wall time.
+    """
+    bad = [f for f in formats if f not in FORMATS]
+    if bad or not formats:
+        raise ValueError(f"formats must be from {FORMATS}, got {list(formats)}")
+    start = time.perf_counter()
+    chart_dir = os.path.join(out_dir, "charts")
+    os.makedirs(chart_dir, exist_ok=True)
+
+    records = [_chart_record(row, n) for n, row in enumerate(results)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    entries: List[Dict[str, object]] = []
+    if not charts:
+        entries = [_entry(rec, []) for rec in records]
+    elif workers <= 1 or len(records) <= chunk_size:
+        _init_worker(CHART_SIZE, dpi)
+        entries = _render_chunk(records, chart_dir, formats)
+    else:
+        # at most 2 chunks per worker in flight, so big batches don't pile up in the queue
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(CHART_SIZE, dpi)) as ex:
+            pending = set()
+            for chunk in _chunks(records, chunk_size):
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        entries.extend(fut.result())
+                pending.add(ex.submit(_render_chunk, chunk, chart_dir, formats))
+            for fut in pending:
+                entries.extend(fut.result())
+        entries.sort(key=lambda e: e["n"])
+
+    overlay_files = render_overlay(records, os.path.join(out_dir, "overlay"), formats) if overlay else []
+    seconds = time.perf_counter() - start
+    index = _write_index(out_dir, entries, overlay_files, seconds)
+    return {
+        "results": len(records),
+        "charts": sum(bool(e["files"]) for e in entries),
+        "failed": sum(e["error"] is not None for e in entries),
+        "overlay": overlay_files,
+        "index": index,
+        "seconds": seconds,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Render regret charts + an HTML index for replay results.")
+    parser.add_argument("results", help="run_batch output: .jsonl file or Parquet directory")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--format", default="png", help="comma-separated: png,svg")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--dpi", type=int, default=80)
+    parser.add_argument("--overlay", action="store_true", help="also draw every curve in one chart")
+    parser.add_argument("--no-charts", action="store_true", help="skip per-result charts (overlay + index only)")
+    args = parser.parse_args(argv)
+
+    summary = generate_report(
+        iter_results(args.results), args.out, formats=[f.strip() for f in args.format.split(",") if f.strip()],
+        workers=args.workers, chunk_size=args.chunk_size, overlay=args.overlay or args.no_charts,
+        charts=not args.no_charts, dpi=args.dpi,
+    )
+    print(f"{summary['charts']} charts for {summary['results']} results in {summary['seconds']:.1f}s -> {summary['index']}")
+
+
+if __name__ == "__main__":
+    main()
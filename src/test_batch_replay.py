@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from engine.loading_data.load import build_weekly_indexes
+from engine.simulator.simulate import Trade, counterfactual_replay, counterfactual_replay_many, trade_week_sweep
+
+
+def _random_league(seed=0, n_rows=3000, n_players=80):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 15, n_rows),
+        "player_id": [f"p{i}" for i in rng.integers(0, n_players, n_rows)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE", "K"], n_rows),
+        "fantasy_points_ppr": np.round(rng.normal(8, 6, n_rows), 2),
+    })
+
+
+def test_batch_replay_matches_single_replay():
+    points_index, pos_index, _ = build_weekly_indexes(_random_league())
+    roster = [f"p{i}" for i in range(18)]
+    trades = [
+        Trade(week=4, give=["p0"], get=["p40"]),
+        Trade(week=6, give=["p1", "p2"], get=["p41"]),
+        Trade(week=9, give=["p3", "p4"], get=["p42", "p43"]),
+        Trade(week=5, give=["p5"], get=["p6"]),  # receive someone already on the roster
+    ]
+
+    many = counterfactual_replay_many(roster, trades, points_index, pos_index, 2020, 14)
+
+    assert many["weekly_with_trade"].shape == (len(trades), 11)
+    for i, trade in enumerate(trades):
+        single = counterfactual_replay(roster, trade, points_index, pos_index, 2020, 14)
+        off = trade.week - int(many["weeks"][0])
+        assert many["weekly_with_trade"][i, off:].tolist() == single["weekly_with_trade"]
+        assert many["weekly_without_trade"][off:].tolist() == single["weekly_without_trade"]
+        assert many["cumulative_delta"][i, off:].tolist() == single["cumulative_delta"]
+        assert many["total_delta"][i] == single["total_delta"]
+        assert not many["weekly_delta"][i, :off].any()
+
+
+def test_trade_week_sweep_matches_one_replay_per_week():
+    points_index, pos_index, _ = build_weekly_indexes(_random_league(seed=3))
+    roster = [f"p{i}" for i in range(18)]
+    give, get = ["p0", "p1"], ["p40", "p41"]
+
+    sweep = trade_week_sweep(roster, give, get, points_index, pos_index, 2020, 2, 14)
+
+    assert sweep["trade_weeks"].tolist() == list(range(2, 15))
+    for i, week in enumerate(range(2, 15)):
+        single = counterfactual_replay(roster, Trade(week=week, give=give, get=get), points_index, pos_index, 2020, 14)
+        assert np.isclose(sweep["total_delta"][i], single["total_delta"])
+        np.testing.assert_allclose(sweep["cumulative_delta"][i, i:], single["cumulative_delta"])
+        assert not sweep["cumulative_delta"][i, :i].any()
+    assert sweep["best_total_delta"] == sweep["total_delta"].max()
+    assert sweep["regret"].min() == 0.0 and (sweep["regret"] >= 0).all()
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from benchmarks.suite import compare
+from benchmarks.synthetic import generate_weekly
+
+
+def test_synthetic_weekly_is_deterministic_and_shaped():
+    a = generate_weekly(n_seasons=2, n_players=50, n_weeks=6, seed=3)
+    b = generate_weekly(n_seasons=2, n_players=50, n_weeks=6, seed=3)
+
+    pd.testing.assert_frame_equal(a, b)
+    assert sorted(a["season"].unique()) == [2000, 2001]
+    assert a["week"].between(1, 6).all()
+    assert a["player_id"].nunique() <= 50
+    assert not a.duplicated(["season", "week", "player_id"]).any()
+    # one position per player across seasons
+    assert (a.groupby("player_id")["position"].nunique() == 1).all()
+
+
+def test_compare_flags_only_real_slowdowns():
+    def report(load, lineup):
+        return {"results": {"small": {
+            "load_weekly_csv": {"min": load, "median": load},
+            "optimal_lineup_points": {"min": lineup, "median": lineup},
+        }}}
+
+    baseline = report(0.100, 0.00001)
+    assert compare(report(0.110, 0.00003), baseline, threshold=0.25, min_seconds=0.001) == []
+    assert compare(report(0.200, 0.00001), baseline, threshold=0.25, min_seconds=0.001) == ["small/load_weekly_csv"]
@@ -0,0 +1,58 @@
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_compiled import synthetic_features
+from engine.ml.compiled import CompiledModel, compile_pipeline, export_compiled_model, load_compiled_model
+from engine.ml.predict import file_fingerprint, load_inference_model, model_fingerprint, predict_next_week_points
+from engine.ml.train import build_pipeline
+
+
+def test_compiled_model_matches_pipeline(tmp_path):
+    train = synthetic_features(3000, ["QB", "RB", "WR", "TE"], seed=1)
+    y = train["roll3_mean"].fillna(4) + (train["position"] == "QB") * 6
+    pipe = build_pipeline().fit(train, y)
+
+    path = compile_pipeline(pipe, model_hash="abc123").save(str(tmp_path / "model.npz"))
+    compiled = load_compiled_model(path)
+    assert load_compiled_model(path, model_hash="other") is None
+    assert model_fingerprint(compiled) == "abc123"
+
+    # NaNs go through the imputer, "K" was never seen in training
+    X = synthetic_features(500, ["QB", "RB", "WR", "TE", "K"], seed=2)
+    X.loc[0, ["lag1_points", "roll3_mean", "roll5_mean"]] = np.nan
+    np.testing.assert_allclose(compiled.predict(X), pipe.predict(X), rtol=0, atol=1e-9)
+    pd.testing.assert_series_equal(
+        predict_next_week_points(compiled, X.iloc[:20]), predict_next_week_points(pipe, X.iloc[:20]), atol=1e-9
+    )
+
+
+def test_load_inference_model_prefers_a_fresh_compiled_copy(tmp_path):
+    pipe = build_pipeline().fit(synthetic_features(500, ["QB", "RB"]), np.arange(500.0))
+    model_file = str(tmp_path / "model.joblib")
+    joblib.dump(pipe, model_file)
+    assert not isinstance(load_inference_model(model_file), CompiledModel)
+
+    export_compiled_model(pipe, str(tmp_path / "model.npz"), model_hash=file_fingerprint(model_file))
+    compiled = load_inference_model(model_file)
+    assert isinstance(compiled, CompiledModel)
+    assert model_fingerprint(compiled) == file_fingerprint(model_file)
+
+    joblib.dump(build_pipeline().fit(synthetic_features(500, ["QB"]), np.arange(500.0)), model_file)   # retrained
+    assert not isinstance(load_inference_model(model_file), CompiledModel)
+
+
+def test_loading_does_not_import_sklearn(tmp_path):
+    pipe = build_pipeline().fit(synthetic_features(500, ["QB", "RB"]), np.arange(500.0))
+    path = compile_pipeline(pipe).save(str(tmp_path / "model.npz"))
+    code = (
+        "import sys, pandas as pd; from engine.ml.compiled import load_compiled_model; "
+        f"m = load_compiled_model({path!r}); "
+        "m.predict(pd.DataFrame({'lag1_points': [1.0], 'roll3_mean': [2.0], 'roll5_mean': [3.0], 'position': ['QB']})); "
+        "print('sklearn' in sys.modules)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.simulator.expected import _build_features_for_week, build_season_feature_table
+
+
+def test_feature_table_matches_per_week_builder():
+    rng = np.random.default_rng(0)
+    n = 4000
+    df = pd.DataFrame({
+        "season": rng.integers(2019, 2022, n),
+        "week": rng.integers(1, 18, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 150, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2, 4, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+    roster = [f"p{i}" for i in range(25)] + ["never_played"]
+
+    table = build_season_feature_table(df, 2020)
+
+    for week in range(1, 20):
+        expected = _build_features_for_week(df, 2020, week, roster)
+        pd.testing.assert_frame_equal(table.features_for_week(week, roster), expected, check_exact=True)
+
+    empty = build_season_feature_table(df, 1990).features_for_week(5, ["p1"])
+    pd.testing.assert_frame_equal(empty, _build_features_for_week(df, 1990, 5, ["p1"]), check_exact=True)
+
+
+class _CountingModel:
+    """Stand-in for the sklearn pipeline: counts predict calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return 0.5 * X["lag1_points"].to_numpy() + 0.25 * X["roll3_mean"].to_numpy() + 1.0
+
+
+def test_expected_replay_batches_both_worlds_into_one_predict():
+    from engine.simulator.expected import (
+        PredictionMemo,
+        expected_counterfactual_replay,
+        simulate_expected_points,
+    )
+    from engine.simulator.lineup import optimal_lineup_points
+    from engine.simulator.simulate import Trade, apply_trade_to_roster
+
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 18, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 80, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2, 4, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+    roster = [f"p{i}" for i in range(18)]
+    trade = Trade(week=6, give=["p1", "p2"], get=["p40"])
+    model, memo = _CountingModel(), PredictionMemo()
+
+    res = expected_counterfactual_replay(model, df, roster, trade, 2020, 17, optimal_lineup_points, memo=memo)
+    assert model.calls == 1
+
+    without, _ = simulate_expected_points(_CountingModel(), df, roster, 2020, 6, 17, optimal_lineup_points)
+    with_, _ = simulate_expected_points(
+        _CountingModel(), df, apply_trade_to_roster(roster, trade), 2020, 6, 17, optimal_lineup_points
+    )
+    assert res["weekly_without_trade"] == without
+    assert res["weekly_with_trade"] == with_
+
+    again = expected_counterfactual_replay(model, df, roster, trade, 2020, 17, optimal_lineup_points, memo=memo)
+    assert again == res
+    assert model.calls == 1  # everything came from the memo
+
+
+def test_memo_rejects_feature_tables_from_other_data():
+    from engine.simulator.expected import PredictionMemo, predict_weeks
+
+    df = pd.DataFrame({
+        "season": 2020, "week": [1, 2, 1], "player_id": ["a", "a", "b"], "player_name": "x",
+        "position": "WR", "fantasy_points_ppr": [5.0, 7.0, 3.0],
+    })
+    memo = PredictionMemo(data_stamp="sha-1")
+    predict_weeks(_CountingModel(), build_season_feature_table(df, 2020, "sha-1"), ["a", "b"], [2, 3], memo)
+    predict_weeks(_CountingModel(), build_season_feature_table(df, 2020), ["a"], [3], memo)  # unknown: no check
+    with pytest.raises(ValueError, match="sha-2"):
+        predict_weeks(_CountingModel(), build_season_feature_table(df, 2020, "sha-2"), ["a"], [3], memo)
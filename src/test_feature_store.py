@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from engine.loading_data.load import load_weekly_csv
+from engine.ml.feature_store import open_feature_store
+from engine.ml.features import make_features, target_col
+from engine.simulator.expected import _build_features_for_week, build_season_feature_table
+
+
+def _weekly_df(seed=0, n=3000):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "season": rng.integers(2019, 2022, n),
+        "week": rng.integers(1, 15, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 120, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2.0, 4.0, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+    df.loc[df.index[::50], "fantasy_points_ppr"] = np.nan
+    return df
+
+
+def _pandas_rolling_reference(df):
+    df = df.sort_values(["player_id", "season", "week"]).copy()
+    df[target_col] = df[target_col].fillna(0.0)
+    g = df.groupby(["player_id", "season"], sort=False)[target_col]
+    return pd.DataFrame({
+        "lag1_points": g.shift(1).fillna(0.0),
+        "roll3_mean": g.transform(lambda s: s.shift(1).rolling(3, min_periods=1).mean()),
+        "roll5_mean": g.transform(lambda s: s.shift(1).rolling(5, min_periods=1).mean()),
+        "y_next_week": g.shift(-1),
+    }).dropna(subset=["y_next_week"])
+
+
+def test_vectorized_rolling_matches_pandas_rolling():
+    df = _weekly_df()
+    feat = make_features(df)
+    ref = _pandas_rolling_reference(df)
+
+    assert feat.index.equals(ref.index)
+    pd.testing.assert_frame_equal(feat[ref.columns], ref, check_exact=True)
+
+
+def test_store_recomputes_only_changed_player_seasons(tmp_path):
+    csv_path = str(tmp_path / "weekly.csv")
+    dirs = (str(tmp_path / "weekly_store"), str(tmp_path / "features"))
+    df = _weekly_df(seed=1)
+    df.to_csv(csv_path, index=False)
+
+    store = open_feature_store(csv_path, *dirs)
+    n_player_seasons = store.last_update["recomputed"]
+    pd.testing.assert_frame_equal(store.load(), make_features(load_weekly_csv(csv_path)).reset_index(drop=True))
+
+    new_week = pd.DataFrame({
+        "season": 2021, "week": 15, "player_id": ["p1", "p2"], "player_name": "x",
+        "position": "WR", "fantasy_points_ppr": [4.0, 9.5],
+    })
+    pd.concat([df, new_week]).to_csv(csv_path, index=False)
+
+    store = open_feature_store(csv_path, *dirs)
+    assert store.last_update == {"recomputed": 2, "kept": n_player_seasons - 2}
+    raw = load_weekly_csv(csv_path)
+    pd.testing.assert_frame_equal(store.load(), make_features(raw).reset_index(drop=True))
+
+    table, ref = store.season_feature_table(2021), build_season_feature_table(raw, 2021)
+    assert (table.keys == ref.keys).all() and (table.position == ref.position).all()
+    np.testing.assert_array_equal(table.roll5_mean, ref.roll5_mean)
+
+
+def test_store_features_match_per_week_builder_exactly(tmp_path):
+    csv_path = str(tmp_path / "weekly.csv")
+    _weekly_df(seed=2).to_csv(csv_path, index=False)
+    store = open_feature_store(csv_path, str(tmp_path / "weekly_store"), str(tmp_path / "features"))
+    raw = load_weekly_csv(csv_path)
+    roster = [f"p{i}" for i in range(30)] + ["never_played"]
+
+    table = store.season_feature_table(2020)
+    for week in range(1, 17):
+        expected = _build_features_for_week(raw, 2020, week, roster)
+        pd.testing.assert_frame_equal(table.features_for_week(week, roster), expected, check_exact=True)
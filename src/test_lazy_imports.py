@@ -0,0 +1,11 @@
+import subprocess
+import sys
+
+from benchmarks.import_time import LAZY, app_imports
+
+
+def test_entry_points_do_not_import_ml_or_plotting_stacks():
+    code = app_imports() + "\nimport engine.run_replay, engine.service, engine.run_batch\nimport sys\n"
+    code += f"print(sorted(m for m in {sorted(LAZY['engine.service'])!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.loading_data.load import build_weekly_indexes
+from engine.simulator.league import (
+    league_season,
+    league_trade_odds,
+    make_league,
+    round_robin_schedule,
+    traded_rosters,
+)
+from engine.simulator.monte_carlo import residuals_from_history
+from engine.simulator.simulate import Trade
+
+
+def _league_data(seed=0):
+    rng = np.random.default_rng(seed)
+    n = 6000
+    df = pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 13, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 96, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2.0, 4.0, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+    rosters = {f"T{t}": [f"p{t * 16 + i}" for i in range(16)] for t in range(6)}
+    return df, make_league(rosters, n_weeks=9, playoff_teams=3)
+
+
+def test_round_robin_plays_everyone_once():
+    teams = ["A", "B", "C", "D", "E"]
+    schedule = round_robin_schedule(teams, 5)
+    pairs = [frozenset(g) for week in schedule for g in week]
+    assert len(pairs) == len(set(pairs)) == 10
+    for week in schedule:
+        playing = [t for g in week for t in g]
+        assert len(playing) == len(set(playing)) == 4
+
+
+def test_trade_moves_players_both_ways():
+    _, league = _league_data()
+    after = traded_rosters(league, Trade(4, ["p0"], ["p16", "p17"]), "T0", "T1")
+    assert "p16" in after["T0"] and "p0" not in after["T0"]
+    assert "p0" in after["T1"] and "p16" not in after["T1"]
+    with pytest.raises(ValueError):
+        traded_rosters(league, Trade(4, ["p16"], ["p0"]), "T0", "T1")
+
+
+def test_noise_free_odds_match_the_real_season():
+    df, league = _league_data()
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    trade = Trade(5, ["p0", "p1"], ["p16", "p17"])
+
+    for with_trade in (False, True):
+        real = league_season(league, points_index, pos_index, 2020, *((trade, "T0", "T1") if with_trade else ()))
+        odds = league_trade_odds(league, trade, "T0", "T1", points_index, pos_index, 2020, n_sims=2)
+        world = odds["with_trade" if with_trade else "without_trade"]
+        assert [t for t, p in world["playoff_prob"].items() if p == 1.0] == sorted(real["playoff_teams"], key=league.teams.index)
+        assert world["champion_prob"][real["champion"]] == 1.0
+        assert world["mean_wins"] == real["wins"]
+
+
+def test_odds_are_seeded_and_ignore_worker_count():
+    df, league = _league_data(seed=1)
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    trade = Trade(5, ["p0"], ["p16"])
+    residuals = residuals_from_history(df, min_count=10)
+
+    serial = league_trade_odds(league, trade, "T0", "T1", points_index, pos_index, 2020, residuals, n_sims=400, seed=9, chunk_size=100)
+    pooled = league_trade_odds(league, trade, "T0", "T1", points_index, pos_index, 2020, residuals, n_sims=400, seed=9, chunk_size=100, n_workers=2)
+
+    assert serial == pooled
+    assert sum(serial["with_trade"]["champion_prob"].values()) == pytest.approx(1.0)
+    assert sum(serial["without_trade"]["playoff_prob"].values()) == pytest.approx(3.0)
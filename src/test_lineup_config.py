@@ -0,0 +1,81 @@
+import itertools
+import random
+
+import pytest
+
+from engine.simulator.lineup import (
+    DEFAULT_LINEUP,
+    SUPERFLEX_LINEUP,
+    lineup_config,
+    optimal_lineup_points,
+    solve_lineup,
+)
+
+SPLIT_FLEX = lineup_config(
+    {"QB": 1, "RB": 1, "WR": 1, "WR_RB": 1, "WR_TE": 1},
+    {"WR_RB": {"WR", "RB"}, "WR_TE": {"WR", "TE"}},
+)
+
+
+def _fits(group, positions, seats):
+    """Can every player in group get its own eligible seat?"""
+    if not group:
+        return True
+    first, rest = group[0], group[1:]
+    for i, (count, eligible) in enumerate(seats):
+        if count and positions.get(first) in eligible:
+            seats[i] = (count - 1, eligible)
+            ok = _fits(rest, positions, seats)
+            seats[i] = (count, eligible)
+            if ok:
+                return True
+    return False
+
+
+def _brute_force(points, positions, config):
+    """Best (n_filled, total) over every subset of players that fits the slots."""
+    seats = [(count, eligible) for _, count, eligible in config.slots]
+    pids = list(points)
+    for n in range(min(config.n_starters, len(pids)), -1, -1):
+        totals = [
+            sum(points[pid] for pid in group)
+            for group in itertools.combinations(pids, n)
+            if _fits(group, positions, seats)
+        ]
+        if totals:
+            return n, max(totals)
+    return 0, 0.0
+
+
+def _random_roster(rng, size):
+    pos = {f"p{i}": rng.choice(["QB", "RB", "WR", "TE", "K"]) for i in range(size)}
+    pts = {pid: round(rng.uniform(-2, 25), 2) for pid in pos}
+    return pts, pos
+
+
+@pytest.mark.parametrize("config", [DEFAULT_LINEUP, SUPERFLEX_LINEUP, SPLIT_FLEX])
+def test_solve_lineup_is_optimal(config):
+    rng = random.Random(3)
+    for _ in range(40):
+        pts, pos = _random_roster(rng, 8)
+        total, chosen = solve_lineup(pts, pos, config, method="exact")
+        n_filled, best = _brute_force(pts, pos, config)
+        assert len(chosen) == n_filled
+        assert total == pytest.approx(best)
+        if config.is_laminar:
+            fast_total, _ = solve_lineup(pts, pos, config, method="greedy")
+            assert fast_total == pytest.approx(best)
+
+
+def test_default_config_matches_greedy_optimizer():
+    rng = random.Random(11)
+    for _ in range(200):
+        pts, pos = _random_roster(rng, 16)
+        expected, _ = optimal_lineup_points(pts, pos)
+        assert optimal_lineup_points(pts, pos, DEFAULT_LINEUP)[0] == pytest.approx(expected)
+
+
+def test_greedy_refuses_non_laminar_layout():
+    assert not SPLIT_FLEX.is_laminar
+    with pytest.raises(ValueError):
+        solve_lineup({"a": 1.0}, {"a": "WR"}, SPLIT_FLEX, method="greedy")
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.loading_data.load import build_weekly_indexes
+from engine.simulator.lineup import (
+    LINEUP_POSITIONS,
+    SUPERFLEX_LINEUP,
+    batch_lineup_totals,
+    lineup_config,
+    lineup_kernel,
+    optimal_lineup_points,
+    solve_lineup,
+)
+from engine.simulator.monte_carlo import ResidualModel, monte_carlo_replay
+from engine.simulator.simulate import Trade, counterfactual_replay, counterfactual_replay_many, simulate_season_points
+
+
+def _random_tensor(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.round(rng.normal(8, 6, shape), 2)
+    codes = rng.integers(-1, len(LINEUP_POSITIONS), shape).astype(np.int16)
+    return points, codes
+
+
+def _cell_views(points, codes):
+    roster_points = {f"p{i}": float(v) for i, v in enumerate(points)}
+    roster_pos = {f"p{i}": LINEUP_POSITIONS[c] for i, c in enumerate(codes) if c >= 0}
+    return roster_points, roster_pos
+
+
+def test_kernel_matches_greedy_on_every_cell():
+    points, codes = _random_tensor((6, 5, 18))
+
+    totals, selected = lineup_kernel(points, codes)
+
+    assert (totals == batch_lineup_totals(points, codes)).all()
+    for cell in np.ndindex(totals.shape):
+        roster_points, roster_pos = _cell_views(points[cell], codes[cell])
+        expected_total, expected_chosen = optimal_lineup_points(roster_points, roster_pos)
+        picked = [f"p{i}" for i in selected[cell] if i >= 0]
+        assert totals[cell] == expected_total
+        assert sorted(roster_points[p] for p in picked) == sorted(roster_points[p] for p in expected_chosen)
+
+
+def test_kernel_superflex_matches_solver():
+    points, codes = _random_tensor((40, 14), seed=1)
+
+    totals, _ = lineup_kernel(points, codes, SUPERFLEX_LINEUP)
+
+    for row in range(len(points)):
+        expected, _ = solve_lineup(*_cell_views(points[row], codes[row]), SUPERFLEX_LINEUP)
+        assert totals[row] == pytest.approx(expected)
+
+
+def _season_frame(seed=2, n=2000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 15, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 60, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE", "K"], n),
+        "fantasy_points_ppr": np.round(rng.normal(8, 6, n), 2),
+    })
+
+
+def test_simulate_season_points_vectorized_flag():
+    points_index, pos_index, _ = build_weekly_indexes(_season_frame())
+    roster = [f"p{i}" for i in range(20)] + ["not_in_data"]
+
+    loop = simulate_season_points(roster, points_index, pos_index, 2020, 3, 16)
+    fast = simulate_season_points(roster, points_index, pos_index, 2020, 3, 16, vectorized=True)
+
+    assert fast[0] == loop[0]
+    for week, (a, b) in enumerate(zip(fast[1], loop[1]), start=3):
+        week_points = points_index.get((2020, week), {})
+        assert sorted(week_points.get(p, 0.0) for p in a) == sorted(week_points.get(p, 0.0) for p in b)
+
+
+def test_batch_replays_use_the_lineup_config():
+    points_index, pos_index, _ = build_weekly_indexes(_season_frame())
+    # superflex plus a kicker: K is outside LINEUP_POSITIONS
+    config = lineup_config(
+        {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "K": 1, "SUPERFLEX": 1},
+        {"SUPERFLEX": {"QB", "RB", "WR", "TE"}},
+    )
+    roster = [f"p{i}" for i in range(16)]
+    trades = [Trade(week=4, give=["p1", "p2"], get=["p40", "p41"]), Trade(week=7, give=["p5"], get=["p50"])]
+
+    many = counterfactual_replay_many(roster, trades, points_index, pos_index, 2020, 14, lineup_config=config)
+    for i, trade in enumerate(trades):
+        one = counterfactual_replay(roster, trade, points_index, pos_index, 2020, 14, lineup_config=config)
+        assert many["total_delta"][i] == pytest.approx(one["total_delta"])
+    assert many["total_delta"][0] != pytest.approx(
+        counterfactual_replay_many(roster, trades, points_index, pos_index, 2020, 14)["total_delta"][0]
+    )
+
+    # no noise: every sampled season is the center season
+    flat = ResidualModel(by_position={}, pooled=np.zeros(1))
+    mc = monte_carlo_replay(roster, trades[0], points_index, pos_index, 2020, 14, flat, n_sims=20, lineup_config=config)
+    assert mc["expected_total_delta"] == pytest.approx(mc["total_delta"])
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.loading_data.load import build_weekly_indexes
+from engine.simulator.monte_carlo import ResidualModel, monte_carlo_replay, residuals_from_history
+from engine.simulator.simulate import Trade, counterfactual_replay
+
+
+def _weekly_df(seed=4):
+    rng = np.random.default_rng(seed)
+    n = 3000
+    return pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 15, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 80, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2.0, 4.0, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+
+
+def test_monte_carlo_is_seeded_and_keeps_replay_keys():
+    df = _weekly_df()
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    roster = [f"p{i}" for i in range(16)]
+    trade = Trade(week=5, give=["p1", "p2"], get=["p40", "p41"])
+    residuals = residuals_from_history(df, min_count=10)
+
+    res = monte_carlo_replay(roster, trade, points_index, pos_index, 2020, 14, residuals, n_sims=500, seed=3)
+    again = monte_carlo_replay(roster, trade, points_index, pos_index, 2020, 14, residuals, n_sims=500, seed=3)
+
+    base = counterfactual_replay(roster, trade, points_index, pos_index, 2020, 14)
+    for key, value in base.items():
+        assert res[key] == value
+    assert res["total_delta_percentiles"] == again["total_delta_percentiles"]
+    assert res["cumulative_delta_bands"] == again["cumulative_delta_bands"]
+    assert 0.0 <= res["prob_positive"] <= 1.0
+    bands = res["cumulative_delta_bands"]
+    assert len(bands[10]) == len(res["cumulative_delta"])
+    assert all(lo <= mid <= hi for lo, mid, hi in zip(bands[10], bands[50], bands[90]))
+
+
+def test_zero_residuals_collapse_to_deterministic_replay():
+    df = _weekly_df(seed=5)
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    roster = [f"p{i}" for i in range(16)]
+    trade = Trade(week=3, give=["p0"], get=["p50"])
+    no_noise = ResidualModel(by_position={}, pooled=np.zeros(1))
+
+    res = monte_carlo_replay(roster, trade, points_index, pos_index, 2020, 14, no_noise, n_sims=50, seed=0)
+
+    assert res["expected_total_delta"] == pytest.approx(res["total_delta"])
+    assert res["cumulative_delta_bands"][50] == pytest.approx(res["cumulative_delta"])
+    with pytest.raises(ValueError, match="n_sims"):
+        monte_carlo_replay(roster, trade, points_index, pos_index, 2020, 14, no_noise, n_sims=0)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from engine.ml.precompute import load_prediction_table, precompute_predictions
+from engine.simulator.expected import expected_counterfactual_replay
+from engine.simulator.lineup import optimal_lineup_points
+from engine.simulator.simulate import Trade
+
+
+class _LinearModel:
+    def __init__(self, bias):
+        self.bias = bias
+
+    def predict(self, X):
+        qb = (X["position"] == "QB").to_numpy() * 3.0
+        return 0.6 * X["lag1_points"].to_numpy() + 0.3 * X["roll5_mean"].to_numpy() + qb + self.bias
+
+
+def test_prediction_table_matches_live_inference(tmp_path):
+    rng = np.random.default_rng(4)
+    n = 3000
+    df = pd.DataFrame({
+        "season": rng.integers(2020, 2022, n),
+        "week": rng.integers(1, 18, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 90, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2, 4, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+    model = _LinearModel(bias=1.0)
+    path = str(tmp_path / "preds.parquet")
+    stamp = {"source_sha256": "abc", "features_version": 1}
+    precompute_predictions(model, df, path, data_stamp=stamp)
+
+    table = load_prediction_table(path, model, stamp)
+    roster = [f"p{i}" for i in range(18)] + ["rookie"]
+    trade = Trade(week=2, give=["p3"], get=["p50", "p51"])
+
+    live = expected_counterfactual_replay(model, df, roster, trade, 2021, 19, optimal_lineup_points)
+    looked_up = expected_counterfactual_replay(
+        model, df, roster, trade, 2021, 19, optimal_lineup_points, prediction_table=table
+    )
+    assert looked_up == live
+
+    # a different model means the table is stale -> caller goes live
+    assert load_prediction_table(path, _LinearModel(bias=2.0)) is None
+    assert load_prediction_table(str(tmp_path / "missing.parquet"), model) is None
+    # so does a table scored from other data (rebuilt CSV or feature definitions)
+    assert load_prediction_table(path, model, {**stamp, "source_sha256": "def"}) is None
+    assert load_prediction_table(path, model, {**stamp, "features_version": 2}) is None
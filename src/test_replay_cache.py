@@ -0,0 +1,31 @@
+import numpy as np
+
+from engine.memory import approx_nbytes
+from engine.simulator.replay_cache import ReplayCache, replay_key
+from engine.simulator.simulate import Trade
+
+
+def test_replay_key_ignores_roster_and_trade_order():
+    a = replay_key(2021, 17, ["x", "y", "z"], Trade(5, ["x"], ["p", "q"]), "Historical")
+    b = replay_key(2021, 17, ["z", "x", "y"], Trade(5, ["x"], ["q", "p"]), "Historical")
+    assert a == b
+    assert a != replay_key(2021, 17, ["x", "y", "z"], Trade(5, ["x"], ["p", "q"]), "ML", "model-hash")
+    assert a != replay_key(2021, 17, ["x", "y", "z"], Trade(5, ["x"], ["p", "q"]), "Historical", data_version="sha")
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ReplayCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1        # "b" is now the oldest
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_approx_nbytes_counts_arrays_once():
+    arr = np.zeros(10_000)
+    assert approx_nbytes({"x": arr, "y": arr}) < 2 * arr.nbytes
+    assert approx_nbytes([arr]) >= arr.nbytes
@@ -0,0 +1,35 @@
+import json
+import os
+
+from benchmarks.bench_report import synthetic_results
+from engine.visualization.report import generate_report, iter_results
+
+
+def test_report_renders_charts_overlay_and_index(tmp_path):
+    rows = synthetic_results(12)
+    rows[3] = {**rows[3], "job_id": "a<b>", "total_delta": -999.0}
+    rows[7] = {"job_id": "job-7", "mode": "historical", "season": 2022, "trade_week": 4, "error": "KeyError: 'x'"}
+    # a counterfactual_replay result: no job_id/mode/season, deltas implied by the weekly points
+    rows.append({"trade_week": 5, "weekly_with_trade": [10.0, 12.0, 9.0], "weekly_without_trade": [8.0, 13.0, 9.5]})
+    results_path = tmp_path / "results.jsonl"
+    results_path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    out = str(tmp_path / "report")
+    summary = generate_report(iter_results(str(results_path)), out, formats=("png", "svg"),
+                              workers=2, chunk_size=3, overlay=True)
+    assert (summary["results"], summary["charts"], summary["failed"]) == (13, 12, 1)
+
+    charts = sorted(os.listdir(os.path.join(out, "charts")))
+    assert len(charts) == 24 and charts[0].startswith("000000-job-0")
+    with open(os.path.join(out, "charts", charts[0]), "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+    assert [os.path.basename(p) for p in summary["overlay"]] == ["overlay.png", "overlay.svg"]
+
+    with open(summary["index"], encoding="utf-8") as f:
+        page = f.read()
+    assert "a&lt;b&gt;" in page and "a<b>" not in page
+    assert page.index("-999.00") < page.index("job-0 [historical]")   # worst first
+    assert "KeyError" in page and 'src="overlay.png"' in page and "000012-12.png" in page
+
+    serial = generate_report(rows, str(tmp_path / "serial"), workers=0, charts=False)
+    assert serial["charts"] == 0 and serial["overlay"] == []
@@ -0,0 +1,98 @@
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_weekly_csv
+from engine.loading_data.load import build_weekly_indexes
+from engine.run_batch import run_batch
+from engine.simulator.simulate import Trade, counterfactual_replay
+
+
+@pytest.fixture
+def weekly(tmp_path):
+    csv_path = write_weekly_csv(str(tmp_path / "weekly.csv"), n_seasons=2, n_players=60, n_weeks=8)
+    return csv_path, str(tmp_path / "store"), pd.read_csv(csv_path, dtype={"player_id": str})
+
+
+def _jobs(df, n):
+    jobs = []
+    for i in range(n):
+        season = 2000 + i % 2
+        ids = sorted(df.loc[df["season"] == season, "player_id"].unique())
+        roster = ids[i % 5:i % 5 + 12]
+        trade = {"week": 2 + i % 5, "give": roster[:1], "get": [ids[-1 - i % 7]]}
+        jobs.append({"job_id": f"j{i}", "season": season, "roster": roster, "trade": trade})
+    return jobs
+
+
+def test_jsonl_results_match_counterfactual_replay_and_resume(weekly, tmp_path):
+    csv_path, store_dir, df = weekly
+    jobs = _jobs(df, 9) + [{"job_id": "bad", "season": 1990, "roster": ["x"], "trade": {"week": 2, "give": [], "get": []}}]
+    jobs_path = tmp_path / "jobs.jsonl"
+    jobs_path.write_text("".join(json.dumps(j) + "\n" for j in jobs))
+    out = str(tmp_path / "out.jsonl")
+
+    # pretend an earlier run finished the first 4 jobs
+    (tmp_path / "out.jsonl.done").write_text("j0\nj1\nj2\nj3\n")
+    counts = run_batch(str(jobs_path), out, shard_size=3, csv_path=csv_path, store_dir=store_dir)
+    assert counts == {"jobs": 6, "skipped": 4, "rows": 6, "failed": 1}
+
+    rows = {r["job_id"]: r for r in map(json.loads, open(out))}
+    assert set(rows) == {"j4", "j5", "j6", "j7", "j8", "bad"}
+    assert rows["bad"]["error"].startswith("ValueError")
+
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    for job in jobs[4:9]:
+        direct = counterfactual_replay(job["roster"], Trade(**job["trade"]), points_index, pos_index, job["season"], 8)
+        assert rows[job["job_id"]]["total_delta"] == pytest.approx(direct["total_delta"])
+
+    # everything is checkpointed now: a rerun does nothing
+    assert run_batch(str(jobs_path), out, csv_path=csv_path, store_dir=store_dir)["jobs"] == 0
+
+
+def test_csv_jobs_to_parquet(weekly, tmp_path):
+    csv_path, store_dir, df = weekly
+    jobs = _jobs(df, 5)
+    pd.DataFrame({
+        "job_id": [j["job_id"] for j in jobs],
+        "season": [j["season"] for j in jobs],
+        "roster": ["|".join(j["roster"]) for j in jobs],
+        "trade_week": [j["trade"]["week"] for j in jobs],
+        "give": ["|".join(j["trade"]["give"]) for j in jobs],
+        "get": ["|".join(j["trade"]["get"]) for j in jobs],
+    }).to_csv(tmp_path / "jobs.csv", index=False)
+
+    out_dir = str(tmp_path / "results")
+    run_batch(str(tmp_path / "jobs.csv"), out_dir, fmt="parquet", shard_size=2, csv_path=csv_path, store_dir=store_dir)
+    result = pd.read_parquet(out_dir)
+
+    assert sorted(result["job_id"]) == sorted(j["job_id"] for j in jobs)
+    assert result["error"].isna().all()
+    assert (result["end_week"] == 8).all()
+    assert all(len(w) == 8 - t + 1 for w, t in zip(result["weekly_delta"], result["trade_week"]))
+
+
+@pytest.mark.parametrize("shared_index", [False, True])
+def test_process_pool_matches_single_worker(weekly, tmp_path, shared_index):
+    csv_path, store_dir, df = weekly
+    jobs = _jobs(df, 14) + [{"job_id": "bad", "season": 1990, "roster": ["x"], "trade": {"week": 2, "give": [], "get": []}}]
+    jobs_path = tmp_path / "jobs.jsonl"
+    jobs_path.write_text("".join(json.dumps(j) + "\n" for j in jobs))
+
+    def run(name, **kwargs):
+        out = str(tmp_path / name)
+        counts = run_batch(str(jobs_path), out, shard_size=2, csv_path=csv_path, store_dir=store_dir, **kwargs)
+        return counts, {r["job_id"]: r for r in map(json.loads, open(out))}
+
+    serial_counts, serial = run("serial.jsonl")
+    # 8 shards on 2 workers: more shards than the 2-per-worker in-flight cap
+    pool_counts, pooled = run("pool.jsonl", workers=2, shared_index=shared_index)
+
+    assert pool_counts == serial_counts == {"jobs": 15, "skipped": 0, "rows": 15, "failed": 1}
+    assert pooled.keys() == serial.keys()
+    for job_id, row in serial.items():
+        assert (pooled[job_id]["error"] is None) == (row["error"] is None)
+        if row["error"] is None:
+            assert pooled[job_id]["weekly_delta"] == pytest.approx(row["weekly_delta"])
+            assert pooled[job_id]["total_delta"] == pytest.approx(row["total_delta"])
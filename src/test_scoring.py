@@ -0,0 +1,103 @@
+import glob
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_weekly
+from engine.loading_data import scoring as scoring_mod
+from engine.loading_data.load import build_weekly_indexes, load_weekly_csv, load_weekly_index, load_weekly_seasons
+from engine.loading_data.scoring import PRESETS, available_formats, resolve_scoring, score_frame
+from engine.ml.features import make_features
+
+
+@pytest.fixture
+def weekly(tmp_path):
+    df = generate_weekly(n_seasons=2, n_players=80, n_weeks=6, raw_stats=True)
+    csv_path = str(tmp_path / "weekly.csv")
+    df.to_csv(csv_path, index=False)
+    return df, csv_path, str(tmp_path / "store")
+
+
+def test_presets_score_the_raw_stats(weekly):
+    df, _, _ = weekly
+    ppr, half, std = (score_frame(df, name) for name in ["ppr", "half_ppr", "standard"])
+    np.testing.assert_allclose(ppr, df["fantasy_points_ppr"], atol=0.006)
+    np.testing.assert_allclose(half, (ppr + std) / 2)
+    te = (df["position"] == "TE").to_numpy()
+    np.testing.assert_allclose(score_frame(df, "te_premium"), ppr + np.where(te, 0.5 * df["receptions"], 0.0))
+    assert set(available_formats(df.columns)) == set(PRESETS)
+    assert available_formats(["season", "receptions"]) == []
+
+    spec = {"name": "mine", "weights": dict(PRESETS["standard"].weights)}
+    assert resolve_scoring(spec).rules_hash == PRESETS["standard"].rules_hash   # name is not part of the hash
+    with pytest.raises(ValueError):
+        score_frame(df.drop(columns=["receptions"]), "ppr")
+
+
+def test_loaders_index_and_features_accept_a_format(weekly, tmp_path):
+    df, csv_path, store_dir = weekly
+    half = load_weekly_csv(csv_path, scoring="half_ppr")
+    np.testing.assert_allclose(half["fantasy_points_ppr"], score_frame(df, "half_ppr"))
+    assert list(half.columns) == list(load_weekly_csv(csv_path).columns)
+
+    compact = load_weekly_csv(csv_path, compact=True, chunksize=500, scoring="half_ppr")
+    np.testing.assert_allclose(compact["fantasy_points_ppr"], half["fantasy_points_ppr"], atol=1e-4)
+    streamed = load_weekly_index(csv_path, chunksize=500, scoring="half_ppr")
+    points_index, _, _ = build_weekly_indexes(df, scoring="half_ppr")
+    row = half.iloc[7]
+    key = (int(row["season"]), int(row["week"]))
+    assert points_index[key][row["player_id"]] == pytest.approx(row["fantasy_points_ppr"])
+    assert streamed.points_index[key][row["player_id"]] == pytest.approx(row["fantasy_points_ppr"], abs=1e-4)
+
+    feats = make_features(df, scoring="standard")
+    np.testing.assert_allclose(
+        feats["y_next_week"].to_numpy(),
+        make_features(df.assign(fantasy_points_ppr=score_frame(df, "standard")))["y_next_week"].to_numpy(),
+    )
+
+
+def test_store_points_are_cached_per_format(weekly, monkeypatch):
+    df, csv_path, store_dir = weekly
+    first = load_weekly_seasons([2001, 2000], csv_path, store_dir, scoring="te_premium")
+    cached = glob.glob(os.path.join(store_dir, "points", PRESETS["te_premium"].rules_hash, "season=*.npy"))
+    assert len(cached) == 2
+
+    keys = ["season", "week", "player_id"]
+    merged = first.merge(df[keys].assign(expected=score_frame(df, "te_premium")), on=keys, how="left")
+    np.testing.assert_allclose(merged["fantasy_points_ppr"], merged["expected"])
+
+    # switching back to a cached format: no CSV parse, no re-scoring
+    def fail(*args, **kwargs):
+        raise AssertionError("should have come from the cache")
+    monkeypatch.setattr(pd, "read_csv", fail)
+    monkeypatch.setattr(scoring_mod, "score_frame", fail)
+    again = load_weekly_seasons([2001, 2000], csv_path, store_dir, scoring="te_premium")
+    pd.testing.assert_frame_equal(again, first)
+
+    # a cache scored from another CSV is dropped
+    meta_path = os.path.join(store_dir, "points", PRESETS["te_premium"].rules_hash, "_meta.json")
+    with open(meta_path, "w") as f:
+        json.dump({"source_sha256": "stale"}, f)
+    monkeypatch.undo()
+    load_weekly_seasons([2000], csv_path, store_dir, scoring="te_premium")
+    assert len(glob.glob(os.path.join(os.path.dirname(meta_path), "season=*.npy"))) == 1
+
+
+def test_concurrent_rebuilds_of_a_stale_cache_agree(weekly):
+    df, csv_path, store_dir = weekly
+    expected = load_weekly_seasons([2000], csv_path, store_dir, scoring="half_ppr")["fantasy_points_ppr"]
+    cache = os.path.join(store_dir, "points", PRESETS["half_ppr"].rules_hash)
+    with open(os.path.join(cache, "_meta.json"), "w") as f:
+        json.dump({"source_sha256": "stale"}, f)
+
+    def load(_):
+        return load_weekly_seasons([2000], csv_path, store_dir, scoring="half_ppr")["fantasy_points_ppr"]
+
+    with ThreadPoolExecutor(8) as pool:
+        for points in pool.map(load, range(16)):
+            pd.testing.assert_series_equal(points, expected)
+    assert sorted(os.listdir(os.path.dirname(cache))) == [os.path.basename(cache)]   # no temp dirs left
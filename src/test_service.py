@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_weekly_csv
+from engine import service as service_mod
+from engine.ml.features import make_features
+from engine.ml.train import build_pipeline, cat_cols, num_cols
+from engine.service import MicroBatcher, ReplayService, ServiceState
+from engine.simulator.expected import expected_counterfactual_replay
+from engine.simulator.lineup import optimal_lineup_points
+from engine.simulator.simulate import Trade
+
+
+def test_micro_batcher_coalesces_concurrent_calls():
+    calls = []
+
+    def predict(frame):
+        calls.append(len(frame))
+        return frame["x"].to_numpy() * 2.0
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_wait_ms=5.0)
+        frames = [pd.DataFrame({"x": np.arange(i, i + 3, dtype=float)}) for i in range(10)]
+        outs = await asyncio.gather(*(batcher.predict(f) for f in frames))
+        await batcher.close()
+        return frames, outs, batcher.stats()
+
+    frames, outs, stats = asyncio.run(scenario())
+    assert calls == [30]
+    assert stats["batches"] == 1 and stats["requests"] == 10
+    for frame, out in zip(frames, outs):
+        np.testing.assert_array_equal(out, frame["x"].to_numpy() * 2.0)
+
+
+def _http(port, method, path, payload=None):
+    async def go():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        raw = await reader.read()
+        writer.close()
+        head, _, data = raw.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(data)
+    return go()
+
+
+def _raw(port, data):
+    async def go():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(data)
+        raw = await reader.read()
+        writer.close()
+        return int(raw.split()[1])
+    return go()
+
+
+def test_service_endpoints_match_direct_calls(tmp_path):
+    csv = write_weekly_csv(str(tmp_path / "weekly.csv"), n_seasons=2, n_players=80, n_weeks=10)
+    df = pd.read_csv(csv)
+    feat = make_features(df)
+    model = build_pipeline({"max_iter": 10})
+    model.fit(feat[num_cols + cat_cols], feat["y_next_week"])
+
+    state = ServiceState(csv, str(tmp_path / "store"), model=model, live_inference=True)
+    season = state.store.seasons[-1]
+    ids = sorted(df.loc[df["season"] == season, "player_id"].unique())
+    roster, others = ids[:16], ids[40:44]
+    trade = {"week": 4, "give": roster[:2], "get": others[:2]}
+    body = {"season": season, "roster": roster, "trade": trade}
+
+    async def scenario():
+        service = ReplayService(state, workers=2)
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            expected = await asyncio.gather(*(_http(port, "POST", "/replay/expected", body) for _ in range(4)))
+            historical = await _http(port, "POST", "/replay/historical", body)
+            batch = await _http(port, "POST", "/replay/batch", {**body, "trades": [trade, {**trade, "week": 6}]})
+            bad = await _http(port, "POST", "/replay/historical", {"season": 1900, "roster": roster, "trade": trade})
+            bad_end = await _http(port, "POST", "/replay/historical", {**body, "end_week": "last"})
+            missing = await _http(port, "GET", "/nope")
+            bad_lengths = [
+                await _raw(port, f"POST /replay/historical HTTP/1.1\r\nContent-Length: {value}\r\n\r\n".encode())
+                for value in ["abc", "-5"]
+            ]
+        finally:
+            server.close()
+            await service.close()
+        return expected, historical, batch, bad, bad_end, missing, bad_lengths
+
+    expected, historical, batch, bad, bad_end, missing, bad_lengths = asyncio.run(scenario())
+
+    direct = expected_counterfactual_replay(
+        model, state.season(season).df, roster, Trade(**trade), season, 10, optimal_lineup_points
+    )
+    for status, res in expected:
+        assert status == 200
+        np.testing.assert_allclose(res["weekly_delta"], direct["weekly_delta"])
+
+    assert historical[0] == 200 and len(historical[1]["weekly_delta"]) == 10 - 4 + 1
+    assert batch[0] == 200
+    assert batch[1]["total_delta"][0] == historical[1]["total_delta"]
+    assert bad[0] == 400 and "unknown season" in bad[1]["error"]
+    assert bad_end[0] == 400 and "end_week" in bad_end[1]["error"]
+    assert missing[0] == 404
+    assert bad_lengths == [400, 400]
+
+
+def test_cold_season_load_does_not_block_warm_requests(tmp_path, monkeypatch):
+    csv = write_weekly_csv(str(tmp_path / "weekly.csv"), n_seasons=2, n_players=40, n_weeks=6)
+    feat = make_features(pd.read_csv(csv))
+    model = build_pipeline({"max_iter": 5}).fit(feat[num_cols + cat_cols], feat["y_next_week"])
+    state = ServiceState(csv, str(tmp_path / "store"), model=model, live_inference=True)
+    warm, cold = state.store.seasons
+    state.season(warm)
+    state.model()
+
+    loading, release = threading.Event(), threading.Event()
+    real_load = service_mod.load_weekly_seasons
+
+    def slow_load(seasons, *args, **kwargs):
+        loading.set()
+        release.wait(10)
+        return real_load(seasons, *args, **kwargs)
+
+    monkeypatch.setattr(service_mod, "load_weekly_seasons", slow_load)
+    loader = threading.Thread(target=state.season, args=(cold,))
+    loader.start()
+    try:
+        assert loading.wait(10)
+        # the cold load is parked inside its season lock; warm lookups and the model still answer
+        done = threading.Event()
+        threading.Thread(target=lambda: (state.season(warm), state.feature_table(warm), state.model(), done.set())).start()
+        assert done.wait(10)
+    finally:
+        release.set()
+        loader.join()
+    assert state.loaded_seasons == [warm, cold]
+    # each season's prediction memo is tied to the data its features were built from
+    assert state.season(cold).memo.data_stamp == state.store.manifest["stamp"]["sha256"]
+    assert state.season(cold).memo is not state.season(warm).memo
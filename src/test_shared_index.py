@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_weekly
+from engine.loading_data.shared_index import (
+    attach_weekly_index,
+    open_weekly_index,
+    publish_weekly_index,
+    save_weekly_index,
+)
+from engine.loading_data.weekly_index import build_weekly_index
+from engine.simulator.simulate import Trade, counterfactual_replay
+
+
+def _same_index(a, b):
+    np.testing.assert_array_equal(a.seasons, b.seasons)
+    np.testing.assert_array_equal(a.points, b.points)
+    np.testing.assert_array_equal(a.pos_codes, b.pos_codes)
+    assert a.min_week == b.min_week
+    assert a.positions == b.positions
+    assert a.player_ids.tolist() == b.player_ids.tolist()
+    assert a.name_by_id == b.name_by_id
+
+
+def _replay_in_worker(name, roster, trade, season):
+    index = attach_weekly_index(name)
+    return counterfactual_replay(roster, trade, index.points_index, index.pos_index, season, 12)["total_delta"]
+
+
+def test_shared_and_mapped_indexes_are_read_only_copies(tmp_path):
+    df = generate_weekly(n_seasons=2, n_players=80, n_weeks=12)
+    index = build_weekly_index(df)
+    ids = sorted(df.loc[df["season"] == 2001, "player_id"].unique())
+    roster, trade = ids[:14], Trade(week=4, give=ids[:2], get=ids[-2:])
+    direct = counterfactual_replay(roster, trade, index.points_index, index.pos_index, 2001, 12)
+
+    with publish_weekly_index(index) as shared:
+        attached = attach_weekly_index(shared.name)
+        _same_index(attached, index)
+        with pytest.raises(ValueError):
+            attached.points[0, 0, 0] = 1.0
+        assert counterfactual_replay(roster, trade, attached.points_index, attached.pos_index, 2001, 12) == direct
+
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as ex:
+            assert ex.submit(_replay_in_worker, shared.name, roster, trade, 2001).result() == direct["total_delta"]
+
+    mapped = open_weekly_index(save_weekly_index(index, str(tmp_path / "weekly_index.bin")))
+    _same_index(mapped, index)
+    assert not mapped.points.flags.writeable
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+from engine.loading_data.load import get_season_week_range, load_weekly_seasons
+from engine.loading_data.store import open_store
+
+
+def _write_csv(path, extra_week=False):
+    rows = [
+        (2021, 1, "a", "A", "QB", 20.0, 300),
+        (2021, 2, "a", "A", "QB", None, 250),
+        (2022, 3, "b", "B", "WR", 12.5, 0),
+    ]
+    if extra_week:
+        rows.append((2022, 4, "b", "B", "WR", 8.0, 0))
+    cols = ["season", "week", "player_id", "player_name", "position", "fantasy_points_ppr", "passing_yards"]
+    pd.DataFrame(rows, columns=cols).to_csv(path, index=False)
+
+
+def test_store_reads_only_requested_season(tmp_path):
+    csv_path = str(tmp_path / "weekly.csv")
+    store_dir = str(tmp_path / "store")
+    _write_csv(csv_path)
+
+    store = open_store(csv_path, store_dir)
+    assert store.seasons == [2021, 2022]
+    assert get_season_week_range(store, 2022) == (3, 3)
+
+    df = load_weekly_seasons([2021], csv_path, store_dir)
+    assert list(df.columns)[:3] == ["season", "week", "player_id"]
+    assert "passing_yards" not in df.columns
+    assert df["season"].unique().tolist() == [2021]
+    assert df["fantasy_points_ppr"].tolist() == [20.0, 0.0]
+
+
+def test_store_rebuilds_only_when_csv_changes(tmp_path):
+    csv_path = str(tmp_path / "weekly.csv")
+    store_dir = str(tmp_path / "store")
+    _write_csv(csv_path)
+    open_store(csv_path, store_dir)
+
+    # touching the file without changing it keeps the partitions
+    part = os.path.join(store_dir, "season=2021", "part-0.parquet")
+    before = os.stat(part).st_mtime_ns
+    os.utime(csv_path, ns=(1, 1))
+    open_store(csv_path, store_dir)
+    assert os.stat(part).st_mtime_ns == before
+
+    _write_csv(csv_path, extra_week=True)
+    store = open_store(csv_path, store_dir)
+    assert get_season_week_range(store, 2022) == (3, 4)
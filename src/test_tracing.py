@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from engine import tracing
+
+
+@pytest.fixture(autouse=True)
+def _clean_tracing():
+    was_enabled = tracing.is_enabled()
+    tracing.reset()
+    yield
+    tracing.reset()
+    (tracing.enable if was_enabled else tracing.disable)()
+
+
+def test_disabled_spans_record_nothing():
+    tracing.disable()
+
+    @tracing.traced("t.fn")
+    def fn(x):
+        return x + 1
+
+    with tracing.span("t.block", rows=10) as s:
+        s.add_rows(5)
+    assert fn(1) == 2
+    assert tracing.summary() == {}
+
+
+def test_enabled_spans_collect_counts_rows_and_p95(tmp_path):
+    tracing.enable()
+
+    @tracing.traced("t.fn", rows=len)
+    def fn(n):
+        return list(range(n))
+
+    for n in range(1, 21):
+        fn(n)
+    with tracing.span("t.block", rows=3) as s:
+        s.add_rows(4)
+
+    stats = tracing.summary()
+    assert stats["t.fn"]["count"] == 20
+    assert stats["t.fn"]["rows"] == sum(range(1, 21))
+    assert 0 < stats["t.fn"]["p95_s"] <= stats["t.fn"]["max_s"] <= stats["t.fn"]["total_s"]
+    assert stats["t.block"] == {**stats["t.block"], "count": 1, "rows": 7}
+
+    path = tmp_path / "trace.json"
+    text = tracing.export_json(str(path))
+    assert json.loads(path.read_text()) == json.loads(text)
+    assert set(json.loads(text)["spans"]) == {"t.fn", "t.block"}
+
+
+def test_profile_returns_result_and_report(tmp_path):
+    def work(n):
+        return sum(i * i for i in range(n))
+
+    out = tmp_path / "work.prof"
+    result, report = tracing.profile(work, 1000, out_path=str(out), top=5)
+    assert result == sum(i * i for i in range(1000))
+    assert "work" in report
+    assert out.exists()
+
+
+def test_collecting_is_scoped_to_its_thread():
+    import threading
+
+    tracing.disable()
+
+    @tracing.traced("t.scoped")
+    def fn():
+        return tracing.is_enabled()
+
+    other = []
+    inside = threading.Event()
+    release = threading.Event()
+
+    def elsewhere():
+        inside.wait(5)
+        other.append(fn())   # another session's thread, while ours is collecting
+        release.set()
+
+    thread = threading.Thread(target=elsewhere)
+    thread.start()
+    with tracing.collecting():
+        assert fn() is True
+        inside.set()
+        assert release.wait(5)
+    thread.join()
+    with tracing.collecting(on=False):
+        fn()
+
+    assert other == [False]
+    assert tracing.summary()["t.scoped"]["count"] == 1
+    assert fn() is False
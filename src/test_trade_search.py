@@ -0,0 +1,42 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from engine.loading_data.load import build_weekly_indexes
+from engine.simulator.search import search_trades
+from engine.simulator.simulate import Trade, counterfactual_replay_many
+
+
+def test_search_matches_brute_force_top_k():
+    rng = np.random.default_rng(7)
+    n_players, n_rows = 40, 1500
+    pos = rng.choice(["QB", "RB", "WR", "TE"], n_players)
+    skill = rng.gamma(2.0, 4.0, n_players)
+    who = rng.integers(0, n_players, n_rows)
+    df = pd.DataFrame({
+        "season": 2020,
+        "week": rng.integers(1, 13, n_rows),
+        "player_id": [f"p{i}" for i in who],
+        "player_name": "x",
+        "position": pos[who],
+        "fantasy_points_ppr": np.round(skill[who] + rng.normal(0, 5, n_rows), 2),
+    })
+    points_index, pos_index, _ = build_weekly_indexes(df)
+    roster = [f"p{i}" for i in range(10)]
+    pool = [f"p{i}" for i in range(10, n_players)]
+
+    found = search_trades(roster, 5, points_index, pos_index, 2020, 12, pool=pool, top_k=5)
+
+    trades = [
+        Trade(week=5, give=list(give), get=list(get))
+        for n_give, n_get in [(1, 1), (2, 1), (2, 2)]
+        for give in itertools.combinations(roster, n_give)
+        for get in itertools.combinations(pool, n_get)
+    ]
+    brute = counterfactual_replay_many(roster, trades, points_index, pos_index, 2020, 12)
+    expected = sorted(brute["total_delta"].tolist(), reverse=True)[:5]
+
+    assert [t.total_delta for t in found.best] == expected
+    assert found.n_candidates == len(trades)
+    assert found.n_scored < len(trades)
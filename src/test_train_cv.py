@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.ml.features import make_features
+from engine.ml.train import walk_forward_search, walk_forward_splits
+
+
+def test_walk_forward_splits_never_train_on_the_future():
+    splits = walk_forward_splits([2021, 2019, 2020, 2022], min_train_seasons=2)
+    assert splits == [([2019, 2020], 2021), ([2019, 2020, 2021], 2022)]
+    with pytest.raises(ValueError):
+        walk_forward_splits([2020, 2021], min_train_seasons=2)
+
+
+def test_search_reports_every_fold_and_picks_lowest_mean_mae():
+    rng = np.random.default_rng(0)
+    n = 8000
+    df = pd.DataFrame({
+        "season": rng.integers(2018, 2022, n),
+        "week": rng.integers(1, 15, n),
+        "player_id": [f"p{i}" for i in rng.integers(0, 150, n)],
+        "player_name": "x",
+        "position": rng.choice(["QB", "RB", "WR", "TE"], n),
+        "fantasy_points_ppr": np.round(rng.gamma(2.0, 4.0, n), 2),
+    }).drop_duplicates(["season", "week", "player_id"])
+
+    report = walk_forward_search(make_features(df), {"max_depth": [2, 4], "max_iter": [20]}, n_jobs=1)
+
+    assert [f["test_season"] for f in report["folds"]] == [2020, 2021]
+    assert report["candidates"][0]["params"] == report["best_params"]
+    assert report["candidates"][0]["mean_mae"] <= report["candidates"][1]["mean_mae"]
+    for fold in report["folds"]:
+        assert fold["prep_seconds"] >= 0 and fold["all_fits_seconds"] >= fold["fit_seconds"]
+        assert fold["baseline_mae"] > 0
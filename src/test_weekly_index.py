@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from engine.loading_data.load import build_weekly_indexes, load_weekly_csv, load_weekly_index
+from engine.loading_data.weekly_index import build_weekly_index
+
+
+def _toy_df():
+    return pd.DataFrame({
+        "season": [2021, 2021, 2021, 2022, 2022],
+        "week": [1, 1, 3, 1, 1],
+        "player_id": ["a", "b", "a", "a", "a"],
+        "player_name": ["A", "B", "A", "A", "A2"],
+        "position": ["QB", "WR", "QB", "QB", "QB"],
+        "fantasy_points_ppr": [20.0, 11.5, 7.0, 3.0, 4.0],
+    })
+
+
+def test_weekly_indexes_match_dict_semantics():
+    points_index, pos_index, name_by_id = build_weekly_indexes(_toy_df())
+
+    assert dict(points_index[(2021, 1)]) == {"a": 20.0, "b": 11.5}
+    assert dict(pos_index[(2021, 3)]) == {"a": "QB"}
+    # week 2 of 2021 has no rows at all -> missing key, like the old dicts
+    assert (2021, 2) not in points_index
+    assert points_index.get((2021, 2), {}) == {}
+    # duplicate (season, week, player) -> last row wins
+    assert points_index[(2022, 1)]["a"] == 4.0
+    assert name_by_id["a"] == "A2"
+    assert points_index[(2021, 3)].get("b", 0.0) == 0.0
+    assert sorted(points_index) == [(2021, 1), (2021, 3), (2022, 1)]
+    # keys that are not a (season, week) pair are missing too, not a TypeError
+    for key in (2021, (2021,), "x", (2021, 1, 1), (2021, "x"), None):
+        assert key not in points_index and points_index.get(key) is None
+
+
+def test_roster_arrays_fill_missing_with_zero():
+    index = build_weekly_index(_toy_df())
+
+    points, codes = index.roster_arrays(["a", "b", "zzz"], 2021, 1, 4)
+
+    assert points.tolist() == [[20.0, 0.0, 7.0, 0.0], [11.5, 0.0, 0.0, 0.0], [0.0] * 4]
+    assert (codes[2] == -1).all()
+    assert index.positions[codes[1, 0]] == "WR"
+
+
+def test_streamed_index_matches_in_memory_build(tmp_path):
+    path = tmp_path / "weekly.csv"
+    df = _toy_df()
+    df["passing_yards"] = 100
+    df.loc[1, "fantasy_points_ppr"] = None
+    df.to_csv(path, index=False)
+
+    # chunks of 2 rows: the (2022, 1, "a") duplicate spans two chunks
+    streamed = load_weekly_index(str(path), chunksize=2)
+    expected = build_weekly_index(load_weekly_csv(str(path)))
+
+    assert streamed.points.dtype == np.float32
+    assert dict(streamed.points_index).keys() == dict(expected.points_index).keys()
+    for key in expected.points_index:
+        assert dict(streamed.points_index[key]) == dict(expected.points_index[key])
+        assert dict(streamed.pos_index[key]) == dict(expected.pos_index[key])
+    assert streamed.name_by_id == expected.name_by_id
+
+    compact = load_weekly_csv(str(path), compact=True, chunksize=2)
+    assert compact["season"].dtype == np.int16
+    assert compact["position"].dtype == "category"
+    assert compact["fantasy_points_ppr"].dtype == np.float32
+    assert compact["player_id"].astype(str).tolist() == ["a", "b", "a", "a", "a"]